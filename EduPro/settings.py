@@ -39,9 +39,11 @@ INSTALLED_APPS = [
     'main',
 ]
 
+# Same as Django's and allauth's backends, but the user of each request is
+# loaded together with its profile (main/backends.py).
 AUTHENTICATION_BACKENDS = [
-    "django.contrib.auth.backends.ModelBackend",
-    "allauth.account.auth_backends.AuthenticationBackend",
+    "main.backends.ProfileModelBackend",
+    "main.backends.ProfileAuthenticationBackend",
 ]
 
 # -------------------------------
@@ -72,8 +74,12 @@ ACCOUNT_RATE_LIMITS = {
 # MIDDLEWARE
 # -------------------------------
 MIDDLEWARE = [
+    'main.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',   # static files, before anything that touches the database
+    'main.middleware.RequestProfilingMiddleware',   # no-op unless EDUPRO_PROFILING is enabled
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'main.middleware.PrimaryStickinessMiddleware',   # after sessions: session saves are not "writes"
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
 
@@ -84,6 +90,119 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# -------------------------------
+# REQUEST PROFILING (opt-in)
+# -------------------------------
+# Per-view wall/SQL/template/cache timings, readable by managers at
+# /manager/profiling/. SAMPLE_RATE of requests are also dumped as a full
+# profile (cProfile .prof or pyinstrument .html) into PROFILE_DIR.
+EDUPRO_PROFILING = {
+    'ENABLED': os.environ.get('EDUPRO_PROFILING', '') == '1',
+    'WINDOW': 1000,
+    'SAMPLE_RATE': float(os.environ.get('EDUPRO_PROFILING_SAMPLE_RATE', '0')),
+    'PROFILER': os.environ.get('EDUPRO_PROFILER', 'cprofile'),
+    'PROFILE_DIR': os.path.join(BASE_DIR, 'profiles'),
+}
+
+# -------------------------------
+# CACHE
+# -------------------------------
+# EDUPRO_CACHE_BACKEND picks the store behind main.cache:
+#   locmem    - per process (default; each gunicorn worker has its own)
+#   file      - shared by every worker on one host, no extra service
+#   redis     - shared across hosts (EDUPRO_CACHE_LOCATION=redis://host:6379/1)
+#   memcached - shared across hosts (EDUPRO_CACHE_LOCATION=host:11211)
+#   dummy     - caching disabled
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'edupro'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+_cache_backend, _cache_location = CACHE_BACKENDS[os.environ.get('EDUPRO_CACHE_BACKEND', 'locmem')]
+CACHES = {
+    'default': {
+        'BACKEND': _cache_backend,
+        'LOCATION': os.environ.get('EDUPRO_CACHE_LOCATION', _cache_location),
+        'KEY_PREFIX': 'edupro',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000} if _cache_backend.endswith(('LocMemCache', 'FileBasedCache')) else {},
+    }
+}
+
+# -------------------------------
+# SESSIONS
+# -------------------------------
+# EDUPRO_SESSION_ENGINE picks where sessions live:
+#   db             - a django_session row read on every authenticated request (default)
+#   cached_db      - read from the 'sessions' cache, written through to the database
+#   cache          - only in the 'sessions' cache; lost when that cache is flushed
+#                    or evicts it (that student is logged out)
+#   signed_cookies - in the browser, signed with SECRET_KEY; no server storage,
+#                    but a logged-out cookie stays valid until it expires
+# `python manage.py bench_sessions` compares them. The 'sessions' cache is
+# separate from main.cache's, so clearing one never signs anyone out; it is
+# per process (locmem) unless EDUPRO_SESSION_CACHE_BACKEND names a shared
+# store, so with several workers use cached_db or a shared backend.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('EDUPRO_SESSION_ENGINE', 'db')]
+SESSION_CACHE_ALIAS = 'sessions'
+_session_cache = os.environ.get('EDUPRO_SESSION_CACHE_BACKEND', 'locmem')
+_session_backend, _session_location = CACHE_BACKENDS[_session_cache]
+# Own locmem/file locations: clearing the default cache must not drop sessions.
+_session_location = {'locmem': 'edupro-sessions', 'file': os.path.join(BASE_DIR, '.sessions')}.get(
+    _session_cache, _session_location
+)
+CACHES['sessions'] = {
+    'BACKEND': _session_backend,
+    'LOCATION': os.environ.get('EDUPRO_SESSION_CACHE_LOCATION', _session_location),
+    'KEY_PREFIX': 'edupro-sessions',
+    'OPTIONS': {'MAX_ENTRIES': 100000} if _session_cache in ('locmem', 'file') else {},
+}
+
+# -------------------------------
+# METRICS
+# -------------------------------
+# Prometheus counters and histograms exposed at /metrics. Under gunicorn set
+# EDUPRO_METRICS_DIR to a directory shared by all workers (cleared on deploy)
+# so every scrape reports the whole server rather than one worker.
+EDUPRO_METRICS = {
+    'ENABLED': os.environ.get('EDUPRO_METRICS', '1') == '1',
+    'MULTIPROCESS_DIR': os.environ.get('EDUPRO_METRICS_DIR', ''),
+    'FLUSH_INTERVAL': 5,
+    'TOKEN': os.environ.get('EDUPRO_METRICS_TOKEN', ''),
+}
+
+# -------------------------------
+# BACKGROUND JOBS
+# -------------------------------
+# Slow side effects (enrollment on payment approval, trainer deletion) are
+# queued in the database and run by `python manage.py run_jobs`.
+# EDUPRO_JOBS_EAGER=1 runs them inline instead, for development without a worker.
+EDUPRO_JOBS = {
+    'EAGER': os.environ.get('EDUPRO_JOBS_EAGER', '') == '1',
+    'MAX_ATTEMPTS': 5,
+    'VISIBILITY_TIMEOUT': 300,
+    'BACKOFF': 10,
+    'MAX_BACKOFF': 3600,
+}
+
+# -------------------------------
+# LIVE DASHBOARD UPDATES
+# -------------------------------
+# /events/stream/ holds one connection open per dashboard tab, which only an
+# ASGI server can afford; under WSGI it answers 204 and dashboards served by
+# WSGI leave the live feed out. Set EDUPRO_LIVE_UPDATES=1 when /events/stream/
+# is routed to ASGI workers while the pages themselves are served by gunicorn:
+# events pass between the processes through the LiveEvent table (main/events.py).
+EDUPRO_LIVE_UPDATES = os.environ.get('EDUPRO_LIVE_UPDATES', '') == '1'
+
 ROOT_URLCONF = 'EduPro.urls'
 
 # -------------------------------
@@ -93,8 +212,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, "templates")],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Templates are compiled once per process. With DEBUG on, edited
+            # templates are still picked up (the autoreloader resets the cache).
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -110,17 +236,59 @@ WSGI_APPLICATION = 'EduPro.wsgi.application'
 # -------------------------------
 # DATABASE (MySQL)
 # -------------------------------
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'edupro',
-        'USER': 'root',
-        'PASSWORD': '2004',
-        'HOST': 'localhost',
-        'PORT': '3306',
+# Connections persist for EDUPRO_DB_CONN_MAX_AGE seconds and are health
+# checked before reuse. EDUPRO_DB_POOL_SIZE > 0 switches to the pooled MySQL
+# backend instead (for ASGI, where persistent connections are not reused
+# across requests): each request borrows a connection and returns it.
+# EDUPRO_DB_ENGINE=sqlite runs against local SQLite files for development.
+def database(prefix, name, sqlite_name):
+    env = lambda key, default: os.environ.get(f'{prefix}_{key}', default)
+    if os.environ.get('EDUPRO_DB_ENGINE', 'mysql') == 'sqlite':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env('NAME', os.path.join(BASE_DIR, sqlite_name)),
+        }
+    pool_size = int(os.environ.get('EDUPRO_DB_POOL_SIZE', '0'))
+    return {
+        'ENGINE': 'main.db_backends.mysql_pool' if pool_size else 'django.db.backends.mysql',
+        'NAME': env('NAME', name),
+        'USER': env('USER', 'root'),
+        'PASSWORD': env('PASSWORD', '2004'),
+        'HOST': env('HOST', 'localhost'),
+        'PORT': env('PORT', '3306'),
+        'CONN_MAX_AGE': 0 if pool_size else int(os.environ.get('EDUPRO_DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_SIZE': pool_size,
     }
+
+
+DATABASES = {
+    'default': database('EDUPRO_DB', 'edupro', 'db.sqlite3'),
 }
 
+# Optional read replica: set EDUPRO_REPLICA_HOST (MySQL) or
+# EDUPRO_REPLICA_NAME (SQLite file) and dashboard/report views read from it.
+if os.environ.get('EDUPRO_REPLICA_HOST') or os.environ.get('EDUPRO_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **database('EDUPRO_REPLICA', 'edupro', 'db-replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Optional reporting database for the manager analytics views, so long scans
+# never compete with student traffic: EDUPRO_REPORTING_HOST (MySQL) or
+# EDUPRO_REPORTING_NAME (SQLite). Falls back to the replica, then the primary.
+if os.environ.get('EDUPRO_REPORTING_HOST') or os.environ.get('EDUPRO_REPORTING_NAME'):
+    DATABASES['reporting'] = {
+        **database('EDUPRO_REPORTING', 'edupro', 'db-reporting.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['main.db_routers.ReplicaRouter']
+
+# After a write, that client's replica/reporting reads go to the primary for
+# this many seconds, so nobody misses their own change to replication lag.
+DATABASE_STICKY_SECONDS = int(os.environ.get('EDUPRO_DB_STICKY_SECONDS', '5'))
+
 # -------------------------------
 # PASSWORD VALIDATION
 # -------------------------------
@@ -150,6 +318,19 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
+# With DEBUG off, `manage.py collectstatic` fingerprints every file
+# (style.<hash>.css), rewrites url() references in CSS, writes .gz and .br
+# variants next to them, and {% static %} resolves the hashed names from its
+# manifest. WhiteNoiseMiddleware serves the hashed files as immutable for a
+# year, and picks the compressed variant the browser accepts.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
@@ -1,6 +1,6 @@
 from allauth.account.adapter import DefaultAccountAdapter
 from django.conf import settings
-from .models import Profile
+from .models import get_profile
 
 
 class CustomAccountAdapter(DefaultAccountAdapter):
@@ -9,22 +9,17 @@ class CustomAccountAdapter(DefaultAccountAdapter):
     """
     def get_login_redirect_url(self, request):
         """
-        Override to redirect based on user role
+        Override to redirect based on user role. Worked out from the profile
+        at login time; nothing is stored in the session for it.
         """
         if request.user.is_authenticated:
-            try:
-                profile = Profile.objects.get(user=request.user)
-                role = profile.get_role()
-                
-                if role == 'Manager':
-                    return '/manager/dashboard/'
-                elif role == 'Trainer':
-                    return '/trainer/dashboard/'
-                else:
-                    return '/student/dashboard/'
-            except Profile.DoesNotExist:
-                # Create profile if it doesn't exist
-                Profile.objects.create(user=request.user, is_student=True)
+            role = get_profile(request.user).get_role()
+
+            if role == 'Manager':
+                return '/manager/dashboard/'
+            elif role == 'Trainer':
+                return '/trainer/dashboard/'
+            else:
                 return '/student/dashboard/'
         
         return super().get_login_redirect_url(request)
@@ -1,14 +1,35 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Register your models here.
 
 from .models import (
     library, Course, Enrollment, Profile, Country, State, District,
     CourseVideo, VideoProgress, TrainerRating, VideoRating,
-    TrainerContact, Feedback, TrainerCourseAssignment, Payment
+    TrainerContact, Feedback, TrainerCourseAssignment, Payment, Job, MediaBlob
 )
+from .paginators import EstimatedCountPaginator, KeysetChangeList
+
+
+# ==================== LARGE TABLES ====================
+# Users, progress, payments and the like grow to millions of rows. Their
+# lists load related rows with the page (list_select_related), pick users by
+# id instead of rendering every user into a <select> (raw_id_fields), skip
+# the unfiltered COUNT(*) (show_full_result_count) and estimate the
+# paginator's count on big tables (main/paginators.py).
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class KeysetAdmin(LargeTableAdmin):
+    """Newest first, paged by id (?after=) rather than by OFFSET."""
+    ordering = ('-id',)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
 
 
 # ==================== PROFILE INLINE (Shows Profile in User Admin) ====================
@@ -18,6 +39,7 @@ class ProfileInline(admin.StackedInline):
     can_delete = False
     verbose_name = 'User Role & Profile'
     verbose_name_plural = 'User Role & Profile'
+    raw_id_fields = ('country', 'state', 'district')
     fieldsets = (
         ('Role Management', {
             'fields': ('is_instructor', 'is_trainer', 'is_student'),
@@ -39,6 +61,9 @@ class UserAdmin(BaseUserAdmin):
     inlines = (ProfileInline,)
     list_display = ('username', 'email', 'first_name', 'last_name', 'get_user_role', 'is_staff', 'is_active')
     list_filter = ('is_staff', 'is_active', 'is_superuser')
+    list_select_related = ('profile',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def get_user_role(self, obj):
         """Display user role in list view"""
@@ -52,10 +77,13 @@ class UserAdmin(BaseUserAdmin):
 
 # ==================== PROFILE ADMIN ====================
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(LargeTableAdmin):
     """Custom Profile Admin with better interface"""
     list_display = ('user', 'get_role', 'is_instructor', 'is_trainer', 'is_student', 'country', 'state')
     list_filter = ('is_instructor', 'is_trainer', 'is_student', 'country')
+    # State.__str__ names its country.
+    list_select_related = ('user', 'country', 'state__country')
+    raw_id_fields = ('country', 'state', 'district')
     search_fields = ('user__username', 'user__email', 'user__first_name', 'user__last_name')
     fieldsets = (
         ('User', {
@@ -81,6 +109,144 @@ class ProfileAdmin(admin.ModelAdmin):
     get_role.short_description = 'Current Role'
 
 
+# ==================== BACKGROUND JOBS ====================
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Queued, running and failed background jobs"""
+    list_display = ('id', 'task', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('locked_by', 'locked_until', 'created_at', 'finished_at', 'last_error')
+    actions = ['retry_now']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_now(self, request, queryset):
+        queryset.exclude(status='running').update(
+            status='queued', attempts=0, run_at=timezone.now(), locked_until=None, finished_at=None
+        )
+
+
+# ==================== MEDIA BLOBS ====================
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    """Deduplicated course media and how many rows share each file"""
+    list_display = ('name', 'size', 'refcount', 'created_at')
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size', 'refcount', 'created_at')
+
+
+# ==================== COURSES ====================
+@admin.register(Course)
+class CourseAdmin(LargeTableAdmin):
+    list_display = ('title', 'instructor', 'category', 'level', 'price', 'created_at')
+    list_filter = ('level',)
+    list_select_related = ('instructor',)
+    search_fields = ('title', 'slug', 'category')
+    raw_id_fields = ('instructor', 'students')
+
+
+@admin.register(CourseVideo)
+class CourseVideoAdmin(LargeTableAdmin):
+    list_display = ('title', 'course', 'order', 'created_at')
+    list_select_related = ('course',)
+    search_fields = ('title', 'course__title')
+    autocomplete_fields = ('course',)
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(LargeTableAdmin):
+    list_display = ('student', 'course', 'enrolled_at')
+    list_select_related = ('student', 'course')
+    search_fields = ('student__username', 'course__title')
+    raw_id_fields = ('student',)
+    autocomplete_fields = ('course',)
+
+
+@admin.register(TrainerCourseAssignment)
+class TrainerCourseAssignmentAdmin(LargeTableAdmin):
+    list_display = ('trainer', 'course', 'assigned_by', 'assigned_at')
+    list_select_related = ('trainer', 'course', 'assigned_by')
+    search_fields = ('trainer__username', 'course__title')
+    raw_id_fields = ('trainer', 'assigned_by')
+    autocomplete_fields = ('course',)
+
+
+# ==================== PROGRESS & PAYMENTS ====================
+@admin.register(VideoProgress)
+class VideoProgressAdmin(KeysetAdmin):
+    list_display = ('student', 'video', 'progress_percentage', 'completed', 'last_watched')
+    list_filter = ('completed',)
+    list_select_related = ('student', 'video__course')
+    raw_id_fields = ('student', 'video')
+
+
+@admin.register(Payment)
+class PaymentAdmin(KeysetAdmin):
+    list_display = ('student', 'course', 'amount', 'payment_method', 'status', 'payment_date')
+    list_filter = ('status', 'payment_method')
+    list_select_related = ('student', 'course')
+    search_fields = ('transaction_id',)
+    raw_id_fields = ('student', 'approved_by')
+    autocomplete_fields = ('course',)
+
+
+# ==================== RATINGS & FEEDBACK ====================
+@admin.register(TrainerRating)
+class TrainerRatingAdmin(LargeTableAdmin):
+    list_display = ('trainer', 'student', 'rating', 'created_at')
+    list_filter = ('rating',)
+    list_select_related = ('trainer', 'student')
+    raw_id_fields = ('trainer', 'student')
+
+
+@admin.register(VideoRating)
+class VideoRatingAdmin(LargeTableAdmin):
+    list_display = ('video', 'student', 'rating', 'created_at')
+    list_filter = ('rating',)
+    list_select_related = ('video__course', 'student')
+    raw_id_fields = ('video', 'student')
+
+
+@admin.register(Feedback)
+class FeedbackAdmin(LargeTableAdmin):
+    list_display = ('student', 'course', 'created_at')
+    list_select_related = ('student', 'course')
+    raw_id_fields = ('student',)
+    autocomplete_fields = ('course',)
+
+
+@admin.register(TrainerContact)
+class TrainerContactAdmin(admin.ModelAdmin):
+    list_display = ('trainer', 'email', 'phone')
+    list_select_related = ('trainer',)
+    raw_id_fields = ('trainer',)
+
+
+# ==================== LOCATIONS ====================
+@admin.register(Country)
+class CountryAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+@admin.register(State)
+class StateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'country')
+    list_select_related = ('country',)
+    search_fields = ('name',)
+    autocomplete_fields = ('country',)
+
+    def get_queryset(self, request):
+        # Also used by the district form's state autocomplete, which shows State.__str__.
+        return super().get_queryset(request).select_related('country')
+
+
+@admin.register(District)
+class DistrictAdmin(admin.ModelAdmin):
+    list_display = ('name', 'state')
+    list_select_related = ('state__country',)
+    search_fields = ('name',)
+    autocomplete_fields = ('state',)
+
+
 # ==================== REGISTER MODELS ====================
 # Unregister default User admin and register custom one
 admin.site.unregister(User)
@@ -88,16 +254,3 @@ admin.site.register(User, UserAdmin)
 
 # Register other models
 admin.site.register(library)
-admin.site.register(Course)
-admin.site.register(Enrollment)
-admin.site.register(Country)
-admin.site.register(State)
-admin.site.register(District)
-admin.site.register(CourseVideo)
-admin.site.register(VideoProgress)
-admin.site.register(TrainerRating)
-admin.site.register(VideoRating)
-admin.site.register(TrainerContact)
-admin.site.register(Feedback)
-admin.site.register(TrainerCourseAssignment)
-admin.site.register(Payment)
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""
+Authentication backends that load the user's profile in the same query as
+the user, so role checks (role_required, dashboard redirects) read
+request.user.profile without querying it again.
+"""
+from allauth.account.auth_backends import AuthenticationBackend
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ProfileUserMixin:
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class ProfileModelBackend(ProfileUserMixin, ModelBackend):
+    """ModelBackend whose session user comes with its profile."""
+
+
+class ProfileAuthenticationBackend(ProfileUserMixin, AuthenticationBackend):
+    """allauth's backend (username or email login) whose session user comes with its profile."""
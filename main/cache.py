@@ -0,0 +1,159 @@
+"""
+Application cache on top of the configured Django cache (settings.CACHES).
+
+Keys are namespaced and versioned: invalidate('catalog') bumps the
+namespace's version so every key built from it misses at once, without
+tracking or deleting individual keys. get_or_set() guards expensive
+producers against stampedes: a value is refreshed early with a probability
+that grows as it nears expiry, and only the caller holding a short lock
+recomputes, while the others keep serving the old value or briefly wait.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics, profiling
+
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,       # seconds a value lives unless the caller passes one
+    'BETA': 1.0,          # > 1 refreshes earlier, < 1 later
+    'LOCK_TIMEOUT': 30,   # longest a producer may hold the recompute lock
+    'LOCK_WAIT': 2.0,     # how long a cold miss waits for another producer
+    'FRAGMENTS': True,    # {% cachefragment %} stores rendered template fragments
+}
+
+MAX_KEY_LENGTH = 200
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'EDUPRO_CACHE', {})}
+
+
+def _backend():
+    return caches[get_config()['ALIAS']]
+
+
+def _version_key(namespace):
+    return f'ns:{namespace}'
+
+
+def _versions(backend, namespaces):
+    keys = [_version_key(ns) for ns in namespaces]
+    found = backend.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # A namespace seen for the first time (or evicted) starts at a
+            # version no earlier key can have used.
+            backend.add(key, time.time_ns(), None)
+            found[key] = backend.get(key)
+    return [found[key] for key in keys]
+
+
+def namespace_version(namespace):
+    """Current version of a namespace; changes on every invalidate(). Handy for ETags."""
+    return _versions(_backend(), [namespace])[0]
+
+
+def make_key(namespaces, *parts):
+    """'catalog', 'category', 'Web Development' -> 'catalog.<version>:category:Web%20Development'."""
+    if isinstance(namespaces, str):
+        namespaces = (namespaces,)
+    backend = _backend()
+    prefix = ':'.join(f'{ns}.{version}' for ns, version in zip(namespaces, _versions(backend, namespaces)))
+    key = ':'.join([prefix, *(quote(str(part), safe='') for part in parts)])
+    if len(key) > MAX_KEY_LENGTH:
+        key = f'{prefix}:{hashlib.md5(key.encode()).hexdigest()}'
+    return key
+
+
+_batch = threading.local()
+
+
+@contextmanager
+def batched():
+    """Collects the invalidate() calls of the block and bumps each namespace once when it ends."""
+    if getattr(_batch, 'namespaces', None) is not None:
+        yield  # the outermost block flushes
+        return
+    _batch.namespaces = {}
+    try:
+        yield
+    finally:
+        namespaces, _batch.namespaces = _batch.namespaces, None
+        invalidate(*namespaces)
+
+
+def invalidate(*namespaces):
+    """Makes every key in the given namespaces miss from now on (at the end of a batched() block)."""
+    pending = getattr(_batch, 'namespaces', None)
+    if pending is not None:
+        pending.update(dict.fromkeys(namespaces))
+        return
+    backend = _backend()
+    for namespace in namespaces:
+        try:
+            backend.incr(_version_key(namespace))
+        except ValueError:
+            backend.add(_version_key(namespace), time.time_ns(), None)
+
+
+def _record(hit):
+    profiling.record_cache(hit)
+    metrics.cache_requests.inc(result='hit' if hit else 'miss')
+
+
+def _compute(backend, key, producer, timeout):
+    start = time.time()
+    value = producer()
+    delta = time.time() - start
+    backend.set(key, (value, delta, time.time() + timeout), timeout)
+    return value
+
+
+def get_or_set(namespaces, parts, producer, timeout=None):
+    """
+    Returns the cached value for (namespaces, *parts), calling producer() to
+    build it on a miss. Values must be picklable; querysets should be
+    evaluated (list()) inside the producer.
+    """
+    config = get_config()
+    backend = _backend()
+    timeout = config['TIMEOUT'] if timeout is None else timeout
+    key = make_key(namespaces, *parts)
+    lock_key = f'{key}:lock'
+
+    entry = backend.get(key)
+    if entry is not None:
+        value, delta, expiry = entry
+        # XFetch: -log(u) is usually small, so only values close to expiry
+        # (relative to how long they took to build) get refreshed early.
+        early = time.time() - delta * config['BETA'] * math.log(1.0 - random.random()) >= expiry
+        if not early or not backend.add(lock_key, 1, config['LOCK_TIMEOUT']):
+            _record(True)
+            return value
+    elif not backend.add(lock_key, 1, config['LOCK_TIMEOUT']):
+        deadline = time.monotonic() + config['LOCK_WAIT']
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = backend.get(key)
+            if entry is not None:
+                _record(True)
+                return entry[0]
+        # The lock holder is slow or gone; compute without it.
+        _record(False)
+        return _compute(backend, key, producer, timeout)
+
+    _record(False)
+    try:
+        return _compute(backend, key, producer, timeout)
+    finally:
+        backend.delete(lock_key)
@@ -0,0 +1,51 @@
+"""
+MySQL backend that keeps closed connections in a small per-process pool.
+
+With CONN_MAX_AGE = 0 Django closes the connection at the end of every
+request; here "closing" rolls back and parks it in the pool, and the next
+request takes it back after a ping instead of opening a new connection.
+Size per process with DATABASES[alias]['POOL_SIZE'].
+"""
+import queue
+import threading
+
+from django.db.backends.mysql import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def _pool(self):
+        settings_dict = self.settings_dict
+        key = (self.alias, settings_dict['HOST'], settings_dict['PORT'], settings_dict['NAME'], settings_dict['USER'])
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=settings_dict.get('POOL_SIZE') or 10)
+            return self._pools[key]
+
+    def get_new_connection(self, conn_params):
+        pool = self._pool()
+        while True:
+            try:
+                connection = pool.get_nowait()
+            except queue.Empty:
+                return super().get_new_connection(conn_params)
+            try:
+                connection.ping(False)
+                return connection
+            except base.Database.Error:
+                # Dropped by the server while parked; discard and try the next.
+                try:
+                    connection.close()
+                except base.Database.Error:
+                    pass
+
+    def _close(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.rollback()
+            self._pool().put_nowait(self.connection)
+        except (queue.Full, base.Database.Error):
+            return super()._close()
@@ -0,0 +1,92 @@
+"""
+Database routing: writes always go to 'default'. Reads made inside
+route_reads(*aliases) go to the first of those aliases that is configured,
+unless the current request has already written, or its client wrote
+within the last DATABASE_STICKY_SECONDS (read-your-writes).
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+PRIMARY = 'default'
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+STICKY_COOKIE = 'edupro_primary_until'
+
+_read_aliases = contextvars.ContextVar('edupro_read_aliases', default=())
+_writes = contextvars.ContextVar('edupro_request_writes', default=None)
+
+
+def sticky_seconds():
+    return getattr(settings, 'DATABASE_STICKY_SECONDS', 5)
+
+
+def is_sticky(request):
+    """True while the client's last write may not have reached the replicas."""
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_alias():
+    """The alias reads are currently routed to, or None for the primary."""
+    writes = _writes.get()
+    if writes is not None and writes['count']:
+        return None
+    for alias in _read_aliases.get():
+        if alias in settings.DATABASES:
+            return alias
+    return None
+
+
+@contextmanager
+def route_reads(*aliases):
+    token = _read_aliases.set(aliases)
+    try:
+        yield
+    finally:
+        _read_aliases.reset(token)
+
+
+@contextmanager
+def track_writes():
+    """Counts write statements sent to the primary while the block runs; yields {'count': n}."""
+    writes = {'count': 0}
+    token = _writes.set(writes)
+    try:
+        yield writes
+    finally:
+        _writes.reset(token)
+
+
+def _count_writes(execute, sql, params, many, context):
+    writes = _writes.get()
+    if writes is not None and sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        writes['count'] += 1
+    return execute(sql, params, many, context)
+
+
+def watch_writes(connection):
+    """
+    Installed on every new primary connection (connection_created). The
+    counter lives in a contextvar, so writes made from sync_to_async threads
+    of an async view are still counted against their request.
+    """
+    if connection.alias == PRIMARY and _count_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_writes)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data, so objects read from a replica
+        # may be related to (and saved alongside) primary objects.
+        return True
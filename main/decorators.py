@@ -1,40 +1,68 @@
+import hashlib
 from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
 from django.shortcuts import redirect
 from django.contrib import messages
-from .models import Profile
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .db_routers import is_sticky, route_reads
+from .models import aget_profile, get_profile
 
 
 def role_required(*allowed_roles):
     """
     Decorator to restrict access based on user role.
     Usage: @role_required('Manager', 'Trainer')
+    Works on both sync and async views.
     """
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                if not user.is_authenticated:
+                    messages.error(request, 'Please login to access this page.')
+                    return redirect('account_login')
+                
+                profile = await aget_profile(user)
+                denied = _deny_role(request, profile, allowed_roles)
+                if denied:
+                    return denied
+                return await view_func(request, *args, **kwargs)
+            return async_wrapper
+
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
             if not request.user.is_authenticated:
                 messages.error(request, 'Please login to access this page.')
                 return redirect('account_login')
             
-            profile, created = Profile.objects.get_or_create(user=request.user)
-            
-            user_role = profile.get_role()
-            
-            if user_role not in allowed_roles:
-                messages.error(request, f'Access denied. This page is only for {", ".join(allowed_roles)}.')
-                # Redirect to appropriate dashboard
-                if profile.is_instructor:
-                    return redirect('manager_dashboard')
-                elif profile.is_trainer:
-                    return redirect('trainer_dashboard')
-                else:
-                    return redirect('student_dashboard')
-            
+            profile = get_profile(request.user)
+            denied = _deny_role(request, profile, allowed_roles)
+            if denied:
+                return denied
             return view_func(request, *args, **kwargs)
         return wrapper
     return decorator
 
 
+def _deny_role(request, profile, allowed_roles):
+    """Redirect to the user's own dashboard if their role is not allowed, else None."""
+    user_role = profile.get_role()
+    
+    if user_role not in allowed_roles:
+        messages.error(request, f'Access denied. This page is only for {", ".join(allowed_roles)}.')
+        # Redirect to appropriate dashboard
+        if profile.is_instructor:
+            return redirect('manager_dashboard')
+        elif profile.is_trainer:
+            return redirect('trainer_dashboard')
+        else:
+            return redirect('student_dashboard')
+    return None
+
+
 def manager_required(view_func):
     """Decorator to restrict access to Managers only"""
     return role_required('Manager')(view_func)
@@ -49,3 +77,68 @@ def student_required(view_func):
     """Decorator to restrict access to Students only"""
     return role_required('Student')(view_func)
 
+
+
+def read_from_replica(view_func):
+    """
+    Decorator to send the view's reads to the 'replica' database when one is
+    configured. Writes made by the view still go to the primary.
+    """
+    return _read_from('replica')(view_func)
+
+
+def read_from_reporting(view_func):
+    """
+    Decorator for long analytic views: reads go to the 'reporting' database,
+    falling back to 'replica' and then the primary if they are not configured.
+    """
+    return _read_from('reporting', 'replica')(view_func)
+
+
+def _read_from(*aliases):
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # Right after the user's own write the replicas may lag; stay on the primary.
+            if is_sticky(request):
+                return view_func(request, *args, **kwargs)
+            with route_reads(*aliases):
+                return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def conditional_page(state):
+    """
+    Decorator answering a repeat GET with 304 Not Modified, before the view
+    renders anything, while state(request, *view args) is unchanged. state
+    returns (last modified, *whatever else the page shows), or None to always
+    render. The ETag also covers the user, as pages differ once logged in.
+    """
+    def etag(request, *args, **kwargs):
+        current = state(request, *args, **kwargs)
+        if current is None:
+            return None
+        return hashlib.md5(repr((request.user.pk, *current)).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        # If-Modified-Since alone cannot tell that the user changed, so only anonymous pages get one.
+        if request.user.is_authenticated:
+            return None
+        current = state(request, *args, **kwargs)
+        return current[0] if current else None
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Revalidate every time rather than trusting heuristic freshness.
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,202 @@
+"""
+Publish/subscribe for live dashboard updates over server-sent events.
+Model signals publish small deltas to named channels ('manager',
+'course:<id>'); each open /events/stream/ connection is a Subscription
+that receives the events of its channels.
+
+Events go through the LiveEvent table, so a publisher and the stream need
+not share a process: pages on gunicorn publish, and whichever ASGI workers
+hold open streams read them back. Each such worker polls the table once per
+POLL_SECONDS for all of its streams and hands new rows to the subscriptions
+of their channel; a reconnecting browser's Last-Event-ID is the row id, so
+the rows it missed are replayed from the table too.
+
+Subscribing processes also mark their channels as listened to in the
+application cache, so publishers skip the work while no dashboard is open.
+That needs a cache shared by every process (EDUPRO_CACHE_BACKEND); with a
+per-process cache, publishers in a split gunicorn + ASGI setup
+(EDUPRO_LIVE_UPDATES) always publish.
+
+The stream is served under ASGI only (a WSGI worker would be tied up for
+as long as a tab stays open).
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from . import cache
+
+
+KEEPALIVE_SECONDS = 15
+POLL_SECONDS = 1.0     # how often a process with open streams reads new events
+HISTORY = 500          # most events replayed to a client reconnecting with Last-Event-ID
+RETENTION = timedelta(minutes=10)
+PRUNE_SECONDS = 60
+LISTEN_SECONDS = 30    # a channel counts as listened to this long after the last poll
+RETRY_MS = 3000        # how soon browsers reconnect after a dropped stream
+
+ANY_CHANNEL = '*'
+
+
+def format_event(event_id, event, data):
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+def _listen_key(channel):
+    return f'events:listening:{channel}'
+
+
+def _cache_backend():
+    return caches[cache.get_config()['ALIAS']]
+
+
+class Subscription:
+    """One client's queue of pending events, iterated by astream()."""
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.queue = queue.SimpleQueue()
+        self.after = 0           # id of the newest event already queued or seen by the client
+        self.loop = None
+        self.wakeup = None
+
+    def deliver(self, message):
+        self.queue.put(message)
+        loop, wakeup = self.loop, self.wakeup
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # The client's event loop has shut down.
+                pass
+
+    def drain(self):
+        while True:
+            try:
+                yield self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    async def astream(self):
+        """Async iterator of the client's events, with keepalive comments while idle."""
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        try:
+            yield f'retry: {RETRY_MS}\n\n'
+            idle_since = time.monotonic()
+            while True:
+                await self.broker.apoll()
+                for message in self.drain():
+                    idle_since = time.monotonic()
+                    yield message
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    if time.monotonic() - idle_since >= KEEPALIVE_SECONDS:
+                        idle_since = time.monotonic()
+                        yield ': keepalive\n\n'
+                self.wakeup.clear()
+        finally:
+            self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+        self.last_id = None      # newest LiveEvent handed to this process's subscriptions
+        self.last_poll = 0.0
+        self.last_prune = 0.0
+
+    def publish(self, channel, event, data):
+        from .models import LiveEvent
+
+        LiveEvent.objects.create(channel=channel, event=event, data={**data, 'ts': time.time()})
+
+    def has_subscribers(self, *channels):
+        """Whether a client of any process listens on any of channels (on any channel when none are given)."""
+        backend = _cache_backend()
+        if isinstance(backend, DummyCache) or (isinstance(backend, LocMemCache) and settings.EDUPRO_LIVE_UPDATES):
+            # Listeners in other processes cannot be seen; assume there are some.
+            return True
+        return bool(backend.get_many([_listen_key(channel) for channel in channels or [ANY_CHANNEL]]))
+
+    def subscribe(self, channels, last_event_id=None):
+        """Registers a client; events after last_event_id (a LiveEvent id) are queued for it first."""
+        from .models import LiveEvent
+
+        subscription = Subscription(self, channels)
+        newest = LiveEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        if last_event_id and last_event_id.isdigit():
+            missed = LiveEvent.objects.filter(
+                id__gt=int(last_event_id), id__lte=newest, channel__in=subscription.channels
+            ).order_by('-id')[:HISTORY]
+            for row in reversed(missed):
+                subscription.deliver(format_event(row.id, row.event, row.data))
+        # Anything newer reaches it with the next poll.
+        subscription.after = newest
+        with self.lock:
+            if self.last_id is None:
+                self.last_id = newest
+            self.subscriptions.add(subscription)
+        self.mark_listening()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def mark_listening(self):
+        with self.lock:
+            channels = {channel for s in self.subscriptions for channel in s.channels}
+        if channels:
+            _cache_backend().set_many(dict.fromkeys(map(_listen_key, channels | {ANY_CHANNEL}), 1), LISTEN_SECONDS)
+
+    async def apoll(self):
+        """poll(), at most once per POLL_SECONDS however many streams of this process call it."""
+        now = time.monotonic()
+        if now - self.last_poll < POLL_SECONDS:
+            return
+        self.last_poll = now
+        await sync_to_async(self.poll)()
+
+    def poll(self):
+        """Hands the events published since the last poll to this process's subscriptions."""
+        from .models import LiveEvent
+
+        with self.lock:
+            last_id = self.last_id or 0
+        rows = list(LiveEvent.objects.filter(id__gt=last_id).order_by('id'))
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+            if rows:
+                self.last_id = max(self.last_id or 0, rows[-1].id)
+        for row in rows:
+            message = format_event(row.id, row.event, row.data)
+            for subscription in subscriptions:
+                if row.channel in subscription.channels and row.id > subscription.after:
+                    subscription.after = row.id
+                    subscription.deliver(message)
+
+        self.mark_listening()
+        if time.monotonic() - self.last_prune >= PRUNE_SECONDS:
+            self.last_prune = time.monotonic()
+            LiveEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+
+
+broker = Broker()
+
+
+def course_channel(course_id):
+    return f'course:{course_id}'
@@ -0,0 +1,164 @@
+"""
+A small background job queue stored in the application database, so slow
+side effects can leave the request without adding a broker to deploy.
+
+    @jobs.task()
+    def enroll_student(payment_id): ...
+
+    enroll_student.delay(payment_id=payment.id)    # inserts a Job row
+
+`manage.py run_jobs` claims due jobs and runs them on a thread or process
+pool. Claiming is a conditional UPDATE, so several workers can share one
+table. A claimed job is hidden from other workers until its visibility
+timeout passes; if the worker dies it is picked up again. Failures are
+retried with exponential backoff until max_attempts, then kept as 'failed'.
+
+Jobs are enqueued inside the caller's transaction: a rolled-back request
+leaves no job behind. Tasks must be idempotent, as a job whose worker dies
+mid-run runs again.
+"""
+import logging
+import random
+import traceback
+import uuid
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'EAGER': False,              # run tasks inline on delay() (development without a worker)
+    'MAX_ATTEMPTS': 5,
+    'VISIBILITY_TIMEOUT': 300,   # seconds a claimed job stays hidden from other workers
+    'BACKOFF': 10,               # first retry delay in seconds, doubled after every failure
+    'MAX_BACKOFF': 3600,
+}
+
+tasks = {}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'EDUPRO_JOBS', {})}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, atomic):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.atomic = atomic
+
+    def __call__(self, **payload):
+        return self.func(**payload)
+
+    def delay(self, delay=0, **payload):
+        """Queues the task with keyword arguments (JSON-serialisable) to run after `delay` seconds."""
+        return enqueue(self.name, payload, delay=delay, max_attempts=self.max_attempts)
+
+
+def task(name=None, max_attempts=None, atomic=True):
+    """
+    Registers a function as a task; its arguments must be JSON-serialisable
+    keywords. Tasks run in one transaction unless atomic=False (for tasks that
+    commit in batches, and so must be able to resume after a partial run).
+    """
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__name__}', max_attempts, atomic)
+        tasks[registered.name] = registered
+        return registered
+    return register
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None):
+    config = get_config()
+    job = Job.objects.create(
+        task=name,
+        payload=payload or {},
+        max_attempts=max_attempts or config['MAX_ATTEMPTS'],
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    if config['EAGER'] and not delay:
+        token = claim_job(job.id)
+        if token:
+            execute(job.id, token)
+            job.refresh_from_db()
+    return job
+
+
+def _claimable(now):
+    return Q(run_at__lte=now) & (Q(status='queued') | Q(status='running', locked_until__lt=now))
+
+
+def claim_job(job_id):
+    """Claims one job; returns the claim token, or None if another worker got it first."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    claimed = Job.objects.filter(_claimable(now), id=job_id).update(
+        status='running',
+        attempts=F('attempts') + 1,
+        locked_by=token,
+        locked_until=now + timedelta(seconds=get_config()['VISIBILITY_TIMEOUT']),
+    )
+    return token if claimed else None
+
+
+def claim(limit):
+    """Claims up to `limit` due jobs, oldest first; returns [(job id, token)]."""
+    candidates = Job.objects.filter(_claimable(timezone.now())).order_by('run_at').values_list('id', flat=True)
+    claimed = []
+    for job_id in candidates[:limit * 2]:
+        token = claim_job(job_id)
+        if token:
+            claimed.append((job_id, token))
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def backoff(attempts):
+    config = get_config()
+    delay = min(config['BACKOFF'] * 2 ** (attempts - 1), config['MAX_BACKOFF'])
+    # Jitter keeps jobs that failed together (e.g. a database outage) from retrying together.
+    return delay * random.uniform(0.5, 1.0)
+
+
+def execute(job_id, token):
+    """Runs a claimed job and records the outcome; returns whether it succeeded."""
+    try:
+        job = Job.objects.get(id=job_id, locked_by=token)
+    except Job.DoesNotExist:
+        return False
+    # Only this claim may record the outcome; a claim that outlived its
+    # visibility timeout and was taken over must not overwrite the new one.
+    mine = Job.objects.filter(id=job_id, locked_by=token)
+    if job.attempts > job.max_attempts:
+        mine.update(status='failed', locked_until=None, finished_at=timezone.now())
+        return False
+    registered = tasks.get(job.task)
+    if registered is None:
+        mine.update(status='failed', last_error=f'Unknown task {job.task!r}', locked_until=None,
+                    finished_at=timezone.now())
+        return False
+    try:
+        # A failed attempt leaves no partial writes behind for the retry.
+        with transaction.atomic() if registered.atomic else nullcontext():
+            registered(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %s', job.id, job.task, job.attempts, exc_info=True)
+        if job.attempts >= job.max_attempts:
+            mine.update(status='failed', last_error=error, locked_until=None, finished_at=timezone.now())
+        else:
+            mine.update(status='queued', last_error=error, locked_until=None,
+                        run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)))
+        return False
+    mine.update(status='done', last_error='', locked_until=None, finished_at=timezone.now())
+    return True
@@ -0,0 +1,95 @@
+"""
+The Country -> State -> District hierarchy, built once and kept in the
+application cache under the 'locations' namespace (invalidated by the model
+signals whenever a location is added, renamed or removed).
+
+The tree is three id -> [[id, name], ...] maps, so the profile form can fetch
+it once and fill its dropdowns without a request per selection. Every JSON
+payload is encoded and gzipped when first built, and carries an ETag derived
+from the namespace version, so repeat requests cost a cache lookup or a 304.
+"""
+import gzip
+import json
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import cache
+from .models import Country, District, State
+
+
+NAMESPACE = 'locations'
+TIMEOUT = 24 * 60 * 60      # the tree only changes through invalidation
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _build_tree():
+    states, districts = {}, {}
+    for pk, country_id, name in State.objects.order_by('name').values_list('id', 'country_id', 'name'):
+        states.setdefault(country_id, []).append([pk, name])
+    for pk, state_id, name in District.objects.order_by('name').values_list('id', 'state_id', 'name'):
+        districts.setdefault(state_id, []).append([pk, name])
+    return {
+        'countries': [list(row) for row in Country.objects.order_by('name').values_list('id', 'name')],
+        'states': states,
+        'districts': districts,
+    }
+
+
+def get_tree():
+    return cache.get_or_set(NAMESPACE, ('tree',), _build_tree, timeout=TIMEOUT)
+
+
+def version():
+    return cache.namespace_version(NAMESPACE)
+
+
+def countries():
+    return get_tree()['countries']
+
+
+def states(country_id):
+    return get_tree()['states'].get(int(country_id), [])
+
+
+def districts(state_id):
+    return get_tree()['districts'].get(int(state_id), [])
+
+
+def _data(scope):
+    kind, _, parent = scope.partition(':')
+    if kind == 'states':
+        return [{'id': pk, 'name': name} for pk, name in states(parent)]
+    if kind == 'districts':
+        return [{'id': pk, 'name': name} for pk, name in districts(parent)]
+    return get_tree()
+
+
+def _encode(scope):
+    body = json.dumps(_data(scope), separators=(',', ':')).encode()
+    return body, gzip.compress(body, mtime=0)
+
+
+def json_response(request, scope, max_age):
+    """
+    JSON for 'tree', 'states:<country id>' or 'districts:<state id>'.
+    max_age=None marks the response immutable (for version-stamped URLs).
+    """
+    # Weak, because the same ETag is sent for the gzipped and plain bodies.
+    etag = f'W/"{NAMESPACE}-{version()}-{scope}"'
+    if etag[2:] in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        body, compressed = cache.get_or_set(NAMESPACE, ('json', scope), lambda: _encode(scope), timeout=TIMEOUT)
+        response = HttpResponse(content_type='application/json')
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response['Content-Encoding'] = 'gzip'
+            body = compressed
+        response.content = body
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if max_age is None:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
@@ -0,0 +1,48 @@
+"""
+Management command to create the missing profiles of existing users
+Usage: python manage.py backfill_profiles --batch-size 2000
+
+New users get a profile from the post_save signal in main/signals.py; run this
+once after deploying it for accounts created before, which get a student
+profile like the old lazy get_or_create gave them. Safe to run again.
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from main import cache
+from main.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Create a student profile for every user without one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Users per INSERT (default: 2000)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the users without a profile')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        missing = User.objects.filter(profile__isnull=True).order_by('pk')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{missing.count():,} users have no profile'))
+            return
+
+        created, last_id = 0, 0
+        while True:
+            # Keyset batches: each one starts after the last user handled.
+            ids = list(missing.filter(pk__gt=last_id).values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            # ignore_conflicts: a profile created meanwhile by a login is kept.
+            Profile.objects.bulk_create([Profile(user_id=user_id) for user_id in ids], ignore_conflicts=True)
+            created += len(ids)
+            last_id = ids[-1]
+        if created:
+            # bulk_create skips the signals that normally invalidate the cached people lists.
+            cache.invalidate('people')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created:,} profiles in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,138 @@
+"""
+Management command to compare progress-heartbeat throughput of a single
+uvicorn (ASGI) worker against a single gunicorn (WSGI) worker
+Usage: python manage.py bench_heartbeats --concurrency 100 --duration 20
+Seed accounts first with: python manage.py seed_load --prefix load
+"""
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from .loadtest import PERCENTILES, Command as LoadTestCommand, LoadStats, VirtualUser
+
+
+class HeartbeatUser(VirtualUser):
+    """A logged-in student sending nothing but progress heartbeats."""
+
+    def student_journey(self):
+        course_id, video_ids = self.rng.choice(self.account['courses'])
+        if not video_ids:
+            return
+        self.request('update_video_progress', 'post', f'/student/video/{self.rng.choice(video_ids)}/progress/',
+                     expected=(200,), data={
+                         'progress': self.rng.randint(0, 99),
+                         'completed': 'false',
+                         'time_spent': self.rng.randint(0, 3600),
+                     })
+
+
+class Command(BaseCommand):
+    help = 'Measure how many concurrent progress heartbeats one ASGI (uvicorn) and one WSGI (gunicorn) worker sustain'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', type=str, default='asgi,wsgi', help='Servers to benchmark, in order (default: asgi,wsgi)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent students sending heartbeats (default: 50)')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds per server (default: 20)')
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='gunicorn gthread threads for the WSGI worker (default: 8)')
+        parser.add_argument('--port', type=int, default=8765, help='Port the servers are started on (default: 8765)')
+        parser.add_argument('--prefix', type=str, default='load', help='Username prefix used by seed_load (default: load)')
+        parser.add_argument('--password', type=str, default='password123', help='Password of the seeded accounts')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds (default: 30)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for account and video selection')
+
+    def handle(self, *args, **options):
+        servers = [name.strip() for name in options['servers'].split(',') if name.strip()]
+        unknown = set(servers) - {'asgi', 'wsgi'}
+        if unknown:
+            raise CommandError(f'Unknown servers: {", ".join(sorted(unknown))}')
+
+        accounts = LoadTestCommand().pick_accounts(
+            {'prefix': options['prefix'], 'users': options['concurrency']}, {'student': 1}, random.Random(options['seed'])
+        )
+        results = {}
+        for server in servers:
+            self.stdout.write(f'{server}: {options["concurrency"]} concurrent students for {options["duration"]}s...')
+            with self.serve(server, options) as base_url:
+                results[server] = self.run(base_url, accounts, options)
+        self.print_report(results)
+
+    def server_command(self, server, options):
+        bind = f'127.0.0.1:{options["port"]}'
+        if server == 'asgi':
+            return [sys.executable, '-m', 'uvicorn', 'EduPro.asgi:application', '--host', '127.0.0.1',
+                    '--port', str(options['port']), '--workers', '1', '--lifespan', 'off', '--log-level', 'warning']
+        return [sys.executable, '-m', 'gunicorn', 'EduPro.wsgi:application', '--bind', bind, '--workers', '1',
+                '--worker-class', 'gthread', '--threads', str(options['wsgi_threads']), '--log-level', 'warning']
+
+    @contextmanager
+    def serve(self, server, options):
+        try:
+            process = subprocess.Popen(self.server_command(server, options))
+        except OSError as exc:
+            raise CommandError(f'Could not start the {server} server: {exc}')
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                if process.poll() is not None:
+                    raise CommandError(f'The {server} server exited with code {process.returncode}; is it installed?')
+                try:
+                    socket.create_connection(('127.0.0.1', options['port']), timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise CommandError(f'The {server} server did not start listening within 30s')
+                    time.sleep(0.2)
+            yield f'http://127.0.0.1:{options["port"]}'
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def run(self, base_url, accounts, options):
+        stats = LoadStats()
+        users = [
+            HeartbeatUser(base_url, account, stats, {**options, 'think_time': 0}, random.Random(f'{options["seed"]}:{i}'))
+            for i, account in enumerate(accounts)
+        ]
+        # Log everyone in first so the measured window holds only heartbeats.
+        logged_in = [user for user in users if user.login()]
+        if not logged_in:
+            raise CommandError('No student could log in; check --prefix and --password.')
+        stats.samples.clear()
+        stats.errors.clear()
+
+        deadline = time.monotonic() + options['duration']
+        threads = [threading.Thread(target=self.loop, args=(user, deadline), daemon=True) for user in logged_in]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        rows = stats.summary(time.perf_counter() - started)
+        return rows[0] if rows else None
+
+    def loop(self, user, deadline):
+        while time.monotonic() < deadline:
+            try:
+                user.student_journey()
+            except requests.RequestException:
+                pass
+
+    def print_report(self, results):
+        header = f'{"server":<8} {"reqs":>7} {"errs":>5} {"rps":>8}' + ''.join(f' {"p" + str(p):>8}' for p in PERCENTILES)
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for server, row in results.items():
+            if row is None:
+                self.stdout.write(f'{server:<8} no requests completed')
+                continue
+            self.stdout.write(
+                f'{server:<8} {row["requests"]:>7} {row["errors"]:>5} {row["rps"]:>8.1f}'
+                + ''.join(f' {row[f"p{p}_ms"]:>6.0f}ms' for p in PERCENTILES)
+            )
@@ -0,0 +1,82 @@
+"""
+Management command to compare login and dashboard throughput across session engines
+Usage: python manage.py bench_sessions --users 50 --requests 500
+Seed data first with: python manage.py seed_load --prefix load
+
+Seeded students are logged in with django.contrib.auth.login() and then load
+their dashboard through the full middleware stack (test client, in-process),
+once with each engine of settings.SESSION_ENGINES. Password hashing is left
+out of the logins: it costs the same under every engine. "session q/req"
+counts the SQL statements that touch django_session.
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = 'Benchmark logins and student dashboard requests under each session engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Students logged in per engine (default: 20)')
+        parser.add_argument('--requests', type=int, default=200, help='Dashboard requests per engine (default: 200)')
+        parser.add_argument('--engine', action='append', choices=sorted(settings.SESSION_ENGINES),
+                            help='Engine to benchmark (repeatable; default: all)')
+        parser.add_argument('--prefix', type=str, default='load', help='Username prefix used by seed_load (default: load)')
+
+    def handle(self, *args, **options):
+        students = list(User.objects.filter(username__startswith=f'{options["prefix"]}_student')
+                        .order_by('id')[:options['users']])
+        if not students:
+            raise CommandError(f'No "{options["prefix"]}_student*" accounts found; run seed_load first.')
+
+        url = reverse('student_dashboard')
+        results = {}
+        for name in options['engine'] or list(settings.SESSION_ENGINES):
+            with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[name], ALLOWED_HOSTS=['testserver']):
+                caches[settings.SESSION_CACHE_ALIAS].clear()
+                clients = [Client() for _ in students]
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    for client, student in zip(clients, students):
+                        client.force_login(student)
+                    login_time = time.perf_counter() - start
+                login_queries = self.session_queries(ctx) / len(students)
+
+                response = clients[0].get(url)  # warms the dashboard's cached data
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code} with the {name} engine')
+                timings = []
+                with CaptureQueriesContext(connection) as ctx:
+                    for i in range(options['requests']):
+                        start = time.perf_counter()
+                        clients[i % len(clients)].get(url)
+                        timings.append(time.perf_counter() - start)
+                results[name] = (
+                    len(students) / login_time, login_queries, len(timings) / sum(timings),
+                    statistics.median(timings), len(ctx.captured_queries) / len(timings),
+                    self.session_queries(ctx) / len(timings),
+                )
+                for client in clients:
+                    client.logout()  # deletes the benchmark's session rows
+
+        self.stdout.write(f'{"":16}{"logins/s":>10}{"session q":>11}{"dash req/s":>12}{"dash p50":>10}'
+                          f'{"queries/req":>13}{"session q/req":>15}')
+        for name, (logins, login_queries, rps, p50, queries, session_queries) in results.items():
+            self.stdout.write(
+                f'{name:16}{logins:>10.0f}{login_queries:>11.1f}{rps:>12.0f}{p50 * 1000:>8.1f}ms'
+                f'{queries:>13.1f}{session_queries:>15.1f}'
+            )
+        fastest = max(results, key=lambda name: results[name][2])
+        self.stdout.write(self.style.SUCCESS(f'Fastest dashboard throughput: {fastest}'))
+
+    def session_queries(self, ctx):
+        return sum('django_session' in query['sql'] for query in ctx.captured_queries)
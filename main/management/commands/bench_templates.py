@@ -0,0 +1,84 @@
+"""
+Management command to compare manager dashboard render time with and without cached template fragments
+Usage: python manage.py bench_templates --requests 200
+Seed data first with: python manage.py seed_load --prefix load
+
+The dashboard view is called in-process as a seeded manager, so the numbers
+are rendering and query time only, without HTTP or middleware. The view's
+own cached data is warmed before each run; the runs differ only in whether
+{% cachefragment %} serves stored fragments.
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template.backends.django import Template as DjangoTemplate
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+
+from main.views import manager_dashboard
+
+
+class Command(BaseCommand):
+    help = 'Benchmark manager dashboard rendering with template fragment caching off and on'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Dashboard renders per run (default: 100)')
+        parser.add_argument('--prefix', type=str, default='load', help='Username prefix used by seed_load (default: load)')
+
+    def handle(self, *args, **options):
+        manager = User.objects.filter(username=f'{options["prefix"]}_manager0').first()
+        if manager is None:
+            raise CommandError(f'No "{options["prefix"]}_manager0" account found; run seed_load first.')
+
+        url = reverse('manager_dashboard')
+        request = RequestFactory().get(url)
+        request.user = manager
+        request.resolver_match = resolve(url)
+
+        render_times = []
+        original_render = DjangoTemplate.render
+
+        def timed_render(template, context=None, request=None):
+            start = time.perf_counter()
+            try:
+                return original_render(template, context, request)
+            finally:
+                render_times.append(time.perf_counter() - start)
+
+        results = {}
+        DjangoTemplate.render = timed_render
+        try:
+            for label, fragments in (('before (no fragments)', False), ('after (fragments)', True)):
+                config = {**getattr(settings, 'EDUPRO_CACHE', {}), 'FRAGMENTS': fragments}
+                with override_settings(EDUPRO_CACHE=config):
+                    manager_dashboard(request)  # warms the view's cached data and the fragments
+                    render_times.clear()
+                    totals = []
+                    with CaptureQueriesContext(connection) as ctx:
+                        for _ in range(options['requests']):
+                            start = time.perf_counter()
+                            manager_dashboard(request).content
+                            totals.append(time.perf_counter() - start)
+                    results[label] = (list(render_times), totals, len(ctx.captured_queries) / options['requests'])
+        finally:
+            DjangoTemplate.render = original_render
+
+        self.stdout.write(f'{"":24}{"render p50":>12}{"render p95":>12}{"view p50":>12}{"queries":>10}')
+        for label, (renders, totals, queries) in results.items():
+            self.stdout.write(
+                f'{label:24}{self.ms(statistics.median(renders)):>12}{self.ms(self.p95(renders)):>12}'
+                f'{self.ms(statistics.median(totals)):>12}{queries:>10.1f}'
+            )
+        before, after = (statistics.median(r[0]) for r in results.values())
+        self.stdout.write(self.style.SUCCESS(f'Fragment caching renders the dashboard {before / after:.1f}x faster'))
+
+    def p95(self, values):
+        return sorted(values)[int(len(values) * 0.95) - 1] if len(values) > 1 else values[0]
+
+    def ms(self, seconds):
+        return f'{seconds * 1000:.1f} ms'
@@ -4,7 +4,7 @@ Usage: python manage.py create_user --username manager1 --email manager@example.
 """
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from main.models import Profile
+from main.models import get_profile
 
 
 class Command(BaseCommand):
@@ -46,7 +46,7 @@ class Command(BaseCommand):
         )
 
         # Set role in profile
-        profile, created = Profile.objects.get_or_create(user=user)
+        profile = get_profile(user)
         
         if role == 'manager':
             profile.is_instructor = True
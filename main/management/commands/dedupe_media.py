@@ -0,0 +1,57 @@
+"""
+Management command to move course media stored before blobs into the shared blob store
+Usage: python manage.py dedupe_media --dry-run
+       python manage.py dedupe_media && python manage.py gc_media
+
+Each file a blob-backed field points at is hashed into a blob and the row is
+repointed at it, so copies of the same video collapse into one. The old files
+are left in place until gc_media finds nothing referencing them.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from main.models import Course, CourseVideo
+from main.storage import ContentAddressedStorage, is_blob
+
+
+class Command(BaseCommand):
+    help = 'Repoint course thumbnails and videos at deduplicated content-addressed blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the files that would be moved')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        moved, missing, blobs = 0, 0, set()
+        for model in (Course, CourseVideo):
+            for field in model._meta.concrete_fields:
+                if not (isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)):
+                    continue
+                storage = field.storage
+                # all_objects: soft-deleted courses keep their files until their purge.
+                rows = model.all_objects.exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+                for pk, name in rows.values_list('pk', field.attname).iterator():
+                    if is_blob(name):
+                        continue
+                    if not storage.exists(name):
+                        missing += 1
+                        self.stderr.write(f'Missing file for {model.__name__} {pk}: {name}')
+                        continue
+                    moved += 1
+                    if options['dry_run']:
+                        continue
+                    with storage.open(name) as f:
+                        blob = storage.save(name, f)
+                    # Conditional, so a file replaced meanwhile through the site is not overwritten.
+                    if model.all_objects.filter(pk=pk, **{field.attname: name}).update(**{field.attname: blob}):
+                        blobs.add(blob)
+                    else:
+                        storage.release(blob)
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        shared = '' if options['dry_run'] else f' into {len(blobs):,} blobs'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {moved:,} files{shared}; {missing:,} missing; {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,127 @@
+"""
+Management command to delete (or quarantine) media files no database row refers to
+Usage: python manage.py gc_media --dry-run
+       python manage.py gc_media --quarantine /var/tmp/edupro-orphans --workers 8
+
+Files are orphaned when a course, video or thumbnail is replaced (the old file
+stays on disk) or when a purge is interrupted. Every FileField/ImageField of
+every model is read, including soft-deleted rows still waiting for a purge.
+Shared blobs (main/storage.py) are removed here too, once no row points at
+them, along with their MediaBlob counts.
+"""
+import fnmatch
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from main.models import MediaBlob
+from main.storage import is_blob
+
+
+# Shipped with the repository and referenced by seed data, not by uploads.
+KEEP = ['thumbnails/default-thumbnail.png']
+
+
+def _size(nbytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if nbytes < 1024 or unit == 'GB':
+            return f'{nbytes:,.0f} {unit}' if unit == 'B' else f'{nbytes:,.1f} {unit}'
+        nbytes /= 1024
+
+
+class Command(BaseCommand):
+    help = 'Delete or quarantine files under MEDIA_ROOT that no FileField/ImageField references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+        parser.add_argument('--quarantine', type=str, default='',
+                            help='Move orphans into this directory (keeping their paths) instead of deleting them')
+        parser.add_argument('--min-age', type=float, default=3600,
+                            help='Skip files modified in the last N seconds; their rows may not be committed yet (default: 3600)')
+        parser.add_argument('--keep', action='append', default=list(KEEP),
+                            help='Glob of media paths never removed (repeatable)')
+        parser.add_argument('--workers', type=int, default=4, help='Files deleted or moved in parallel (default: 4)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per query while reading references')
+
+    def handle(self, *args, **options):
+        root = os.path.abspath(settings.MEDIA_ROOT)
+        if not os.path.isdir(root):
+            raise CommandError(f'MEDIA_ROOT {root} does not exist.')
+        quarantine = os.path.abspath(options['quarantine']) if options['quarantine'] else ''
+        if quarantine and (quarantine == root or quarantine.startswith(root + os.sep)):
+            raise CommandError('--quarantine must be outside MEDIA_ROOT.')
+
+        started = time.perf_counter()
+        referenced = self.referenced_paths(options['chunk_size'])
+        cutoff = time.time() - options['min_age']
+        scanned, orphans = 0, []
+        for path, relative, stat in self.walk(root):
+            scanned += 1
+            if relative in referenced or stat.st_mtime > cutoff:
+                continue
+            if any(fnmatch.fnmatch(relative, pattern) for pattern in options['keep']):
+                continue
+            orphans.append((path, relative, stat.st_size))
+
+        removed, reclaimed = len(orphans), sum(size for _, _, size in orphans)
+        verb = 'Would remove' if options['dry_run'] else ('Quarantined' if quarantine else 'Deleted')
+        if options['dry_run']:
+            for _, relative, size in orphans:
+                self.stdout.write(f'  {relative} ({_size(size)})')
+        else:
+            with ThreadPoolExecutor(max(1, options['workers'])) as pool:
+                errors = list(pool.map(lambda orphan: self.remove(orphan, quarantine), orphans))
+            for (_, _, size), error in zip(orphans, errors):
+                if error:
+                    self.stderr.write(error)
+                    removed, reclaimed = removed - 1, reclaimed - size
+            blobs = [relative for (_, relative, _), error in zip(orphans, errors) if not error and is_blob(relative)]
+            MediaBlob.objects.filter(name__in=blobs).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed:,} of {scanned:,} files ({_size(reclaimed)}); '
+            f'{len(referenced):,} paths referenced; {time.perf_counter() - started:.1f}s'
+        ))
+
+    def referenced_paths(self, chunk_size):
+        referenced = set()
+        for model in apps.get_models():
+            fields = [f.name for f in model._meta.concrete_fields if isinstance(f, models.FileField)]
+            if not fields:
+                continue
+            # The base manager also sees soft-deleted rows whose files must survive until their purge.
+            rows = model._base_manager.values_list(*fields).iterator(chunk_size=chunk_size)
+            for row in rows:
+                referenced.update(name for name in row if name)
+        return referenced
+
+    def walk(self, root):
+        """Yields (path, path relative to root with '/' separators, stat) without listing whole trees up front."""
+        stack = [root]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        relative = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                        yield entry.path, relative, entry.stat(follow_symlinks=False)
+
+    def remove(self, orphan, quarantine):
+        path, relative, _ = orphan
+        try:
+            if quarantine:
+                target = os.path.join(quarantine, relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+            else:
+                os.remove(path)
+        except OSError as exc:
+            return f'Could not remove {relative}: {exc}'
+        return None
@@ -0,0 +1,174 @@
+"""
+Management command to bulk provision managers, trainers and students from CSV
+Usage: python manage.py import_users users.csv --workers 8 --batch-size 1000
+       python manage.py import_users trainers.csv --send-invites
+
+The CSV has username,email,password,role,first_name,last_name columns (role is
+manager, trainer or student; student when empty). Passwords are hashed with
+the configured hasher on a process pool, then users and their profiles are
+inserted with bulk_create. Rows whose username or email already exists are
+skipped, so the same file can be loaded again safely.
+
+With --send-invites no password is hashed: the users get an unusable password
+and a background job emails each of them a link to choose one.
+"""
+import csv
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from main import cache, tasks
+from main.models import Profile
+
+
+ROLE_FLAGS = {
+    'manager': {'is_instructor': True, 'is_trainer': False, 'is_student': False},
+    'trainer': {'is_instructor': False, 'is_trainer': True, 'is_student': False},
+    'student': {'is_instructor': False, 'is_trainer': False, 'is_student': True},
+}
+
+# Usernames or emails per IN (...) lookup while looking for existing rows.
+LOOKUP_CHUNK = 1000
+
+
+def _init_hasher():
+    # Spawned workers start with a fresh interpreter; hashing only needs settings.
+    django.setup()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users, trainers and managers with their profiles from CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='CSV file (username,email,password,role,first_name,last_name)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes hashing passwords (default: one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT (default: 1000)')
+        parser.add_argument('--send-invites', action='store_true',
+                            help='Skip hashing; email every imported user a link to set their password')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                rows = list(self.read_csv(f))
+        except OSError as exc:
+            raise CommandError(f'Could not read {options["path"]}: {exc}')
+        except ValueError as exc:
+            raise CommandError(f'{options["path"]} is not a valid user file: {exc}')
+
+        started = time.perf_counter()
+        rows, skipped = self.new_rows(rows, options['send_invites'])
+        if not rows:
+            self.stdout.write(self.style.WARNING(f'Nothing to import; {skipped:,} rows skipped'))
+            return
+
+        hashing_started = time.perf_counter()
+        if options['send_invites']:
+            # make_password(None) is an unusable password and costs no hashing.
+            hashes = [make_password(None) for _ in rows]
+        else:
+            hashes = self.hash_passwords([row['password'] for row in rows], options['workers'], options['batch_size'])
+        hashing = time.perf_counter() - hashing_started
+
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(username=row['username'], email=row['email'], password=password,
+                     first_name=row['first_name'], last_name=row['last_name'])
+                for row, password in zip(rows, hashes)
+            ], batch_size=batch_size)
+            # bulk_create does not return ids on MySQL, so they are read back.
+            user_ids = {}
+            for chunk in _chunks([row['username'] for row in rows], LOOKUP_CHUNK):
+                user_ids.update(User.objects.filter(username__in=chunk).values_list('username', 'id'))
+            Profile.objects.bulk_create([
+                Profile(user_id=user_ids[row['username']], **ROLE_FLAGS[row['role']]) for row in rows
+            ], batch_size=batch_size)
+            if options['send_invites']:
+                ids = [user_ids[row['username']] for row in rows if row['email']]
+                for chunk in _chunks(ids, batch_size):
+                    tasks.send_set_password_links.delay(user_ids=chunk)
+        # bulk_create skips the signals that normally invalidate the cached people lists.
+        cache.invalidate('people')
+
+        elapsed = time.perf_counter() - started
+        roles = {role: sum(row['role'] == role for row in rows) for role in ROLE_FLAGS}
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {len(rows):,} users ({roles["manager"]:,} managers, {roles["trainer"]:,} trainers, '
+            f'{roles["student"]:,} students); {skipped:,} skipped; hashing {hashing:.1f}s; '
+            f'{elapsed:.1f}s total, {len(rows) / elapsed:,.0f} rows/s'
+        ))
+        if options['send_invites']:
+            self.stdout.write('Set-password links are sent by run_jobs.')
+
+    def new_rows(self, rows, send_invites):
+        """Drops duplicate, existing and password-less rows; returns (rows, number skipped)."""
+        usernames, emails = set(), set()
+        for chunk in _chunks([row['username'] for row in rows], LOOKUP_CHUNK):
+            usernames.update(User.objects.filter(username__in=chunk).values_list('username', flat=True))
+        wanted = [row['email'].lower() for row in rows if row['email']]
+        for chunk in _chunks(wanted, LOOKUP_CHUNK):
+            emails.update(
+                User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=chunk)
+                .values_list('email_lower', flat=True)
+            )
+
+        new = []
+        for row in rows:
+            email = row['email'].lower()
+            if row['username'] in usernames or (email and email in emails):
+                continue
+            if not row['password'] and not send_invites:
+                self.stderr.write(f'No password for "{row["username"]}"; use --send-invites to email a link instead')
+                continue
+            usernames.add(row['username'])
+            if email:
+                emails.add(email)
+            new.append(row)
+        return new, len(rows) - len(new)
+
+    def hash_passwords(self, passwords, workers, batch_size):
+        chunk_size = max(1, min(batch_size, len(passwords) // (workers * 4) or 1))
+        if workers <= 1:
+            return _hash_passwords(passwords)
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_hasher) as pool:
+            hashed = pool.map(_hash_passwords, _chunks(passwords, chunk_size))
+            return [password for chunk in hashed for password in chunk]
+
+    def read_csv(self, f):
+        reader = csv.DictReader(f)
+        fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if 'username' not in fields:
+            raise ValueError('missing the "username" column')
+        for line, row in enumerate(reader, start=2):
+            values = {
+                column: (row.get(fields.get(column)) or '').strip()
+                for column in ('username', 'email', 'role', 'first_name', 'last_name')
+            }
+            values['password'] = row.get(fields.get('password')) or ''  # not stripped: spaces may be part of it
+            if not values['username']:
+                continue
+            values['role'] = values['role'].lower() or 'student'
+            if values['role'] not in ROLE_FLAGS:
+                raise ValueError(f'line {line}: unknown role "{values["role"]}"')
+            yield values
@@ -0,0 +1,109 @@
+"""
+Management command to bulk import countries, states and districts
+Usage: python manage.py load_locations locations.csv --batch-size 5000
+
+The file is either a CSV with country,state,district columns (one district
+per row) or JSON shaped {"India": {"Tamil Nadu": ["Chennai", ...]}}.
+Existing locations are kept, so the same file can be loaded again safely.
+"""
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main import cache
+from main.models import Country, District, State
+
+
+class Command(BaseCommand):
+    help = 'Bulk import a Country -> State -> District dataset from CSV or JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='CSV (country,state,district) or nested JSON file')
+        parser.add_argument('--format', choices=['csv', 'json'], help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT (default: 2000)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('json' if path.lower().endswith('.json') else 'csv')
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                rows = list(self.read_json(f) if file_format == 'json' else self.read_csv(f))
+        except OSError as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+        except (ValueError, AttributeError) as exc:
+            raise CommandError(f'{path} is not a valid location {file_format} file: {exc}')
+
+        countries, states, districts = set(), set(), set()
+        for country, state, district in rows:
+            countries.add(country)
+            if state:
+                states.add((country, state))
+                if district:
+                    districts.add((country, state, district))
+
+        started = time.perf_counter()
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            country_ids, new_countries = self.load(
+                Country, {name: {'name': name} for name in countries},
+                lambda: {name: pk for pk, name in Country.objects.values_list('id', 'name')},
+                batch_size,
+            )
+            state_ids, new_states = self.load(
+                State, {key: {'country_id': country_ids[key[0]], 'name': key[1]} for key in states},
+                lambda: {
+                    (country, state): pk
+                    for pk, country, state in State.objects.values_list('id', 'country__name', 'name')
+                },
+                batch_size,
+            )
+            _, new_districts = self.load(
+                District, {key: {'state_id': state_ids[key[:2]], 'name': key[2]} for key in districts},
+                lambda: {
+                    (country, state, district): pk
+                    for pk, country, state, district in District.objects.values_list(
+                        'id', 'state__country__name', 'state__name', 'name'
+                    )
+                },
+                batch_size,
+            )
+        # bulk_create skips the signals that normally invalidate the cached tree.
+        cache.invalidate('locations')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {new_countries} countries, {new_states} states and {new_districts} districts '
+            f'({len(countries)}/{len(states)}/{len(districts)} in file) in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def load(self, model, wanted, existing, batch_size):
+        """Creates the missing rows of one level; returns ({key: id}, number created)."""
+        ids = existing()
+        missing = [model(**fields) for key, fields in wanted.items() if key not in ids]
+        if not missing:
+            return ids, 0
+        model.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+        return existing(), len(missing)
+
+    def read_csv(self, f):
+        reader = csv.DictReader(f)
+        fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if 'country' not in fields:
+            raise ValueError('missing the "country" column')
+        for row in reader:
+            values = [(row.get(fields.get(column)) or '').strip() for column in ('country', 'state', 'district')]
+            if values[0]:
+                yield values
+
+    def read_json(self, f):
+        data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError('expected an object of {country: {state: [districts]}}')
+        for country, states in data.items():
+            yield country.strip(), '', ''
+            for state, districts in (states or {}).items():
+                yield country.strip(), state.strip(), ''
+                for district in districts or []:
+                    yield country.strip(), state.strip(), district.strip()
@@ -0,0 +1,276 @@
+"""
+Management command to drive scripted student, trainer and manager journeys
+against a running server and report throughput and latency per endpoint
+Usage: python manage.py loadtest --base-url http://127.0.0.1:8000 --users 50 --duration 60
+Seed accounts first with: python manage.py seed_load --prefix load
+"""
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Enrollment, CourseVideo, TrainerCourseAssignment, Payment
+
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class LoadStats:
+    """Thread-safe latency samples and error counts per endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.samples[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        rows = []
+        for endpoint in sorted(self.samples):
+            values = sorted(self.samples[endpoint])
+            row = {
+                'endpoint': endpoint,
+                'requests': len(values),
+                'errors': self.errors[endpoint],
+                'rps': len(values) / elapsed if elapsed else 0.0,
+                'max_ms': values[-1] * 1000,
+            }
+            for pct in PERCENTILES:
+                row[f'p{pct}_ms'] = percentile(values, pct) * 1000
+            rows.append(row)
+        return rows
+
+
+class VirtualUser:
+    """One logged-in browser session walking a role's journey in a loop."""
+
+    def __init__(self, base_url, account, stats, options, rng):
+        self.base_url = base_url.rstrip('/')
+        self.account = account
+        self.stats = stats
+        self.options = options
+        self.rng = rng
+        self.session = requests.Session()
+
+    def request(self, endpoint, method, path, expected=(200, 302), **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', self.options['timeout'])
+        csrf = self.session.cookies.get('csrftoken')
+        if method == 'post' and csrf:
+            kwargs.setdefault('headers', {})['X-CSRFToken'] = csrf
+        start = time.perf_counter()
+        try:
+            response = getattr(self.session, method)(self.base_url + path, **kwargs)
+            ok = response.status_code in expected
+        except requests.RequestException:
+            response, ok = None, False
+        self.stats.record(endpoint, time.perf_counter() - start, ok)
+        return response
+
+    def login(self):
+        self.request('login_form', 'get', '/accounts/login/', expected=(200,))
+        response = self.request('login', 'post', '/accounts/login/', expected=(302,), data={
+            'login': self.account['username'],
+            'password': self.options['password'],
+            'csrfmiddlewaretoken': self.session.cookies.get('csrftoken', ''),
+        })
+        return response is not None and response.status_code == 302
+
+    def student_journey(self):
+        course_id, video_ids = self.rng.choice(self.account['courses'])
+        self.request('student_dashboard', 'get', '/student/dashboard/')
+        self.request('student_course_detail', 'get', f'/student/course/{course_id}/')
+        for video_id in video_ids:
+            watched = 0
+            for beat in range(self.options['heartbeats']):
+                watched += 10
+                self.request('update_video_progress', 'post', f'/student/video/{video_id}/progress/', expected=(200,), data={
+                    'progress': min(100, (beat + 1) * 100 // self.options['heartbeats']),
+                    'completed': 'true' if beat == self.options['heartbeats'] - 1 else 'false',
+                    'time_spent': watched,
+                })
+
+    def trainer_journey(self):
+        course_id = self.rng.choice(self.account['courses'])
+        self.request('trainer_dashboard', 'get', '/trainer/dashboard/')
+        if self.options['upload_size']:
+            self.request('trainer_upload_video', 'post', f'/trainer/course/{course_id}/upload-video/', data={
+                'title': f'Load test upload {self.rng.randrange(10 ** 6)}',
+                'order': 99,
+                'csrfmiddlewaretoken': self.session.cookies.get('csrftoken', ''),
+            }, files={'video': ('loadtest.mp4', os.urandom(self.options['upload_size']), 'video/mp4')})
+        self.request('trainer_course_students', 'get', f'/trainer/course/{course_id}/students/')
+
+    def manager_journey(self):
+        self.request('manager_dashboard', 'get', '/manager/dashboard/')
+        self.request('manager_view_payments', 'get', '/manager/view-payments/')
+        payments = self.account['payments']
+        if payments:
+            payment_id = payments.pop()
+            self.request('manager_update_payment', 'get', f'/manager/payment/{payment_id}/update/')
+            self.request('manager_update_payment_approve', 'post', f'/manager/payment/{payment_id}/update/', data={
+                'action': 'approve',
+                'notes': 'Approved by load test',
+                'csrfmiddlewaretoken': self.session.cookies.get('csrftoken', ''),
+            })
+
+    def run(self, deadline):
+        if not self.login():
+            return
+        journey = getattr(self, f'{self.account["role"]}_journey')
+        while time.monotonic() < deadline:
+            journey()
+            if self.options['think_time']:
+                time.sleep(self.rng.uniform(0, self.options['think_time']))
+
+
+class Command(BaseCommand):
+    help = 'Run scripted student, trainer and manager journeys against a running server and report RPS and latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', type=str, default='http://127.0.0.1:8000', help='Server to test (default: http://127.0.0.1:8000)')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users (default: 20)')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run (default: 30)')
+        parser.add_argument('--mix', type=str, default='student=80,trainer=10,manager=10',
+                            help='Percentage of virtual users per role (default: student=80,trainer=10,manager=10)')
+        parser.add_argument('--prefix', type=str, default='load', help='Username prefix used by seed_load (default: load)')
+        parser.add_argument('--password', type=str, default='password123', help='Password of the seeded accounts')
+        parser.add_argument('--heartbeats', type=int, default=5, help='Progress heartbeats sent per video (default: 5)')
+        parser.add_argument('--upload-size', type=int, default=64 * 1024,
+                            help='Bytes per trainer video upload; 0 disables uploads (default: 65536)')
+        parser.add_argument('--think-time', type=float, default=0, help='Max random pause between journeys in seconds (default: 0)')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds (default: 30)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for account and course selection')
+        parser.add_argument('--json', type=str, default='', help='Also write the report to this JSON file')
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        rng = random.Random(options['seed'])
+        accounts = self.pick_accounts(options, mix, rng)
+
+        stats = LoadStats()
+        deadline = time.monotonic() + options['duration']
+        users = [
+            VirtualUser(options['base_url'], account, stats, options, random.Random(f'{options["seed"]}:{i}'))
+            for i, account in enumerate(accounts)
+        ]
+        threads = [threading.Thread(target=user.run, args=(deadline,), daemon=True) for user in users]
+
+        self.stdout.write(f'Running {len(users)} virtual users against {options["base_url"]} for {options["duration"]}s...')
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        rows = stats.summary(elapsed)
+        self.print_report(rows, elapsed)
+        if options['json']:
+            with open(options['json'], 'w') as fh:
+                json.dump({'duration': elapsed, 'users': len(users), 'endpoints': rows}, fh, indent=2)
+
+    def parse_mix(self, value):
+        try:
+            mix = {role: int(share) for role, share in (item.split('=') for item in value.split(','))}
+        except ValueError:
+            raise CommandError('--mix must look like student=80,trainer=10,manager=10')
+        unknown = set(mix) - {'student', 'trainer', 'manager'}
+        if unknown:
+            raise CommandError(f'Unknown roles in --mix: {", ".join(sorted(unknown))}')
+        return mix
+
+    def pick_accounts(self, options, mix, rng):
+        """Builds one account per virtual user, with the ids its journey needs."""
+        prefix, total = options['prefix'], options['users']
+        share_total = sum(mix.values()) or 1
+        counts = {role: total * share // share_total for role, share in mix.items()}
+        # Hand rounding leftovers to the largest role keeps --users exact.
+        counts[max(mix, key=mix.get)] += total - sum(counts.values())
+
+        accounts = []
+        if counts.get('student'):
+            enrollments = list(Enrollment.objects.filter(
+                student__username__startswith=f'{prefix}_student'
+            ).order_by('id').values_list('student__username', 'course_id')[:counts['student'] * 20])
+            by_student = defaultdict(list)
+            for username, course_id in enrollments:
+                by_student[username].append(course_id)
+            if not by_student:
+                raise CommandError(f'No enrolled "{prefix}_student" accounts found; run seed_load first.')
+            videos = defaultdict(list)
+            for course_id, video_id in CourseVideo.objects.filter(
+                course_id__in={c for courses in by_student.values() for c in courses}
+            ).values_list('course_id', 'id'):
+                videos[course_id].append(video_id)
+            usernames = sorted(by_student)
+            for username in itertools.islice(itertools.cycle(usernames), counts['student']):
+                accounts.append({'role': 'student', 'username': username, 'courses': [
+                    (course_id, videos[course_id][:3]) for course_id in by_student[username]
+                ]})
+
+        if counts.get('trainer'):
+            assigned = defaultdict(list)
+            for username, course_id in TrainerCourseAssignment.objects.filter(
+                trainer__username__startswith=f'{prefix}_trainer'
+            ).values_list('trainer__username', 'course_id'):
+                assigned[username].append(course_id)
+            if not assigned:
+                raise CommandError(f'No "{prefix}_trainer" accounts with assigned courses found; run seed_load first.')
+            usernames = sorted(assigned)
+            for username in itertools.islice(itertools.cycle(usernames), counts['trainer']):
+                accounts.append({'role': 'trainer', 'username': username, 'courses': assigned[username]})
+
+        if counts.get('manager'):
+            managers = list(User.objects.filter(
+                username__startswith=f'{prefix}_manager', profile__is_instructor=True
+            ).order_by('id').values_list('username', flat=True))
+            if not managers:
+                raise CommandError(f'No "{prefix}_manager" accounts found; run seed_load first.')
+            pending = list(Payment.objects.filter(status='requested').values_list('id', flat=True))
+            rng.shuffle(pending)
+            n = counts['manager']
+            for i, username in enumerate(itertools.islice(itertools.cycle(managers), n)):
+                # Each manager approves a disjoint slice so approvals never collide.
+                accounts.append({'role': 'manager', 'username': username, 'payments': pending[i::n]})
+
+        rng.shuffle(accounts)
+        return accounts
+
+    def print_report(self, rows, elapsed):
+        header = f'{"endpoint":<32} {"reqs":>7} {"errs":>5} {"rps":>8}' + ''.join(
+            f' {"p" + str(p):>8}' for p in PERCENTILES) + f' {"max":>8}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in rows:
+            self.stdout.write(
+                f'{row["endpoint"]:<32} {row["requests"]:>7} {row["errors"]:>5} {row["rps"]:>8.1f}'
+                + ''.join(f' {row[f"p{p}_ms"]:>6.0f}ms' for p in PERCENTILES)
+                + f' {row["max_ms"]:>6.0f}ms'
+            )
+        total = sum(row['requests'] for row in rows)
+        errors = sum(row['errors'] for row in rows)
+        style = self.style.SUCCESS if not errors else self.style.WARNING
+        self.stdout.write(style(
+            f'{total} requests, {errors} errors in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} req/s)'
+        ))
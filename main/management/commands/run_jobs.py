@@ -0,0 +1,88 @@
+"""
+Management command to run queued background jobs (see main/jobs.py)
+Usage: python manage.py run_jobs --workers 4 --pool thread
+Run one or more of these next to the web server; stop with Ctrl+C or SIGTERM.
+"""
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from main import jobs
+
+
+def _init_worker():
+    # Spawned workers start with a fresh interpreter; forked ones already have
+    # Django configured but must not reuse the parent's DB connection.
+    django.setup()
+    connections.close_all()
+    # A signal to the worker pool is the parent's to handle.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _run_job(job_id, token):
+    import main.tasks  # noqa: F401  (registers the tasks in spawned workers)
+    try:
+        return jobs.execute(job_id, token)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs on a thread or process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs run at the same time (default: 4)')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='thread for I/O-bound jobs, process for CPU-bound ones (default: thread)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle (default: 1)')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling')
+
+    def handle(self, *args, **options):
+        import main.tasks  # noqa: F401
+        workers = max(1, options['workers'])
+        if options['pool'] == 'process':
+            connections.close_all()
+            context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+            pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker)
+        else:
+            pool = ThreadPoolExecutor(workers, thread_name_prefix='job')
+
+        self.stopping = False
+        previous = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+        results = {True: 0, False: 0}
+        running = set()
+        try:
+            with pool:
+                while not self.stopping:
+                    # Only claim what the pool can start now, so no claimed job
+                    # waits in a local queue while its visibility timeout runs out.
+                    claimed = jobs.claim(workers - len(running))
+                    close_old_connections()
+                    running.update(pool.submit(_run_job, job_id, token) for job_id, token in claimed)
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+                    finished, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        results[future.result()] += 1
+                # On shutdown, running jobs finish; nothing else was claimed.
+                for future in running:
+                    results[future.result()] += 1
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {results[True] + results[False]} jobs: {results[True]} succeeded, {results[False]} failed'
+        ))
+
+    def stop(self, signum, frame):
+        self.stdout.write('Stopping after the running jobs finish...')
+        self.stopping = True
@@ -0,0 +1,297 @@
+"""
+Management command to generate production-scale synthetic data for benchmarks
+Usage: python manage.py seed_load --students 50000 --courses 2000 --workers 4 --seed 42
+"""
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+import multiprocessing
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from main import cache
+from main.models import (
+    Course, Enrollment, Profile, CourseVideo, VideoProgress, TrainerRating,
+    VideoRating, TrainerContact, Feedback, TrainerCourseAssignment, Payment,
+    Country, State, District
+)
+
+
+CATEGORIES = [
+    'Web Development', 'Game Development', 'Software Development', 'Web Design',
+    'Graphic Design', 'Illustration', 'Animation', 'Digital Marketing',
+    'Content Marketing', 'Affiliate Marketing', 'Product Marketing',
+]
+LEVELS = [choice for choice, label in Course.LEVEL_CHOICES]
+PAYMENT_METHODS = [choice for choice, label in Payment.PAYMENT_METHOD_CHOICES]
+LOCATIONS = [
+    ('India', 'Tamil Nadu', 'Chennai'),
+    ('India', 'Tamil Nadu', 'Coimbatore'),
+    ('India', 'Karnataka', 'Bengaluru Urban'),
+    ('India', 'Maharashtra', 'Pune'),
+    ('India', 'Kerala', 'Ernakulam'),
+]
+
+# Students are generated in chunks; each chunk draws from its own RNG seeded
+# with (seed, chunk index) so the output is identical for any --workers value.
+STUDENT_CHUNK = 500
+
+
+def _rng(seed, *parts):
+    return random.Random(':'.join(str(p) for p in (seed,) + parts))
+
+
+def _init_worker():
+    # Spawned workers start with a fresh interpreter; forked ones already have
+    # Django configured but must not reuse the parent's DB connection.
+    django.setup()
+    connections.close_all()
+
+
+def _seed_student_chunk(plan, chunk):
+    """Creates enrollments, payments, progress, ratings and feedback for one chunk of students."""
+    rng = _rng(plan['seed'], 'students', chunk)
+    first = chunk * STUDENT_CHUNK
+    last = min(first + STUDENT_CHUNK, plan['students'])
+    vpc = plan['videos_per_course']
+    now = timezone.now()
+
+    enrollments, memberships, payments = [], [], []
+    progress, feedback, video_ratings, trainer_ratings = [], [], [], []
+    Membership = Course.students.through
+
+    for i in range(first, last):
+        student_id = plan['student_base'] + i
+        per_student = min(plan['enrollments_per_student'], plan['courses'])
+        for course_index in rng.sample(range(plan['courses']), per_student):
+            course_id = plan['course_base'] + course_index
+            enrollments.append(Enrollment(student_id=student_id, course_id=course_id))
+            memberships.append(Membership(user_id=student_id, course_id=course_id))
+            payments.append(Payment(
+                student_id=student_id, course_id=course_id, amount=plan['prices'][course_index],
+                payment_method=rng.choice(PAYMENT_METHODS), status='approved',
+                approved_by_id=plan['manager_base'], approved_at=now,
+            ))
+
+            first_video = plan['video_base'] + course_index * vpc
+            watched = rng.randint(0, vpc)
+            for n in range(watched):
+                pct = 100 if n < watched - 1 else rng.randint(1, 100)
+                progress.append(VideoProgress(
+                    student_id=student_id, video_id=first_video + n, progress_percentage=pct,
+                    completed=pct == 100, time_spent_seconds=rng.randint(30, 3600),
+                ))
+            if watched and rng.random() < plan['rating_ratio']:
+                video_ratings.append(VideoRating(
+                    video_id=first_video, student_id=student_id, rating=rng.randint(1, 5),
+                ))
+            if rng.random() < plan['rating_ratio']:
+                feedback.append(Feedback(
+                    student_id=student_id, course_id=course_id, rating=rng.randint(1, 5),
+                    comment='Synthetic feedback',
+                ))
+
+        if plan['trainers'] and rng.random() < plan['rating_ratio']:
+            trainer_ratings.append(TrainerRating(
+                trainer_id=plan['trainer_base'] + rng.randrange(plan['trainers']),
+                student_id=student_id, rating=rng.randint(1, 5),
+            ))
+        if rng.random() < plan['pending_payment_ratio']:
+            course_index = rng.randrange(plan['courses'])
+            payments.append(Payment(
+                student_id=student_id, course_id=plan['course_base'] + course_index,
+                amount=plan['prices'][course_index], payment_method=rng.choice(PAYMENT_METHODS),
+                status=rng.choice(['requested', 'requested', 'rejected']),
+            ))
+
+    batch_size = plan['batch_size']
+    counts = {}
+    with transaction.atomic():
+        for model, objs in (
+            (Enrollment, enrollments), (Membership, memberships), (Payment, payments),
+            (VideoProgress, progress), (Feedback, feedback),
+            (VideoRating, video_ratings), (TrainerRating, trainer_ratings),
+        ):
+            model.objects.bulk_create(objs, batch_size=batch_size)
+            counts[model._meta.label] = len(objs)
+    return counts
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic users, courses, videos, enrollments, payments, ratings and progress for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help='Number of students (default: 10000)')
+        parser.add_argument('--trainers', type=int, default=100, help='Number of trainers (default: 100)')
+        parser.add_argument('--managers', type=int, default=2, help='Number of managers (default: 2)')
+        parser.add_argument('--courses', type=int, default=1000, help='Number of courses (default: 1000)')
+        parser.add_argument('--videos-per-course', type=int, default=8, help='Videos per course (default: 8)')
+        parser.add_argument('--enrollments-per-student', type=int, default=3,
+                            help='Courses each student is enrolled in (default: 3)')
+        parser.add_argument('--rating-ratio', type=float, default=0.3,
+                            help='Share of enrollments that leave ratings and feedback (default: 0.3)')
+        parser.add_argument('--pending-payment-ratio', type=float, default=0.1,
+                            help='Share of students with an unapproved payment request (default: 0.1)')
+        parser.add_argument('--prefix', type=str, default='load', help='Prefix for usernames and course slugs (default: load)')
+        parser.add_argument('--password', type=str, default='password123',
+                            help='Password for every generated user (default: password123)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed reproduces the same data')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT (default: 2000)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes used for per-student rows (default: 1; SQLite only supports 1)')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Users with prefix "{prefix}_" already exist; choose another --prefix.')
+        if options['courses'] < 1:
+            raise CommandError('--courses must be at least 1.')
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            raise CommandError('SQLite cannot take concurrent writers; use --workers 1.')
+
+        started = time.perf_counter()
+        counts = {}
+        plan = self.seed_catalog(options, counts)
+
+        chunks = range((options['students'] + STUDENT_CHUNK - 1) // STUDENT_CHUNK)
+        if options['workers'] > 1:
+            connections.close_all()
+            context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+            with ProcessPoolExecutor(options['workers'], mp_context=context, initializer=_init_worker) as pool:
+                results = pool.map(_seed_student_chunk, [plan] * len(chunks), chunks)
+                self.merge_counts(counts, results)
+        else:
+            self.merge_counts(counts, (_seed_student_chunk(plan, chunk) for chunk in chunks))
+        # bulk_create skips the signals that normally invalidate cached pages.
+        cache.invalidate('catalog', 'enrollments', 'ratings', 'people')
+
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        for label, count in counts.items():
+            self.stdout.write(f'  {label:<32} {count:>10,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)'
+        ))
+
+    def merge_counts(self, counts, results):
+        for result in results:
+            for label, count in result.items():
+                counts[label] = counts.get(label, 0) + count
+
+    def seed_locations(self):
+        """Makes sure every entry of LOCATIONS exists; returns their (country, state, district) ids."""
+        homes = []
+        for country_name, state_name, district_name in LOCATIONS:
+            country, _ = Country.objects.get_or_create(name=country_name)
+            state, _ = State.objects.get_or_create(country=country, name=state_name)
+            district, _ = District.objects.get_or_create(state=state, name=district_name)
+            homes.append((country.id, state.id, district.id))
+        return homes
+
+    def seed_catalog(self, options, counts):
+        """
+        Creates users, profiles, courses, videos and trainer assignments with
+        pre-assigned primary keys, so worker processes can reference them
+        without reading anything back from the database.
+        """
+        seed, prefix, batch_size = options['seed'], options['prefix'], options['batch_size']
+        rng = _rng(seed, 'catalog')
+        password = make_password(options['password'])
+
+        user_base = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        course_base = (Course.all_objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        video_base = (CourseVideo.all_objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+
+        managers, trainers, students = options['managers'], options['trainers'], options['students']
+        manager_base = user_base
+        trainer_base = manager_base + managers
+        student_base = trainer_base + trainers
+
+        def user(base, role, i):
+            username = f'{prefix}_{role}{i}'
+            return User(id=base + i, username=username, email=f'{username}@example.com',
+                        first_name=role.title(), last_name=str(i), password=password)
+
+        users = (
+            [user(manager_base, 'manager', i) for i in range(managers)]
+            + [user(trainer_base, 'trainer', i) for i in range(trainers)]
+            + [user(student_base, 'student', i) for i in range(students)]
+        )
+        profiles = (
+            [Profile(user_id=manager_base + i, is_instructor=True, is_student=False) for i in range(managers)]
+            + [Profile(user_id=trainer_base + i, is_trainer=True, is_student=False) for i in range(trainers)]
+        )
+        homes = self.seed_locations()
+        for i in range(students):
+            country_id, state_id, district_id = rng.choice(homes)
+            profiles.append(Profile(
+                user_id=student_base + i, country_id=country_id, state_id=state_id, district_id=district_id,
+            ))
+
+        instructor_ids = list(range(manager_base, student_base)) or [manager_base]
+        courses, prices = [], []
+        for i in range(options['courses']):
+            price = Decimal(rng.choice([0, 199, 499, 999, 1999]))
+            prices.append(price)
+            category = rng.choice(CATEGORIES)
+            courses.append(Course(
+                id=course_base + i, title=f'{category} {i}', slug=f'{prefix}-course-{i}',
+                description=f'Synthetic {category.lower()} course used for load testing.',
+                instructor_id=rng.choice(instructor_ids), category=category, level=rng.choice(LEVELS),
+                duration=f'{rng.randint(1, 40)} Hours', price=price,
+                thumbnail='thumbnails/default-thumbnail.png',
+                requirements='Laptop, Internet connection', content='Introduction, Fundamentals, Project',
+            ))
+
+        vpc = options['videos_per_course']
+        videos = [
+            CourseVideo(id=video_base + c * vpc + n, course_id=course_base + c,
+                        title=f'Lesson {n + 1}', video=f'course_videos/{prefix}-{c}-{n}.mp4', order=n)
+            for c in range(options['courses']) for n in range(vpc)
+        ]
+        assignments = [
+            TrainerCourseAssignment(trainer_id=trainer_base + c % trainers, course_id=course_base + c,
+                                    assigned_by_id=manager_base if managers else None)
+            for c in range(options['courses'])
+        ] if trainers else []
+        contacts = [
+            TrainerContact(trainer_id=trainer_base + i, email=f'{prefix}_trainer{i}@example.com')
+            for i in range(trainers)
+        ]
+
+        with transaction.atomic():
+            for model, objs in (
+                (User, users), (Profile, profiles), (Course, courses), (CourseVideo, videos),
+                (TrainerCourseAssignment, assignments), (TrainerContact, contacts),
+            ):
+                model.objects.bulk_create(objs, batch_size=batch_size)
+                counts[model._meta.label] = len(objs)
+            # Explicit primary keys leave sequence-backed databases behind.
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User, Course, CourseVideo]):
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
+
+        return {
+            'seed': seed,
+            'batch_size': batch_size,
+            'students': students,
+            'trainers': trainers,
+            'courses': options['courses'],
+            'videos_per_course': vpc,
+            'enrollments_per_student': options['enrollments_per_student'],
+            'rating_ratio': options['rating_ratio'],
+            'pending_payment_ratio': options['pending_payment_ratio'],
+            'manager_base': manager_base if managers else None,
+            'trainer_base': trainer_base,
+            'student_base': student_base,
+            'course_base': course_base,
+            'video_base': video_base,
+            'prices': prices,
+        }
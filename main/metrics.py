@@ -0,0 +1,241 @@
+"""
+In-process Prometheus-style metrics for the application's hot paths.
+
+Every process keeps its own counters and histograms. When
+settings.EDUPRO_METRICS['MULTIPROCESS_DIR'] is set (one directory shared by
+all gunicorn workers), each process periodically writes a snapshot to
+<dir>/metrics-<pid>.json and the /metrics endpoint sums the snapshots of
+every process, so a scrape sees the whole server no matter which worker
+answers it.
+"""
+import atexit
+import functools
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MULTIPROCESS_DIR': '',
+    'FLUSH_INTERVAL': 5,   # seconds between snapshot writes
+    'TOKEN': '',           # scrapes must send "Authorization: Bearer <token>"; unset, only DEBUG serves /metrics
+}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@functools.cache
+def get_config():
+    # Read once per process (it is needed on every metric update); tests that
+    # override the setting clear it through setting_changed.
+    return {**DEFAULTS, **getattr(settings, 'EDUPRO_METRICS', {})}
+
+
+@receiver(setting_changed)
+def reset_config(setting, **kwargs):
+    if setting == 'EDUPRO_METRICS':
+        get_config.cache_clear()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        registry.update(self, self.key(labels), lambda value: (value or 0) + amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        def update(state):
+            # [count per bucket..., count above the last bucket, sum]
+            state = state or [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+            return state
+        registry.update(self, self.key(labels), update)
+
+
+class Registry:
+    """Holds this process's metric values and merges other workers' snapshots."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.values = {}
+        self.pid = os.getpid()
+        self.last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def update(self, metric, key, func):
+        config = get_config()
+        if not config['ENABLED']:
+            return
+        with self.lock:
+            if os.getpid() != self.pid:
+                # Forked worker: start from zero instead of re-counting the parent.
+                self.values, self.pid = {}, os.getpid()
+            series = self.values.setdefault(metric.name, {})
+            series[key] = func(series.get(key))
+            due = time.monotonic() - self.last_flush >= config['FLUSH_INTERVAL']
+        if due:
+            self.flush()
+
+    def local_snapshot(self):
+        with self.lock:
+            return {
+                name: [[list(key), value] for key, value in series.items()]
+                for name, series in self.values.items()
+            }
+
+    def snapshot_path(self, directory, pid=None):
+        return os.path.join(directory, f'metrics-{pid or os.getpid()}.json')
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        directory = get_config()['MULTIPROCESS_DIR']
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = self.snapshot_path(directory)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(self.local_snapshot(), fh)
+        os.replace(tmp, path)
+
+    def reset(self):
+        with self.lock:
+            self.values = {}
+
+    def collect(self):
+        """Sums this process's live values with every other worker's last snapshot."""
+        snapshots = [self.local_snapshot()]
+        directory = get_config()['MULTIPROCESS_DIR']
+        if directory:
+            own = self.snapshot_path(directory)
+            for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as fh:
+                        snapshots.append(json.load(fh))
+                except (OSError, ValueError):
+                    continue
+
+        merged = {}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                target = merged.setdefault(name, {})
+                for key, value in series:
+                    key = tuple(key)
+                    if isinstance(value, list):
+                        current = target.get(key) or [0] * len(value)
+                        target[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = target.get(key, 0) + value
+        return merged
+
+    def exposition(self):
+        """Renders every metric in the Prometheus text format (version 0.0.4)."""
+        merged = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(merged.get(name, {}).items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f'{name}_bucket{_labels(labels + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        lines.extend(self.derived_lines(merged))
+        return '\n'.join(lines) + '\n'
+
+    def derived_lines(self, merged):
+        """Ratios computed from the merged counters, for dashboards without PromQL."""
+        results = {key[0]: value for key, value in merged.get(cache_requests.name, {}).items()}
+        total = results.get('hit', 0) + results.get('miss', 0)
+        return [
+            '# HELP edupro_cache_hit_ratio Share of application cache lookups served from cache.',
+            '# TYPE edupro_cache_hit_ratio gauge',
+            f'edupro_cache_hit_ratio {_number(results.get("hit", 0) / total if total else 0)}',
+        ]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+
+# -------------------------
+# APPLICATION METRICS
+# -------------------------
+progress_heartbeats = Counter(
+    'edupro_progress_heartbeats_total', 'Video progress heartbeats processed.', ['completed'])
+payment_decisions = Counter(
+    'edupro_payment_decisions_total', 'Payment requests approved or rejected by managers.', ['status'])
+enrollments = Counter(
+    'edupro_enrollments_total', 'Enrollments created.')
+upload_bytes = Counter(
+    'edupro_upload_bytes_total', 'Bytes received in file uploads, by form field.', ['field'])
+video_bytes_streamed = Counter(
+    'edupro_video_bytes_streamed_total', 'Bytes of video served from MEDIA_URL.')
+cache_requests = Counter(
+    'edupro_cache_requests_total', 'Application cache lookups by result.', ['result'])
+request_latency = Histogram(
+    'edupro_request_duration_seconds', 'Request latency per view.', ['view', 'method'])
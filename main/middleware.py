@@ -0,0 +1,190 @@
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+from . import db_routers, metrics, profiling
+
+
+_templates_instrumented = False
+
+
+def _instrument_templates():
+    """Wraps the template backend's render() so top-level render time is recorded."""
+    global _templates_instrumented
+    if _templates_instrumented:
+        return
+    original_render = DjangoTemplate.render
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            profiling.record_template(time.perf_counter() - start)
+
+    DjangoTemplate.render = render
+    _templates_instrumented = True
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in (settings.EDUPRO_PROFILING['ENABLED']) per-view profiling.
+    Records wall time, DB queries and time, template render time and cache
+    hits for every request, and dumps a full profile for a sample of them.
+    """
+
+    def __init__(self, get_response):
+        self.config = profiling.get_config()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        profile, token = profiling.start_request()
+        profiler = self.start_profiler() if random.random() < self.config['SAMPLE_RATE'] else None
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            wall = time.perf_counter() - start
+            if profiler is not None:
+                self.stop_profiler(profiler)
+            profiling.end_request(token)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else '<unresolved>'
+        profiling.view_stats.add(view_name, wall, profile)
+        if profiler is not None:
+            self.dump_profile(profiler, view_name)
+
+        response['Server-Timing'] = (
+            f'db;desc="{profile.db_queries} queries";dur={profile.db_seconds * 1000:.1f}, '
+            f'tpl;dur={profile.template_seconds * 1000:.1f}, total;dur={wall * 1000:.1f}'
+        )
+        return response
+
+    def start_profiler(self):
+        if self.config['PROFILER'] == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def stop_profiler(self, profiler):
+        if self.config['PROFILER'] == 'pyinstrument':
+            profiler.stop()
+        else:
+            profiler.disable()
+
+    def dump_profile(self, profiler, view_name):
+        directory = self.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f'{view_name.replace(":", "-")}-{time.time_ns()}')
+        if self.config['PROFILER'] == 'pyinstrument':
+            with open(f'{stem}.html', 'w') as fh:
+                fh.write(profiler.output_html())
+        else:
+            profiler.dump_stats(f'{stem}.prof')
+
+
+class MetricsMiddleware:
+    """
+    Feeds the /metrics endpoint: per-view latency for every request, bytes
+    received in the uploads a view parsed and bytes of video served from
+    MEDIA_URL.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics.get_config()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, seconds):
+        match = getattr(request, 'resolver_match', None)
+        metrics.request_latency.observe(
+            seconds,
+            view=match.view_name if match else '<unresolved>',
+            method=request.method,
+        )
+
+        # Only uploads the view parsed: request.FILES would parse the body here.
+        uploads = getattr(request, '_files', None)
+        if uploads:
+            for field, files in uploads.lists():
+                metrics.upload_bytes.inc(sum(f.size for f in files), field=field)
+
+        if (
+            request.path.startswith(settings.MEDIA_URL)
+            and response.get('Content-Type', '').startswith('video/')
+            and response.has_header('Content-Length')
+        ):
+            metrics.video_bytes_streamed.inc(int(response['Content-Length']))
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Read-your-writes for replica/reporting reads: a request that writes to
+    the primary gets a short-lived cookie, and while it is present
+    @read_from_replica / @read_from_reporting views read from the primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with db_routers.track_writes() as writes:
+            response = self.get_response(request)
+        return self.pin(response, writes)
+
+    async def __acall__(self, request):
+        with db_routers.track_writes() as writes:
+            response = await self.get_response(request)
+        return self.pin(response, writes)
+
+    def pin(self, response, writes):
+        if writes['count']:
+            seconds = db_routers.sticky_seconds()
+            response.set_cookie(
+                db_routers.STICKY_COOKIE, str(int(time.time()) + seconds),
+                max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
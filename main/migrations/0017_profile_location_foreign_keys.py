@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_trainercontact_microsoft_teams_and_more'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='profile',
+            old_name='country',
+            new_name='country_name',
+        ),
+        migrations.RenameField(
+            model_name='profile',
+            old_name='state',
+            new_name='state_name',
+        ),
+        migrations.RenameField(
+            model_name='profile',
+            old_name='district',
+            new_name='district_name',
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='country',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profiles', to='main.country'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='state',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profiles', to='main.state'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='district',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profiles', to='main.district'),
+        ),
+    ]
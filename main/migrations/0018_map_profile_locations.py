@@ -0,0 +1,69 @@
+"""
+Points every Profile at the Country/State/District rows named by its old
+free-text location. Names are matched case-insensitively; a name with no
+matching row (typed in by hand) gets one created, so no location is lost.
+"""
+from django.db import migrations
+from django.db.models import Count
+
+
+def _clean(value):
+    return (value or '').strip()
+
+
+def map_locations(apps, schema_editor):
+    Profile = apps.get_model('main', 'Profile')
+    Country = apps.get_model('main', 'Country')
+    State = apps.get_model('main', 'State')
+    District = apps.get_model('main', 'District')
+
+    countries = {country.name.lower(): country for country in Country.objects.all()}
+    states = {(state.country_id, state.name.lower()): state for state in State.objects.all()}
+    districts = {(district.state_id, district.name.lower()): district for district in District.objects.all()}
+
+    # One UPDATE per distinct location rather than one per profile; the most
+    # common spelling of a new name is the one that gets created.
+    triples = Profile.objects.values_list('country_name', 'state_name', 'district_name').annotate(
+        profiles=Count('id')
+    ).order_by('-profiles')
+    for country_name, state_name, district_name, _ in triples:
+        country = state = district = None
+        if _clean(country_name):
+            country = countries.get(_clean(country_name).lower())
+            if country is None:
+                country = countries[_clean(country_name).lower()] = Country.objects.create(name=_clean(country_name))
+        if country and _clean(state_name):
+            key = (country.id, _clean(state_name).lower())
+            state = states.get(key)
+            if state is None:
+                state = states[key] = State.objects.create(country=country, name=_clean(state_name))
+        if state and _clean(district_name):
+            key = (state.id, _clean(district_name).lower())
+            district = districts.get(key)
+            if district is None:
+                district = districts[key] = District.objects.create(state=state, name=_clean(district_name))
+        if country is None:
+            continue
+        Profile.objects.filter(
+            country_name=country_name, state_name=state_name, district_name=district_name,
+        ).update(country=country, state=state, district=district)
+
+
+def unmap_locations(apps, schema_editor):
+    Profile = apps.get_model('main', 'Profile')
+    for profile in Profile.objects.select_related('country', 'state', 'district').exclude(country=None):
+        profile.country_name = profile.country.name
+        profile.state_name = profile.state.name if profile.state else None
+        profile.district_name = profile.district.name if profile.district else None
+        profile.save(update_fields=['country_name', 'state_name', 'district_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_profile_location_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(map_locations, unmap_locations),
+    ]
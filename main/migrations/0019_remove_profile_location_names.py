@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_map_profile_locations'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='profile',
+            name='country_name',
+        ),
+        migrations.RemoveField(
+            model_name='profile',
+            name='state_name',
+        ),
+        migrations.RemoveField(
+            model_name='profile',
+            name='district_name',
+        ),
+    ]
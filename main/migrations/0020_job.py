@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_remove_profile_location_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(help_text='Registered task name', max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not picked up before this time')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='A running job past this is retried', null=True)),
+                ('locked_by', models.CharField(blank=True, default='', max_length=64)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['run_at'],
+                'indexes': [models.Index(fields=['status', 'run_at'], name='main_job_status_b95b64_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:57
+
+import main.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_course_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(help_text='Path under MEDIA_ROOT', max_length=100, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='featured_video',
+            field=models.FileField(blank=True, null=True, storage=main.storage.blob_storage, upload_to='videos/'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=main.storage.blob_storage, upload_to='thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='coursevideo',
+            name='video',
+            field=models.FileField(blank=True, null=True, storage=main.storage.blob_storage, upload_to='course_videos/'),
+        ),
+    ]
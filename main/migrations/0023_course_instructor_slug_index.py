@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_media_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['instructor', 'slug'], name='course_instructor_slug_idx'),
+        ),
+    ]
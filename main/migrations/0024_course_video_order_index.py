@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_course_instructor_slug_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coursevideo',
+            index=models.Index(fields=['course', 'order', 'created_at'], name='coursevideo_course_order_idx'),
+        ),
+    ]
@@ -1,7 +1,14 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Cast, Concat, Left
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.contrib.auth.models import User
 
+from .storage import blob_storage
+
 
 # -------------------------
 # USER PROFILE (STUDENT / TRAINER / MANAGER)
@@ -15,9 +22,9 @@ class Profile(models.Model):
     is_student = models.BooleanField(default=True)       # Default role
 
     # Location fields for registration
-    country = models.CharField(max_length=100, blank=True, null=True)
-    state = models.CharField(max_length=100, blank=True, null=True)
-    district = models.CharField(max_length=100, blank=True, null=True)
+    country = models.ForeignKey('Country', on_delete=models.SET_NULL, blank=True, null=True, related_name='profiles')
+    state = models.ForeignKey('State', on_delete=models.SET_NULL, blank=True, null=True, related_name='profiles')
+    district = models.ForeignKey('District', on_delete=models.SET_NULL, blank=True, null=True, related_name='profiles')
 
     def __str__(self):
         return self.user.username
@@ -32,6 +39,56 @@ class Profile(models.Model):
             return 'Student'
 
 
+# Every user gets a profile when created (main/signals.py), and
+# main.backends loads it with the user on each request, so these only query
+# when the user came from elsewhere (e.g. a login form) or predates the
+# signal and was missed by backfill_profiles.
+def get_profile(user):
+    """Returns the user's profile, creating a student profile if they have none."""
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        user.profile, _ = Profile.objects.get_or_create(user=user)
+        return user.profile
+
+
+async def aget_profile(user):
+    """get_profile() for async views."""
+    if User.profile.is_cached(user):
+        try:
+            return user.profile
+        except Profile.DoesNotExist:
+            pass
+    user.profile, _ = await Profile.objects.aget_or_create(user=user)
+    return user.profile
+
+
+# -------------------------
+# SOFT DELETE
+# -------------------------
+# A deleted course is only flagged (deleted_at) in the request; the purge job
+# in main/tasks.py removes it and its dependents in batches afterwards. Until
+# then the default managers hide it, and rows that belong to it, everywhere;
+# all_objects still sees them.
+class CourseQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """Course.soft_delete() for every course of the queryset in one UPDATE (no signals are sent)."""
+        return self.update(
+            deleted_at=timezone.now(),
+            slug=Concat(Left('slug', 30), Value('-deleted-'), Cast('pk', models.CharField())),
+        )
+
+
+class LiveCourseManager(models.Manager.from_queryset(CourseQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at=None)
+
+
+class LiveCourseChildManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(course__deleted_at=None)
+
+
 # -------------------------
 # LIBRARY MODEL
 # -------------------------
@@ -59,8 +116,8 @@ class Course(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField()
 
-    thumbnail = models.ImageField(upload_to="thumbnails/", blank=True, null=True)
-    featured_video = models.FileField(upload_to="videos/", blank=True, null=True)
+    thumbnail = models.ImageField(upload_to="thumbnails/", storage=blob_storage, blank=True, null=True)
+    featured_video = models.FileField(upload_to="videos/", storage=blob_storage, blank=True, null=True)
 
     instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses', default=None)
 
@@ -82,22 +139,60 @@ class Course(models.Model):
 
     students = models.ManyToManyField(User, related_name='enrolled_courses', blank=True)
 
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveCourseManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # Detail pages are addressed as <instructor>/course/<slug>/.
+            models.Index(fields=['instructor', 'slug'], name='course_instructor_slug_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        course = super().from_db(db, field_names, values)
+        course._saved_title = course.__dict__.get('title')
+        return course
+
     def save(self, *args, **kwargs):
-        self.slug = slugify(self.title)
+        # The slug is the course's URL: derived once, then only when the title changes,
+        # and never again for a soft-deleted row (whose slug was freed for reuse).
+        saved_title = getattr(self, '_saved_title', None)
+        if not self.slug or (self.deleted_at is None and saved_title is not None and saved_title != self.title):
+            self.slug = slugify(self.title)
         super().save(*args, **kwargs)
+        self._saved_title = self.__dict__.get('title')
+
+    def soft_delete(self):
+        """Hides the course at once; main.tasks.purge_course removes it and its dependents later."""
+        self.deleted_at = timezone.now()
+        # Frees the slug for a new course with the same title while the purge is pending.
+        self.slug = f'{self.slug[:30]}-deleted-{self.pk}'
+        models.Model.save(self, update_fields=['deleted_at', 'slug'])
 
     def get_instructor_username(self):
         return self.instructor.username
 
-    def get_requirements_list(self):
+    # Parsed once per instance; a course cached for its detail page carries them along.
+    @cached_property
+    def requirements_list(self):
         return [i.strip() for i in self.requirements.split(',') if i.strip()]
 
-    def get_content_list(self):
+    @cached_property
+    def content_list(self):
         return [i.strip() for i in self.content.split(',') if i.strip()]
 
+    def get_requirements_list(self):
+        return self.requirements_list
+
+    def get_content_list(self):
+        return self.content_list
+
 
 # -------------------------
 # ENROLLMENT MODEL
@@ -107,6 +202,9 @@ class Enrollment(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
     enrolled_at = models.DateTimeField(auto_now_add=True)
 
+    objects = LiveCourseChildManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return f'{self.student.username} enrolled in {self.course.title}'
 
@@ -149,12 +247,19 @@ class District(models.Model):
 class CourseVideo(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='videos')
     title = models.CharField(max_length=255)
-    video = models.FileField(upload_to="course_videos/", blank=True, null=True)
+    video = models.FileField(upload_to="course_videos/", storage=blob_storage, blank=True, null=True)
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = LiveCourseChildManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ['order', 'created_at']
+        indexes = [
+            # A course's videos are always read in order; created_at breaks ties.
+            models.Index(fields=['course', 'order', 'created_at'], name='coursevideo_course_order_idx'),
+        ]
 
     def __str__(self):
         return f'{self.course.title} - {self.title}'
@@ -261,6 +366,9 @@ class Feedback(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = LiveCourseChildManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return f'Feedback from {self.student.username} for {self.course.title}'
 
@@ -274,6 +382,9 @@ class TrainerCourseAssignment(models.Model):
     assigned_at = models.DateTimeField(auto_now_add=True)
     assigned_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='assignments_made')
 
+    objects = LiveCourseChildManager()
+    all_objects = models.Manager()
+
     class Meta:
         unique_together = ['trainer', 'course']
 
@@ -312,8 +423,72 @@ class Payment(models.Model):
     approved_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True, null=True, help_text='Manager notes about this payment')
     
+    objects = LiveCourseChildManager()
+    all_objects = models.Manager()
+    
     class Meta:
         ordering = ['-payment_date']
     
     def __str__(self):
         return f'{self.student.username} - {self.course.title} - ${self.amount} ({self.get_status_display()})'
+
+
+# -------------------------
+# BACKGROUND JOBS
+# -------------------------
+class Job(models.Model):
+    """A unit of background work, run by `manage.py run_jobs` (see main/jobs.py)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100, help_text='Registered task name')
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now, help_text='Not picked up before this time')
+    locked_until = models.DateTimeField(null=True, blank=True, help_text='A running job past this is retried')
+    locked_by = models.CharField(max_length=64, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return f'{self.task} #{self.id} ({self.get_status_display()})'
+
+
+# -------------------------
+# LIVE DASHBOARD EVENTS
+# -------------------------
+class LiveEvent(models.Model):
+    """An event for the live dashboards, read by every process serving /events/stream/ (see main/events.py)."""
+    channel = models.CharField(max_length=50)
+    event = models.CharField(max_length=30)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.event} on {self.channel} #{self.id}'
+
+
+# -------------------------
+# MEDIA BLOBS
+# -------------------------
+class MediaBlob(models.Model):
+    """A file stored once by content (see main/storage.py), with how many rows point at it."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=100, unique=True, help_text='Path under MEDIA_ROOT')
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount} refs)'
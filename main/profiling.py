@@ -0,0 +1,125 @@
+"""
+Per-view request profiling: wall time, SQL, template rendering and cache
+usage, kept as rolling windows so percentiles reflect recent traffic.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    'WINDOW': 1000,         # samples kept per view
+    'SAMPLE_RATE': 0.0,     # share of requests dumped as a full profile
+    'PROFILER': 'cprofile',  # 'cprofile' or 'pyinstrument'
+    'PROFILE_DIR': 'profiles',
+}
+
+METRICS = ('wall_ms', 'db_queries', 'db_ms', 'template_ms', 'cache_hits', 'cache_misses')
+PERCENTILES = (50, 95, 99)
+
+_current = contextvars.ContextVar('edupro_request_profile', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'EDUPRO_PROFILING', {})}
+
+
+class RequestProfile:
+    """Counters for the request currently being handled."""
+
+    __slots__ = ('db_queries', 'db_seconds', 'template_seconds', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute_wrapper hook."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+
+def start_request():
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_cache(hit):
+    """Called by the cache layer so hits and misses show up per view."""
+    profile = _current.get()
+    if profile is not None:
+        if hit:
+            profile.cache_hits += 1
+        else:
+            profile.cache_misses += 1
+
+
+def record_template(seconds):
+    profile = _current.get()
+    if profile is not None:
+        profile.template_seconds += seconds
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class ViewStats:
+    """Rolling per-view samples shared by every thread of the process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(self._window)
+
+    def _window(self):
+        return deque(maxlen=get_config()['WINDOW'])
+
+    def add(self, view_name, wall_seconds, profile):
+        sample = (
+            wall_seconds * 1000,
+            profile.db_queries,
+            profile.db_seconds * 1000,
+            profile.template_seconds * 1000,
+            profile.cache_hits,
+            profile.cache_misses,
+        )
+        with self.lock:
+            self.samples[view_name].append(sample)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+    def snapshot(self):
+        """Returns {view: {'count': n, metric: {'p50': .., 'p95': .., 'p99': ..}}}."""
+        with self.lock:
+            samples = {view: list(window) for view, window in self.samples.items()}
+        report = {}
+        for view, rows in sorted(samples.items()):
+            entry = {'count': len(rows)}
+            for i, metric in enumerate(METRICS):
+                values = sorted(row[i] for row in rows)
+                entry[metric] = {f'p{p}': round(percentile(values, p), 2) for p in PERCENTILES}
+            report[view] = entry
+        return report
+
+
+view_stats = ViewStats()
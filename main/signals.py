@@ -1,27 +1,246 @@
-from django.contrib.auth.signals import user_logged_in
+import functools
+
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db import models, transaction
+from django.db.models import Count, Q
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
-from django.shortcuts import redirect
-from .models import Profile
-
-
-@receiver(user_logged_in)
-def redirect_after_login(sender, request, user, **kwargs):
-    """
-    Signal handler to redirect users based on their role after login.
-    This works with django-allauth login.
-    """
-    try:
-        profile = Profile.objects.get(user=user)
-        role = profile.get_role()
-        
-        if role == 'Manager':
-            request.session['redirect_to'] = '/manager/dashboard/'
-        elif role == 'Trainer':
-            request.session['redirect_to'] = '/trainer/dashboard/'
-        else:
-            request.session['redirect_to'] = '/student/dashboard/'
-    except Profile.DoesNotExist:
-        # Create profile if it doesn't exist
-        Profile.objects.create(user=user, is_student=True)
-        request.session['redirect_to'] = '/student/dashboard/'
+from . import cache, db_routers, metrics
+from .events import broker, course_channel
+from .models import (
+    Country, Course, CourseVideo, District, Enrollment, Feedback, Payment, Profile, State, TrainerCourseAssignment,
+    TrainerRating, VideoProgress, VideoRating
+)
+from .storage import ContentAddressedStorage
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    """Gives every new user a (student) profile, so no view has to create one lazily."""
+    if created and not raw:
+        Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Enrollment)
+def count_enrollment(sender, instance, created, **kwargs):
+    """Counts new enrollments whichever view or command creates them."""
+    if created:
+        metrics.enrollments.inc()
+
+
+# ==================== CACHE INVALIDATION ====================
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=CourseVideo)
+def invalidate_catalog(sender, **kwargs):
+    cache.invalidate('catalog')
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def invalidate_enrollments(sender, instance, **kwargs):
+    cache.invalidate('enrollments', f'student:{instance.student_id}')
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def invalidate_course_students(sender, action, **kwargs):
+    if action.startswith('post_'):
+        cache.invalidate('enrollments')
+
+
+@receiver([post_save, post_delete], sender=TrainerRating)
+@receiver([post_save, post_delete], sender=VideoRating)
+@receiver([post_save, post_delete], sender=Feedback)
+def invalidate_ratings(sender, **kwargs):
+    cache.invalidate('ratings')
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_people(sender, **kwargs):
+    cache.invalidate('people')
+
+
+@receiver([post_save, post_delete], sender=TrainerCourseAssignment)
+def invalidate_assignments(sender, instance, **kwargs):
+    cache.invalidate('people', f'trainer:{instance.trainer_id}')
+
+
+@receiver([post_save, post_delete], sender=Country)
+@receiver([post_save, post_delete], sender=State)
+@receiver([post_save, post_delete], sender=District)
+def invalidate_locations(sender, **kwargs):
+    cache.invalidate('locations')
+
+
+# ==================== MEDIA BLOB REFERENCES ====================
+# Released after commit: a rolled-back delete or replace still points at the blob.
+
+@functools.cache
+def _blob_fields(model):
+    return tuple(
+        f for f in model._meta.concrete_fields
+        if isinstance(f, models.FileField) and isinstance(f.storage, ContentAddressedStorage)
+    )
+
+
+def _stored_name(instance, field):
+    # __dict__ so a deferred field is not loaded just for this.
+    value = instance.__dict__.get(field.attname)
+    return getattr(value, 'name', value) or ''
+
+
+def _release(field, names):
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: [field.storage.release(name) for name in names])
+
+
+@receiver(post_init, sender=Course)
+@receiver(post_init, sender=CourseVideo)
+def remember_media(sender, instance, **kwargs):
+    fields = _blob_fields(sender)
+    if not fields:
+        return
+    instance._stored_media = {f.attname: _stored_name(instance, f) for f in fields}
+
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=CourseVideo)
+def note_media_uploads(sender, instance, **kwargs):
+    # FileField.pre_save stores these after this signal, adding a reference
+    # even when the content (and so the name) is the one already stored.
+    instance._uploading_media = {
+        f.attname for f in _blob_fields(sender)
+        if f.attname in instance.__dict__ and not getattr(instance, f.attname)._committed
+    }
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=CourseVideo)
+def release_replaced_media(sender, instance, created, **kwargs):
+    uploaded = getattr(instance, '_uploading_media', ())
+    for field in _blob_fields(sender):
+        old, new = instance._stored_media.get(field.attname), _stored_name(instance, field)
+        if not created and (old != new or field.attname in uploaded):
+            _release(field, [old])
+        instance._stored_media[field.attname] = new
+    instance._uploading_media = set()
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=CourseVideo)
+def release_deleted_media(sender, instance, **kwargs):
+    for field in _blob_fields(sender):
+        _release(field, [_stored_name(instance, field)])
+
+
+@receiver(connection_created)
+def watch_primary_writes(sender, connection, **kwargs):
+    db_routers.watch_writes(connection)
+
+
+# ==================== LIVE DASHBOARD EVENTS ====================
+# Published after commit, so a dashboard never shows a change that was rolled
+# back, and only while a dashboard is listening: the event's names and counts
+# are fetched in one or two queries at that point, and not at all otherwise.
+
+def _display_name(row, prefix='student__'):
+    full_name = f'{row[prefix + "first_name"]} {row[prefix + "last_name"]}'.strip()
+    return full_name or row[prefix + 'username']
+
+
+STUDENT_FIELDS = ('student__username', 'student__first_name', 'student__last_name')
+
+
+@receiver(post_save, sender=Payment)
+def publish_payment(sender, instance, created, **kwargs):
+    def publish():
+        if not broker.has_subscribers('manager'):
+            return
+        row = Payment.objects.filter(pk=instance.pk).values(*STUDENT_FIELDS, 'course__title').first()
+        if row is None:
+            return
+        broker.publish('manager', 'payment', {
+            'id': instance.id,
+            'status': instance.status,
+            'student': _display_name(row),
+            'course': row['course__title'],
+            'amount': instance.amount,
+            'created': created,
+        })
+    transaction.on_commit(publish)
+
+
+@receiver(post_save, sender=Enrollment)
+def publish_enrollment(sender, instance, created, **kwargs):
+    if not created:
+        return
+
+    def publish():
+        channel = course_channel(instance.course_id)
+        if not broker.has_subscribers('manager', channel):
+            return
+        row = Enrollment.objects.filter(pk=instance.pk).values(
+            *STUDENT_FIELDS, 'student__email', 'course__title'
+        ).first()
+        if row is None:
+            return
+        data = {
+            'student_id': instance.student_id,
+            'student': _display_name(row),
+            'email': row['student__email'],
+            'course_id': instance.course_id,
+            'course': row['course__title'],
+            'enrolled_at': instance.enrolled_at.strftime('%b %d, %Y'),
+        }
+        broker.publish('manager', 'enrollment', data)
+        broker.publish(channel, 'enrollment', data)
+    transaction.on_commit(publish)
+
+
+@receiver(post_init, sender=VideoProgress)
+def remember_completion(sender, instance, **kwargs):
+    # __dict__ so a deferred field is not loaded just for this.
+    instance._was_completed = instance.__dict__.get('completed')
+
+
+@receiver(post_save, sender=VideoProgress)
+def publish_completion(sender, instance, created, **kwargs):
+    newly_completed = instance.completed and (created or not instance._was_completed)
+    instance._was_completed = instance.completed
+    if not newly_completed:
+        return
 
+    def publish():
+        # The course is not known without a query; skip it when nobody listens at all.
+        if not broker.has_subscribers():
+            return
+        row = VideoProgress.objects.filter(pk=instance.pk).values(
+            *STUDENT_FIELDS, 'video__title', 'video__course_id', 'video__course__title'
+        ).first()
+        if row is None:
+            return
+        course_id = row['video__course_id']
+        channel = course_channel(course_id)
+        if not broker.has_subscribers('manager', channel):
+            return
+        counts = CourseVideo.objects.filter(course_id=course_id).aggregate(
+            total=Count('id', distinct=True),
+            completed=Count(
+                'id', distinct=True, filter=Q(progress__student_id=instance.student_id, progress__completed=True)
+            ),
+        )
+        total_videos, completed_videos = counts['total'], counts['completed']
+        data = {
+            'student_id': instance.student_id,
+            'student': _display_name(row),
+            'course_id': course_id,
+            'course': row['video__course__title'],
+            'video': row['video__title'],
+            'completed_videos': completed_videos,
+            'total_videos': total_videos,
+            'progress': round(completed_videos / total_videos * 100) if total_videos else 0,
+        }
+        broker.publish('manager', 'completion', data)
+        broker.publish(channel, 'completion', data)
+    transaction.on_commit(publish)
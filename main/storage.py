@@ -0,0 +1,104 @@
+"""
+Content-addressed media storage: an upload is hashed while it is written,
+and stored once as blobs/<sha256[:2]>/<sha256[2:4]>/<sha256>.<ext>. Uploading
+the same intro video or thumbnail again returns the existing blob, so rows of
+any course can share one file.
+
+Every stored reference is counted in MediaBlob.refcount: save() adds one, and
+the model signals release() one after a row pointing at the blob is deleted
+or given a new upload (even of the same content, which save() counted
+again). A blob's name never changes meaning, so its URL can be cached
+forever (see serve()). Files are not deleted when their count reaches zero,
+as a concurrent upload of the same content may be about to reuse them;
+gc_media removes blobs no row references once they are old enough.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.cache import patch_cache_control
+from django.views.static import serve as static_serve
+
+
+BLOB_PREFIX = 'blobs/'
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()[:10]
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """A FileSystemStorage that names files by the SHA-256 of their content."""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content; equal names mean equal files.
+        return name
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        tmp_dir = self.path(f'{BLOB_PREFIX}tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    tmp.write(chunk)
+            except BaseException:
+                os.remove(tmp.name)
+                raise
+        digest = digest.hexdigest()
+        name = blob_name(digest, name)
+        path = self.path(name)
+
+        if os.path.exists(path):
+            os.remove(tmp.name)
+            # Refreshed, so gc_media's --min-age protects a blob that is being reused.
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp.name, self.file_permissions_mode)
+            os.replace(tmp.name, path)
+
+        with transaction.atomic():
+            blob, created = MediaBlob.objects.get_or_create(
+                sha256=digest, defaults={'name': name, 'size': size, 'refcount': 1}
+            )
+            if not created:
+                MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+        return name
+
+    def release(self, name):
+        """Drops one reference to a blob (a no-op for files stored before blobs)."""
+        from .models import MediaBlob
+
+        if is_blob(name):
+            MediaBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+
+
+_blob_storage = ContentAddressedStorage()
+
+
+def blob_storage():
+    """Storage of the course media fields (a callable, so migrations do not pin its settings)."""
+    return _blob_storage
+
+
+def serve(request, path, document_root=None, show_indexes=False):
+    """Development media view; blob URLs are marked immutable like they would be by the web server."""
+    response = static_serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if is_blob(path) and response.status_code == 200:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
@@ -0,0 +1,145 @@
+"""
+Slow side effects of request handlers, run by the job worker (main/jobs.py).
+Every task is idempotent: a job can run again after a worker dies mid-run.
+"""
+from allauth.account import app_settings as account_settings
+from allauth.account.utils import user_pk_to_url_str
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.core.files.storage import default_storage
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+
+from . import cache, jobs
+from .models import (
+    Course, CourseVideo, Enrollment, Feedback, Payment, TrainerContact, TrainerCourseAssignment, TrainerRating,
+    VideoProgress, VideoRating
+)
+from .storage import is_blob
+
+
+# Rows deleted per transaction while purging, so no purge holds locks on a
+# large table for long.
+PURGE_BATCH_SIZE = 500
+
+COURSE_FILE_FIELDS = ('thumbnail', 'featured_video', 'lesson_video')
+
+
+@jobs.task()
+def enroll_student(payment_id):
+    """Enrolls the student of an approved payment in its course."""
+    payment = Payment.objects.select_related('student', 'course').filter(id=payment_id, status='approved').first()
+    if payment is None:
+        return
+    payment.course.students.add(payment.student)
+    Enrollment.objects.get_or_create(student=payment.student, course=payment.course)
+
+
+@jobs.task()
+def send_set_password_links(user_ids):
+    """
+    Emails imported users a link to choose their password (import_users
+    --send-invites). Users who have set one meanwhile are not mailed again.
+    """
+    users = [
+        user for user in User.objects.filter(id__in=user_ids, is_active=True).exclude(email='')
+        if not user.has_usable_password()
+    ]
+    if not users:
+        return
+    site = Site.objects.get_current()
+    token_generator = account_settings.PASSWORD_RESET_TOKEN_GENERATOR()
+    base_url = f'{account_settings.DEFAULT_HTTP_PROTOCOL}://{site.domain}'
+    messages = []
+    for user in users:
+        path = reverse('account_reset_password_from_key', kwargs={
+            'uidb36': user_pk_to_url_str(user), 'key': token_generator.make_token(user),
+        })
+        messages.append((
+            f'Your {site.name} account is ready',
+            f'Hello {user.first_name or user.username},\n\n'
+            f'An account has been created for you on {site.name}. Choose your password here:\n\n'
+            f'{base_url}{path}\n\nYour username is {user.username}.\n',
+            None,
+            [user.email],
+        ))
+    # One mail connection for the whole batch.
+    send_mass_mail(messages)
+
+
+def delete_in_batches(queryset, batch_size=None):
+    """
+    Deletes the rows of queryset a batch per transaction; returns how many
+    were deleted. The cache invalidations of a batch's post_delete signals
+    are made once, after it commits, rather than once per row.
+    """
+    batch_size = batch_size or PURGE_BATCH_SIZE
+    model = queryset.model
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with cache.batched(), transaction.atomic():
+            model._base_manager.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def delete_unreferenced_files(names):
+    """
+    Removes media files that no course or video points at any more. Shared
+    blobs are left to gc_media; deleting their rows already released them.
+    """
+    for name in {name for name in names if name and not is_blob(name)}:
+        referenced = (
+            Course.all_objects.filter(Q(thumbnail=name) | Q(featured_video=name) | Q(lesson_video=name)).exists()
+            or CourseVideo.all_objects.filter(video=name).exists()
+        )
+        if not referenced and default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def _purge_course(course_id):
+    files = []
+    for row in Course.all_objects.filter(id=course_id).values(*COURSE_FILE_FIELDS):
+        files.extend(row.values())
+    files.extend(CourseVideo.all_objects.filter(course_id=course_id).values_list('video', flat=True))
+
+    # Leaves first, so every batch only cascades to rows that are already gone.
+    delete_in_batches(VideoProgress.objects.filter(video__course_id=course_id))
+    delete_in_batches(VideoRating.objects.filter(video__course_id=course_id))
+    delete_in_batches(Feedback.all_objects.filter(course_id=course_id))
+    delete_in_batches(Payment.all_objects.filter(course_id=course_id))
+    delete_in_batches(Enrollment.all_objects.filter(course_id=course_id))
+    delete_in_batches(Course.students.through.objects.filter(course_id=course_id))
+    delete_in_batches(TrainerCourseAssignment.all_objects.filter(course_id=course_id))
+    delete_in_batches(CourseVideo.all_objects.filter(course_id=course_id))
+    Course.all_objects.filter(id=course_id).delete()
+
+    # Files go last: a crash before this leaves orphan files, never rows pointing at missing files.
+    delete_unreferenced_files(files)
+
+
+@jobs.task(atomic=False)
+def purge_course(course_id):
+    """Deletes a soft-deleted course, its dependents and its media files."""
+    if Course.all_objects.filter(id=course_id, deleted_at=None).exists():
+        return  # restored, or never deleted
+    _purge_course(course_id)
+
+
+@jobs.task(atomic=False)
+def delete_trainer(trainer_id):
+    """Removes a (deactivated) trainer with their courses, assignments, contact info and ratings."""
+    trainer = User.objects.filter(id=trainer_id, is_active=False).first()
+    if trainer is None:
+        return
+    for course_id in Course.all_objects.filter(instructor=trainer).values_list('id', flat=True):
+        _purge_course(course_id)
+    delete_in_batches(TrainerCourseAssignment.all_objects.filter(trainer=trainer))
+    delete_in_batches(TrainerRating.objects.filter(Q(trainer=trainer) | Q(student=trainer)))
+    TrainerContact.objects.filter(trainer=trainer).delete()
+    # Deleting the user cascades to the profile and whatever small rows remain.
+    trainer.delete()
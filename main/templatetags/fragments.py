@@ -0,0 +1,63 @@
+"""
+{% cachefragment namespaces name [vary_on ...] [timeout=seconds] %} ... {% endcachefragment %}
+
+Like Django's {% cache %}, but stored through main.cache: a fragment is
+dropped as soon as one of its namespaces is invalidated (by the same model
+signals that refresh the cached querysets), and concurrent misses do not all
+render it. namespaces is one name or several separated by spaces; every
+fragment is also in the 'fragments' namespace, invalidated after a deploy
+that changes templates. Querysets used only inside the fragment are not
+evaluated on a hit.
+
+    {% load fragments %}
+    {% cachefragment "catalog ratings" "manager-courses" timeout=60 %}
+        {% for course in all_courses %} ... {% endfor %}
+    {% endcachefragment %}
+"""
+from django import template
+from django.utils.safestring import mark_safe
+
+from main import cache
+
+
+register = template.Library()
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, namespaces, name, vary_on, timeout):
+        self.nodelist = nodelist
+        self.namespaces = namespaces
+        self.name = name
+        self.vary_on = vary_on
+        self.timeout = timeout
+
+    def render(self, context):
+        if not cache.get_config()['FRAGMENTS']:
+            return self.nodelist.render(context)
+        namespaces = ('fragments', *str(self.namespaces.resolve(context)).split())
+        parts = [self.name.resolve(context), *(var.resolve(context) for var in self.vary_on)]
+        timeout = self.timeout.resolve(context) if self.timeout else None
+        # Rendered under the lock, so only one request renders a missing fragment.
+        return mark_safe(cache.get_or_set(
+            namespaces, parts, lambda: str(self.nodelist.render(context)),
+            timeout=None if timeout is None else int(timeout),
+        ))
+
+
+@register.tag('cachefragment')
+def do_cachefragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes at least two arguments: namespaces and name.")
+    timeout = None
+    if bits[-1].startswith('timeout='):
+        timeout = parser.compile_filter(bits.pop()[len('timeout='):])
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return CacheFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+        timeout,
+    )
@@ -1,3 +1,1805 @@
-from django.test import TestCase
+import gzip
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+import warnings
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlsplit
 
-# Create your tests here.
+from allauth.account.utils import user_pk_to_url_str
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, reset_queries
+from django.db.utils import ConnectionHandler
+from django.test import (
+    LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.templatetags.static import static
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from EduPro import settings as project_settings
+from main import cache, jobs, metrics, storage, tasks, urls as main_urls
+from main.events import Broker, broker
+from main.middleware import RequestProfilingMiddleware
+from main.db_routers import STICKY_COOKIE, ReplicaRouter, read_alias, route_reads
+from main.decorators import read_from_reporting
+from main.paginators import EstimatedCountPaginator
+from main.profiling import view_stats
+from main.storage import blob_storage, is_blob
+from .models import (
+    Course, Enrollment, Profile, Country, State, District,
+    CourseVideo, VideoProgress, TrainerRating, VideoRating,
+    TrainerContact, Feedback, TrainerCourseAssignment, Payment, Job, LiveEvent, MediaBlob
+)
+
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# STATIC_ROOT only exists after collectstatic; the tests that need it build their own.
+warnings.filterwarnings('ignore', 'No directory at', UserWarning, 'whitenoise')
+
+CATEGORIES = [
+    'Web Development', 'Game Development', 'Software Development', 'Web Design',
+    'Graphic Design', 'Illustration', 'Animation', 'Digital Marketing',
+]
+
+
+# ==================== FAST DATA FACTORY ====================
+
+class PerformanceDataFactory:
+    """
+    Builds a realistic dataset with bulk_create so the suite can seed
+    thousands of rows in a few seconds.
+    """
+
+    def __init__(self, seed=26, courses=2000, videos_per_course=3, students=1500,
+                 trainers=40, courses_per_student=3, batch_size=1000):
+        self.rng = random.Random(seed)
+        self.num_courses = courses
+        self.videos_per_course = videos_per_course
+        self.num_students = students
+        self.num_trainers = trainers
+        self.courses_per_student = courses_per_student
+        self.batch_size = batch_size
+
+    def _bulk(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def _users(self, prefix, count, password):
+        self._bulk(User, [
+            User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com',
+                 first_name=prefix.title(), last_name=str(i), password=password)
+            for i in range(count)
+        ])
+        return list(User.objects.filter(username__startswith=prefix).order_by('id'))
+
+    def build(self):
+        """Creates the dataset and returns the objects the tests log in as / link to."""
+        rng = self.rng
+        password = make_password('password123')
+
+        manager = User.objects.create(username='perf_manager', email='manager@example.com', password=password)
+        trainers = self._users('perf_trainer', self.num_trainers, password)
+        students = self._users('perf_student', self.num_students, password)
+
+        country = Country.objects.create(name='India')
+        self._bulk(State, [State(country=country, name=f'State {i}') for i in range(30)])
+        states = list(State.objects.filter(country=country).order_by('id'))
+        self._bulk(District, [District(state=s, name=f'District {i}') for s in states for i in range(20)])
+        districts = list(District.objects.order_by('id'))
+
+        homes = [rng.choice(districts) for _ in students]
+        Profile.objects.filter(user=manager).update(is_instructor=True, is_student=False)
+        self._bulk(Profile, [Profile(user=t, is_trainer=True, is_student=False) for t in trainers]
+                   + [Profile(user=s, is_student=True, country=country, state_id=home.state_id, district=home)
+                      for s, home in zip(students, homes)])
+
+        instructors = [manager] + trainers
+        now = timezone.now()
+        self._bulk(Course, [
+            Course(
+                title=f'Course {i}', slug=f'course-{i}', description='Course description ' * 10,
+                instructor=rng.choice(instructors), category=rng.choice(CATEGORIES),
+                thumbnail='thumbnails/default-thumbnail.png', price=Decimal('499.00'),
+                requirements='Laptop, Internet, Patience', content='Intro, Basics, Advanced',
+            )
+            for i in range(self.num_courses)
+        ])
+        courses = list(Course.objects.order_by('id'))
+
+        self._bulk(CourseVideo, [
+            CourseVideo(course=c, title=f'{c.title} - Part {n}', video=f'course_videos/{c.slug}-{n}.mp4', order=n)
+            for c in courses for n in range(self.videos_per_course)
+        ])
+        videos_by_course = {}
+        for video in CourseVideo.objects.order_by('id'):
+            videos_by_course.setdefault(video.course_id, []).append(video)
+
+        self._bulk(TrainerCourseAssignment, [
+            TrainerCourseAssignment(trainer=t, course=c, assigned_by=manager)
+            for t in trainers for c in rng.sample(courses, 5)
+        ])
+        self._bulk(TrainerContact, [
+            TrainerContact(trainer=t, email=t.email, phone='9999999999') for t in trainers
+        ])
+
+        enrollments, memberships, progress, payments = [], [], [], []
+        feedback, trainer_ratings, video_ratings = [], [], []
+        Membership = Course.students.through
+        for student in students:
+            for course in rng.sample(courses, self.courses_per_student):
+                enrollments.append(Enrollment(student=student, course=course))
+                memberships.append(Membership(user_id=student.id, course_id=course.id))
+                payments.append(Payment(
+                    student=student, course=course, amount=course.price, status='approved',
+                    approved_by=manager, approved_at=now,
+                ))
+                for video in videos_by_course[course.id]:
+                    pct = rng.randint(0, 100)
+                    progress.append(VideoProgress(
+                        student=student, video=video, progress_percentage=pct,
+                        completed=pct == 100, time_spent_seconds=rng.randint(0, 3600),
+                    ))
+                feedback.append(Feedback(student=student, course=course, rating=rng.randint(1, 5), comment='Useful'))
+                video_ratings.append(VideoRating(
+                    video=videos_by_course[course.id][0], student=student, rating=rng.randint(1, 5)
+                ))
+            trainer_ratings.append(TrainerRating(trainer=rng.choice(trainers), student=student, rating=rng.randint(1, 5)))
+            payments.append(Payment(student=student, course=rng.choice(courses), amount=Decimal('499.00')))
+
+        for model, objs in (
+            (Enrollment, enrollments), (Membership, memberships), (Payment, payments),
+            (VideoProgress, progress), (Feedback, feedback), (VideoRating, video_ratings),
+        ):
+            self._bulk(model, objs)
+        TrainerRating.objects.bulk_create(trainer_ratings, batch_size=self.batch_size, ignore_conflicts=True)
+
+        # Fixed accounts the tests act as: a trainer assigned to an enrolled
+        # course and a student enrolled in it, so every page has real content.
+        trainer = trainers[0]
+        assignment = TrainerCourseAssignment.objects.filter(trainer=trainer).select_related('course').first()
+        course = assignment.course
+        student = students[0]
+        if not Enrollment.objects.filter(student=student, course=course).exists():
+            Enrollment.objects.create(student=student, course=course)
+            course.students.add(student)
+
+        return {
+            'manager': manager,
+            'trainer': trainer,
+            'student': student,
+            'course': course,
+            'video': videos_by_course[course.id][0],
+            'assignment': assignment,
+            'payment': Payment.objects.filter(status='requested').first(),
+            'country': country,
+            'state': states[0],
+        }
+
+
+# ==================== PER-VIEW QUERY & LATENCY BUDGETS ====================
+
+# Maximum number of SQL queries any role may trigger on a GET of each named
+# URL in main/urls.py. The numbers must not depend on the size of the
+# dataset: a view that starts issuing a query per row will blow through its
+# budget against the seeded data and fail the build.
+QUERY_BUDGETS = {
+    # Public pages
+    'home': 4,
+    'about': 2,
+    'contact': 2,
+    'courses': 4,
+    'category': 4,
+    # Legacy dashboard
+    'dashboard-home': 2,
+    'profile': 6,
+    'courses-enrolled': 3,
+    'courses-uploaded': 3,
+    'uploade': 2,
+    'course-edit': 3,
+    'delete-course': 3,
+    # Student
+    'student_dashboard': 4,
+    'student_course_detail': 7,
+    'update_video_progress': 9,
+    'payment_page': 4,
+    'rate_trainer': 6,
+    'rate_video': 5,
+    'trainer_contact': 7,
+    'submit_feedback': 5,
+    # Trainer
+    'trainer_dashboard': 6,
+    'trainer_course_students': 7,
+    'trainer_upload_video': 4,
+    'trainer_edit_contact': 3,
+    'trainer_delete_contact': 3,
+    # Manager
+    'manager_dashboard': 12,
+    'manager_add_course': 3,
+    'manager_edit_course': 5,
+    'manager_delete_course': 5,
+    'manager_manage_course_videos': 4,
+    'manager_reorder_course_videos': 2,
+    'manager_add_video_to_course': 3,
+    'manager_edit_video': 4,
+    'manager_delete_video': 4,
+    'manager_add_trainer': 2,
+    'manager_edit_trainer': 7,
+    'manager_delete_trainer': 7,
+    'manager_edit_trainer_contact': 5,
+    'manager_delete_trainer_contact': 5,
+    'manager_manage_trainer_assignments': 7,
+    'manager_assign_trainer': 6,
+    'manager_unassign_trainer': 6,
+    'manager_view_feedback': 4,
+    'manager_analyze_progress': 4,
+    'manager_location_analytics': 3,
+    'manager_view_payments': 4,
+    'manager_update_payment': 5,
+    'manager_profiling': 2,
+    'event_stream': 4,
+    'metrics': 0,
+    # AJAX / profile (a cold cache builds the location tree: 3 queries)
+    'get_states': 3,
+    'get_districts': 3,
+    'location_tree': 3,
+    'complete_profile': 5,
+    'course_details': 6,
+    'signup': 0,
+}
+
+# Queries for a progress heartbeat once the student's progress row exists;
+# this is the most frequent request the app serves.
+HEARTBEAT_QUERY_BUDGET = 7
+
+# Wall-clock ceiling (seconds) for a single request against the seeded data.
+# Pages that list every course, feedback or payment get more headroom; slow
+# CI machines can scale all ceilings with EDUPRO_PERF_LATENCY_SCALE.
+LATENCY_SCALE = float(os.environ.get('EDUPRO_PERF_LATENCY_SCALE', 1))
+DEFAULT_LATENCY_CEILING = 1.0
+LATENCY_CEILINGS = {
+    'courses': 2.0,
+    'manager_dashboard': 4.0,
+    'manager_view_feedback': 3.0,
+    'manager_view_payments': 4.0,
+}
+
+ROLES = ('anonymous', 'student', 'trainer', 'manager')
+
+
+def url_kwargs(data):
+    """Keyword arguments needed to reverse every parameterised URL in main.urls."""
+    course, video = data['course'], data['video']
+    return {
+        'category': {'category': course.category},
+        'course-edit': {'slug': course.slug},
+        'delete-course': {'slug': course.slug},
+        'student_course_detail': {'course_id': course.id},
+        'update_video_progress': {'video_id': video.id},
+        'payment_page': {'course_id': course.id},
+        'rate_trainer': {'trainer_id': data['trainer'].id},
+        'rate_video': {'video_id': video.id},
+        'trainer_contact': {'trainer_id': data['trainer'].id},
+        'submit_feedback': {'course_id': course.id},
+        'trainer_course_students': {'course_id': course.id},
+        'trainer_upload_video': {'course_id': course.id},
+        'manager_edit_course': {'course_id': course.id},
+        'manager_delete_course': {'course_id': course.id},
+        'manager_manage_course_videos': {'course_id': course.id},
+        'manager_reorder_course_videos': {'course_id': course.id},
+        'manager_add_video_to_course': {'course_id': course.id},
+        'manager_edit_video': {'video_id': video.id},
+        'manager_delete_video': {'video_id': video.id},
+        'manager_edit_trainer': {'trainer_id': data['trainer'].id},
+        'manager_delete_trainer': {'trainer_id': data['trainer'].id},
+        'manager_edit_trainer_contact': {'trainer_id': data['trainer'].id},
+        'manager_delete_trainer_contact': {'trainer_id': data['trainer'].id},
+        'manager_manage_trainer_assignments': {'trainer_id': data['trainer'].id},
+        'manager_unassign_trainer': {'assignment_id': data['assignment'].id},
+        'manager_update_payment': {'payment_id': data['payment'].id},
+        'get_states': {'country_id': data['country'].id},
+        'get_districts': {'state_id': data['state'].id},
+        'course_details': {'instructor': course.instructor.username, 'slug': course.slug},
+    }
+
+
+def run_queued_jobs():
+    """Runs every due job in this thread, as the run_jobs worker would."""
+    ran = 0
+    while True:
+        claimed = jobs.claim(100)
+        if not claimed:
+            return ran
+        for job_id, token in claimed:
+            jobs.execute(job_id, token)
+            ran += 1
+
+
+def main_url_names():
+    return [p.name for p in main_urls.urlpatterns if isinstance(p, URLPattern) and p.name]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ViewPerformanceBudgetTests(TestCase):
+    """Hits every URL in main.urls as each role against a large seeded dataset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = PerformanceDataFactory().build()
+        cls.kwargs = url_kwargs(cls.data)
+
+    def login_as(self, role):
+        if role != 'anonymous':
+            self.client.force_login(self.data[role])
+
+    def measure(self, method, url, **extra):
+        # The query log is capped; start every measurement from an empty one.
+        # Budgets are for the cold path, so nothing may come from the cache.
+        reset_queries()
+        caches['default'].clear()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, **extra)
+            elapsed = time.perf_counter() - start
+        return response, len(ctx.captured_queries), elapsed, ctx
+
+    def assert_within_budget(self, name, role, response, num_queries, elapsed, ctx):
+        self.assertLess(response.status_code, 500, f'{name} as {role} returned {response.status_code}')
+        budget = QUERY_BUDGETS[name]
+        self.assertLessEqual(
+            num_queries, budget,
+            f'{name} as {role} ran {num_queries} queries (budget {budget}):\n'
+            + '\n'.join(q['sql'] for q in ctx.captured_queries)
+        )
+        ceiling = LATENCY_CEILINGS.get(name, DEFAULT_LATENCY_CEILING) * LATENCY_SCALE
+        self.assertLessEqual(elapsed, ceiling, f'{name} as {role} took {elapsed:.3f}s (ceiling {ceiling}s)')
+
+    def test_every_url_has_a_budget(self):
+        missing = sorted(set(main_url_names()) - set(QUERY_BUDGETS))
+        self.assertEqual(missing, [], 'Add a query budget for new URLs in main/urls.py')
+
+    def test_get_every_url_as_each_role(self):
+        for name in main_url_names():
+            url = reverse(name, kwargs=self.kwargs.get(name))
+            for role in ROLES:
+                with self.subTest(url=name, role=role):
+                    self.client.logout()
+                    self.login_as(role)
+                    response, num_queries, elapsed, ctx = self.measure('get', url)
+                    self.assert_within_budget(name, role, response, num_queries, elapsed, ctx)
+
+    def test_progress_heartbeat_budget(self):
+        self.login_as('student')
+        url = reverse('update_video_progress', kwargs=self.kwargs['update_video_progress'])
+        for progress in (40, 60):
+            response, num_queries, elapsed, ctx = self.measure(
+                'post', url, data={'progress': progress, 'completed': 'false', 'time_spent': progress * 3}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assert_within_budget('update_video_progress', 'student', response, num_queries, elapsed, ctx)
+        # The second heartbeat only updates the existing row.
+        self.assertLessEqual(num_queries, HEARTBEAT_QUERY_BUDGET)
+        self.assertEqual(response.json()['progress'], 60)
+
+
+# ==================== SYNTHETIC LOAD DATA ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SeedLoadCommandTests(TestCase):
+    """seed_load generates the requested volumes and is reproducible by seed."""
+
+    def seed(self, **options):
+        options = {'students': 120, 'trainers': 4, 'managers': 1, 'courses': 15,
+                   'videos_per_course': 3, 'seed': 7, 'stdout': StringIO(), **options}
+        call_command('seed_load', **options)
+
+    def snapshot(self):
+        return sorted(Enrollment.objects.values_list('student__username', 'course__slug'))
+
+    def test_generates_requested_volumes(self):
+        self.seed()
+        self.assertEqual(User.objects.filter(username__startswith='load_student').count(), 120)
+        self.assertEqual(Profile.objects.filter(is_trainer=True).count(), 4)
+        self.assertEqual(Course.objects.count(), 15)
+        self.assertEqual(CourseVideo.objects.count(), 45)
+        self.assertEqual(Enrollment.objects.count(), 360)
+        self.assertEqual(Course.students.through.objects.count(), 360)
+        self.assertEqual(Payment.objects.filter(status='approved').count(), 360)
+        self.assertTrue(VideoProgress.objects.exists())
+        self.assertTrue(Feedback.objects.exists())
+
+    def test_same_seed_reproduces_same_data(self):
+        self.seed()
+        first = self.snapshot()
+        User.objects.filter(username__startswith='load_').delete()
+        Course.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
+        User.objects.filter(username__startswith='load_').delete()
+        Course.objects.all().delete()
+        self.seed(seed=8)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_refuses_to_reuse_prefix(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+# ==================== USER PROVISIONING ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ImportUsersCommandTests(TestCase):
+    """import_users bulk-creates users with profiles, hashing on a pool or emailing set-password links."""
+
+    def write_csv(self, content):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_imports_users_with_roles_and_hashed_passwords(self):
+        User.objects.create(username='taken', email='taken@example.com')
+        path = self.write_csv(
+            'username,email,password,role,first_name,last_name\n'
+            'boss,boss@example.com,s3cret!,manager,Asha,Rao\n'
+            'coach,coach@example.com,s3cret!,trainer,,\n'
+            'learner,learner@example.com,s3cret!,,,\n'
+            'taken,other@example.com,s3cret!,student,,\n'
+            'dupe,TAKEN@example.com,s3cret!,student,,\n'
+        )
+        out = StringIO()
+        call_command('import_users', path, '--workers', '2', stdout=out)
+        self.assertIn('Imported 3 users (1 managers, 1 trainers, 1 students); 2 skipped', out.getvalue())
+        profiles = Profile.objects.select_related('user').exclude(user__username='taken')
+        roles = {p.user.username: p.get_role() for p in profiles}
+        self.assertEqual(roles, {'boss': 'Manager', 'coach': 'Trainer', 'learner': 'Student'})
+        self.assertTrue(User.objects.get(username='boss').check_password('s3cret!'))
+        self.assertEqual(User.objects.get(username='boss').first_name, 'Asha')
+
+        call_command('import_users', path, stdout=out)
+        self.assertEqual(User.objects.count(), 4)
+
+    def test_send_invites_defers_hashing_to_emailed_links(self):
+        path = self.write_csv('username,email,role\ncoach,coach@example.com,trainer\n')
+        call_command('import_users', path, '--send-invites', stdout=StringIO())
+        coach = User.objects.get(username='coach')
+        self.assertFalse(coach.has_usable_password())
+        self.assertEqual(run_queued_jobs(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['coach@example.com'])
+        link = next(line for line in mail.outbox[0].body.splitlines() if '/accounts/password/reset/key/' in line)
+        response = self.client.get(urlsplit(link.strip()).path)
+        self.assertRedirects(response, reverse('account_reset_password_from_key', kwargs={
+            'uidb36': user_pk_to_url_str(coach), 'key': 'set-password'}), fetch_redirect_response=False)
+
+        coach.set_password('chosen!')
+        coach.save()
+        tasks.send_set_password_links(user_ids=[coach.id])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rows_without_password_need_invites(self):
+        path = self.write_csv('username,email,password\nnopass,nopass@example.com,\n')
+        err = StringIO()
+        call_command('import_users', path, stdout=StringIO(), stderr=err)
+        self.assertIn('No password for "nopass"', err.getvalue())
+        self.assertFalse(User.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ProfileLoadingTests(TestCase):
+    """Profiles are created with their users and loaded with the session user."""
+
+    def test_new_users_get_a_student_profile(self):
+        user = User.objects.create_user('newcomer', password='x')
+        self.assertTrue(Profile.objects.get(user=user).is_student)
+
+    def test_role_checks_reuse_the_profile_loaded_with_the_user(self):
+        manager = User.objects.create_user('boss', password='x')
+        Profile.objects.filter(user=manager).update(is_instructor=True, is_student=False)
+        self.client.force_login(manager)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard-home'))
+        self.assertRedirects(response, reverse('manager_dashboard'), fetch_redirect_response=False)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('SELECT "main_profile"')])
+
+    def test_backfill_profiles_creates_missing_profiles(self):
+        legacy = User.objects.create_user('legacy', password='x')
+        Profile.objects.filter(user=legacy).delete()
+        out = StringIO()
+        call_command('backfill_profiles', stdout=out)
+        self.assertIn('Created 1 profiles', out.getvalue())
+        self.assertTrue(Profile.objects.get(user=legacy).is_student)
+        call_command('backfill_profiles', stdout=out)
+        self.assertEqual(Profile.objects.count(), 1)
+
+
+# ==================== HTTP LOAD TEST SCENARIOS ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoadTestCommandTests(LiveServerTestCase):
+    """loadtest logs in every role against a live server and reports each endpoint."""
+
+    def test_journeys_run_without_errors(self):
+        call_command('seed_load', students=20, trainers=2, managers=1, courses=5,
+                     videos_per_course=2, pending_payment_ratio=1, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = os.path.join(tmp, 'report.json')
+            call_command('loadtest', base_url=self.live_server_url, users=3, duration=1,
+                         mix='student=1,trainer=1,manager=1', heartbeats=2, upload_size=0,
+                         json=report_path, stdout=StringIO())
+            with open(report_path) as fh:
+                report = json.load(fh)
+
+        endpoints = {row['endpoint']: row for row in report['endpoints']}
+        for name in ('login', 'student_dashboard', 'update_video_progress',
+                     'trainer_course_students', 'manager_dashboard', 'manager_update_payment_approve'):
+            self.assertIn(name, endpoints)
+        self.assertEqual(sum(row['errors'] for row in report['endpoints']), 0)
+        self.assertTrue(Payment.objects.filter(status='approved', notes='Approved by load test').exists())
+
+
+# ==================== SESSIONS ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SessionEngineTests(TestCase):
+    """Logins redirect by role without session writes, under every configured engine."""
+
+    def test_login_redirects_by_role_without_storing_it(self):
+        trainer = User.objects.create_user('coach', password='pw-123456')
+        Profile.objects.filter(user=trainer).update(is_trainer=True, is_student=False)
+        response = self.client.post(reverse('account_login'), {'login': 'coach', 'password': 'pw-123456'})
+        self.assertRedirects(response, '/trainer/dashboard/', fetch_redirect_response=False)
+        self.assertNotIn('redirect_to', self.client.session)
+
+    def test_bench_sessions_compares_engines(self):
+        call_command('seed_load', students=3, trainers=1, managers=1, courses=2, videos_per_course=1,
+                     seed=1, stdout=StringIO())
+        out = StringIO()
+        call_command('bench_sessions', users=2, requests=4, engine=['db', 'signed_cookies'], stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith('db') and lines[2].startswith('signed_cookies'))
+        self.assertEqual(lines[2].split()[-1], '0.0')  # no session queries per request
+
+
+# ==================== REQUEST PROFILING ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RequestProfilingMiddlewareTests(TestCase):
+    """Per-view timings are recorded only when profiling is enabled."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('prof_manager', password='x')
+        Profile.objects.filter(user=cls.manager).update(is_instructor=True, is_student=False)
+        cls.student = User.objects.create_user('prof_student', password='x')
+
+    def setUp(self):
+        view_stats.reset()
+
+    def profiling(self, **overrides):
+        return override_settings(EDUPRO_PROFILING={'ENABLED': True, **overrides})
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('courses'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(view_stats.snapshot(), {})
+
+    def test_records_queries_and_template_time_per_view(self):
+        with self.profiling():
+            self.client.force_login(self.student)
+            for _ in range(3):
+                response = self.client.get(reverse('student_dashboard'))
+            self.assertIn('Server-Timing', response)
+
+            self.client.force_login(self.manager)
+            report = self.client.get(reverse('manager_profiling')).json()
+
+        self.assertTrue(report['enabled'])
+        stats = report['views']['student_dashboard']
+        self.assertEqual(stats['count'], 3)
+        self.assertGreater(stats['db_queries']['p50'], 0)
+        self.assertGreater(stats['template_ms']['p99'], 0)
+        self.assertGreaterEqual(stats['wall_ms']['p95'], stats['template_ms']['p95'])
+
+    def test_endpoint_is_manager_only(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('manager_profiling'))
+        self.assertRedirects(response, reverse('student_dashboard'), fetch_redirect_response=False)
+
+    def test_sampled_requests_dump_a_profile(self):
+        with tempfile.TemporaryDirectory() as tmp, self.profiling(SAMPLE_RATE=1.0, PROFILE_DIR=tmp):
+            self.client.get(reverse('courses'))
+            dumps = os.listdir(tmp)
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].startswith('courses-') and dumps[0].endswith('.prof'))
+
+    def test_failing_view_still_stops_the_profiler(self):
+        def failing_view(request):
+            raise RuntimeError('boom')
+
+        with self.profiling(SAMPLE_RATE=1.0):
+            middleware = RequestProfilingMiddleware(failing_view)
+        wrappers = list(connection.execute_wrappers)
+        with mock.patch.object(middleware, 'stop_profiler', wraps=middleware.stop_profiler) as stop:
+            with self.assertRaises(RuntimeError):
+                middleware(RequestFactory().get('/'))
+        stop.assert_called_once()
+        self.assertEqual(connection.execute_wrappers, wrappers)
+
+
+# ==================== METRICS ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, EDUPRO_METRICS={'TOKEN': 's3cret'})
+class MetricsEndpointTests(TestCase):
+    """/metrics exposes hot-path counters summed across worker snapshots."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('metrics_manager', password='x')
+        Profile.objects.filter(user=cls.manager).update(is_instructor=True, is_student=False)
+        cls.student = User.objects.create_user('metrics_student', password='x')
+        cls.course = Course.objects.create(
+            title='Metrics', slug='metrics', category='Web Development', instructor=cls.manager,
+            description='d', price=Decimal('10.00'), thumbnail='thumbnails/default-thumbnail.png',
+        )
+        cls.video = CourseVideo.objects.create(course=cls.course, title='Intro', video='course_videos/a.mp4', order=1)
+        cls.payment = Payment.objects.create(student=cls.student, course=cls.course, amount=Decimal('10.00'))
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_hot_paths_are_counted(self):
+        self.client.force_login(self.manager)
+        self.client.post(reverse('manager_update_payment', args=[self.payment.id]), {'action': 'approve'})
+        run_queued_jobs()
+        self.client.force_login(self.student)
+        for completed in ('false', 'true'):
+            self.client.post(reverse('update_video_progress', args=[self.video.id]),
+                             {'progress': 50, 'completed': completed, 'time_spent': 5})
+
+        text = self.scrape()
+        self.assertIn('edupro_payment_decisions_total{status="approved"} 1', text)
+        self.assertIn('edupro_enrollments_total 1', text)
+        self.assertIn('edupro_progress_heartbeats_total{completed="false"} 1', text)
+        self.assertIn('edupro_progress_heartbeats_total{completed="true"} 1', text)
+        self.assertIn('edupro_request_duration_seconds_count{view="update_video_progress",method="POST"} 2', text)
+        self.assertIn('edupro_request_duration_seconds_bucket{view="update_video_progress",method="POST",le="+Inf"} 2', text)
+
+    def test_snapshots_from_other_workers_are_summed(self):
+        metrics.cache_requests.inc(result='hit')
+        with tempfile.TemporaryDirectory() as tmp, override_settings(EDUPRO_METRICS={'MULTIPROCESS_DIR': tmp, 'TOKEN': 's3cret'}):
+            with open(os.path.join(tmp, 'metrics-999999.json'), 'w') as fh:
+                json.dump({'edupro_cache_requests_total': [[['hit'], 2], [['miss'], 1]]}, fh)
+            text = self.scrape()
+        self.assertIn('edupro_cache_requests_total{result="hit"} 3', text)
+        self.assertIn('edupro_cache_hit_ratio 0.75', text)
+
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        for wrong in ('Bearer s3cre', 'Bearer s3cret ', 'Bearer s3cr\xe9t'):
+            response = self.client.get(reverse('metrics'), headers={'Authorization': wrong})
+            self.assertEqual(response.status_code, 401)
+        self.assertIn('# TYPE edupro_enrollments_total counter', self.scrape())
+
+    def test_without_a_token_only_debug_serves_metrics(self):
+        with override_settings(EDUPRO_METRICS={}):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_unparsed_uploads_are_not_parsed_for_metrics(self):
+        self.client.post(reverse('about'), {'file': ContentFile(b'x' * 100, name='a.bin')})
+        self.assertNotIn('edupro_upload_bytes_total{', self.scrape())
+
+
+# ==================== CACHE LAYER ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CacheLayerTests(TestCase):
+    """main.cache serves repeat reads and drops them when the data changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('cache_manager', password='x')
+        Profile.objects.filter(user=cls.manager).update(is_instructor=True, is_student=False)
+        cls.student = User.objects.create_user('cache_student', password='x')
+        cls.course = Course.objects.create(
+            title='Cached', slug='cached', category='Web Design', instructor=cls.manager,
+            description='d', thumbnail='thumbnails/default-thumbnail.png',
+        )
+        cls.video = CourseVideo.objects.create(course=cls.course, title='Intro', video='course_videos/a.mp4', order=1)
+        Enrollment.objects.create(student=cls.student, course=cls.course)
+        cls.course.students.add(cls.student)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.calls = 0
+
+    def producer(self):
+        self.calls += 1
+        return self.calls
+
+    def test_invalidate_bumps_every_key_in_the_namespace(self):
+        self.assertEqual(cache.get_or_set('things', ['a'], self.producer), 1)
+        self.assertEqual(cache.get_or_set('things', ['a'], self.producer), 1)
+        cache.invalidate('things')
+        self.assertEqual(cache.get_or_set('things', ['a'], self.producer), 2)
+        cache.invalidate('other')
+        self.assertEqual(cache.get_or_set(('things', 'other'), ['a'], self.producer), 3)
+
+    def test_locked_refresh_serves_the_stale_value(self):
+        cache.get_or_set('things', ['a'], self.producer)
+        key = cache.make_key('things', 'a')
+        caches['default'].set(key, ('stale', 1.0, time.time() - 1))
+        caches['default'].add(f'{key}:lock', 1)
+        self.assertEqual(cache.get_or_set('things', ['a'], self.producer), 'stale')
+        caches['default'].delete(f'{key}:lock')
+        self.assertEqual(cache.get_or_set('things', ['a'], self.producer), 2)
+
+    def test_catalog_is_cached_until_a_course_changes(self):
+        self.client.get(reverse('courses'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('courses'))
+        Course.objects.create(
+            title='Fresh', slug='fresh', category='Web Design', instructor=self.manager,
+            description='d', thumbnail='thumbnails/default-thumbnail.png',
+        )
+        self.assertContains(self.client.get(reverse('courses')), 'Fresh')
+
+    def test_fragments_are_cached_until_their_namespace_changes(self):
+        template = Template(
+            '{% load fragments %}{% cachefragment "things" "frag" key %}{{ value }}{% endcachefragment %}'
+        )
+        render = lambda key, value: template.render(Context({'key': key, 'value': value}))
+        self.assertEqual(render('a', 1), '1')
+        self.assertEqual(render('a', 2), '1')
+        self.assertEqual(render('b', 2), '2')
+        cache.invalidate('things')
+        self.assertEqual(render('a', 3), '3')
+        with override_settings(EDUPRO_CACHE={'FRAGMENTS': False}):
+            self.assertEqual(render('a', 4), '4')
+
+    def test_manager_dashboard_skips_fragment_queries_when_cached(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('manager_dashboard'))
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(reverse('manager_dashboard'))
+        with override_settings(EDUPRO_CACHE={'FRAGMENTS': False}), CaptureQueriesContext(connection) as cold:
+            self.client.get(reverse('manager_dashboard'))
+        self.assertLess(len(warm.captured_queries), len(cold.captured_queries))
+
+    def test_completing_a_video_refreshes_the_student_dashboard(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.context['course_progress'][0]['completed_videos'], 0)
+        self.client.post(reverse('update_video_progress', args=[self.video.id]),
+                         {'progress': 100, 'completed': 'true', 'time_spent': 30})
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.context['course_progress'][0]['completed_videos'], 1)
+
+
+# ==================== CONDITIONAL GET ====================
+
+class ConditionalGetTests(TestCase):
+    """Catalog pages answer revalidations with 304 without rendering."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('etag_manager', password='x')
+        cls.student = User.objects.create_user('etag_student', password='x')
+        cls.course = Course.objects.create(
+            title='Tagged', slug='tagged', category='Web Design', instructor=cls.manager, description='d',
+            thumbnail='thumbnails/default-thumbnail.png',
+        )
+        cls.urls = [
+            reverse('home'),
+            reverse('courses'),
+            reverse('category', args=['Web Design']),
+            reverse('course_details', args=['etag_manager', 'tagged']),
+        ]
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def revalidate(self, url, **headers):
+        with mock.patch('main.views.render') as render:
+            response = self.client.get(url, **headers)
+        return response, render
+
+    def test_unchanged_pages_are_not_rendered_again(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertIn('no-cache', first['Cache-Control'])
+                response, render = self.revalidate(url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(response.status_code, 304)
+                render.assert_not_called()
+                response, render = self.revalidate(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+                self.assertEqual(response.status_code, 304)
+                render.assert_not_called()
+
+    def test_changes_and_users_get_fresh_pages(self):
+        url = reverse('course_details', args=['etag_manager', 'tagged'])
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.student)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('private', response['Cache-Control'])
+
+        self.course.students.add(self.student)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+        etag = self.client.get(reverse('courses'))['ETag']
+        Course.objects.filter(id=self.course.id).update(title='Retitled')
+        self.assertEqual(self.client.get(reverse('courses'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.course.title = 'Retitled'
+        self.course.save()
+        self.assertEqual(self.client.get(reverse('courses'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CourseDetailTests(TestCase):
+    """The course page comes from one cached fetch plus a cached per-user enrollment flag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.trainer = User.objects.create_user('detail_trainer', password='x')
+        cls.student = User.objects.create_user('detail_student', password='x')
+        for title in ('Detailed', 'Sibling One', 'Sibling Two'):
+            Course.objects.create(
+                title=title, category='Web Design', instructor=cls.trainer, description='d',
+                requirements='Python, SQL', thumbnail='thumbnails/default-thumbnail.png',
+            )
+        cls.url = reverse('course_details', args=['detail_trainer', 'detailed'])
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_repeat_views_run_no_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['course'].requirements_list, ['Python', 'SQL'])
+        self.assertEqual(len(response.context['category_courses']), 2)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        self.assertEqual(self.client.get(reverse('course_details', args=['detail_trainer', 'nope'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('course_details', args=['detail_student', 'detailed'])).status_code, 404)
+
+    def test_enrollment_state_is_cached_per_user_and_refreshed(self):
+        self.client.force_login(self.student)
+        self.assertFalse(self.client.get(self.url).context['enrolled'])
+        self.client.post(self.url)
+        self.assertTrue(self.client.get(self.url).context['enrolled'])
+        self.client.force_login(self.trainer)
+        self.assertFalse(self.client.get(self.url).context['enrolled'])
+
+
+# ==================== LOCATION TREE ====================
+
+class LocationTreeTests(TestCase):
+    """Dropdown data comes from the cached tree, with ETags, gzip and invalidation."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.india = Country.objects.create(name='India')
+        cls.kerala = State.objects.create(country=cls.india, name='Kerala')
+        District.objects.create(state=cls.kerala, name='Ernakulam')
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_warm_requests_run_no_queries(self):
+        url = reverse('get_districts', args=[self.kerala.id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json(), [{'id': District.objects.get().id, 'name': 'Ernakulam'}])
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_etag_and_gzip(self):
+        url = reverse('get_states', args=[self.india.id])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), [{'id': self.kerala.id, 'name': 'Kerala'}])
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_admin_edit_invalidates_the_tree(self):
+        url = reverse('location_tree')
+        etag = self.client.get(url)['ETag']
+        State.objects.create(country=self.india, name='Tamil Nadu')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([name for _, name in response.json()['states'][str(self.india.id)]], ['Kerala', 'Tamil Nadu'])
+
+    def test_versioned_tree_is_immutable(self):
+        version = self.client.get(reverse('location_tree'))['ETag'].split('-')[1]
+        response = self.client.get(reverse('location_tree'), {'v': version})
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_load_locations_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('country,state,district\nIndia,Kerala,Ernakulam\nIndia,Kerala,Kollam\nIndia,Goa,North Goa\n')
+        self.addCleanup(os.remove, f.name)
+        etag = self.client.get(reverse('location_tree'))['ETag']
+        out = StringIO()
+        call_command('load_locations', f.name, stdout=out)
+        self.assertIn('Loaded 0 countries, 1 states and 2 districts', out.getvalue())
+        call_command('load_locations', f.name, stdout=StringIO())
+        self.assertEqual(District.objects.count(), 3)
+        self.assertNotEqual(self.client.get(reverse('location_tree'))['ETag'], etag)
+
+
+class ProfileLocationTests(TestCase):
+    """Profiles point at location rows, and managers see students per location."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('loc_manager', password='x')
+        Profile.objects.filter(user=cls.manager).update(is_instructor=True, is_student=False)
+        cls.india = Country.objects.create(name='India')
+        cls.kerala = State.objects.create(country=cls.india, name='Kerala')
+        cls.goa = State.objects.create(country=cls.india, name='Goa')
+        cls.kochi = District.objects.create(state=cls.kerala, name='Ernakulam')
+        cls.kollam = District.objects.create(state=cls.kerala, name='Kollam')
+        for i, district in enumerate([cls.kochi, cls.kochi, cls.kollam, None]):
+            student = User.objects.create_user(f'loc_student{i}', password='x')
+            Profile.objects.filter(user=student).update(country=cls.india, state=district and cls.kerala, district=district)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_complete_profile_stores_location_rows(self):
+        student = User.objects.get(username='loc_student3')
+        self.client.force_login(student)
+        self.client.post(reverse('complete_profile'), {
+            'country': self.india.id, 'state': self.kerala.id, 'district': self.kollam.id,
+        })
+        profile = Profile.objects.get(user=student)
+        self.assertEqual((profile.state, profile.district), (self.kerala, self.kollam))
+
+        response = self.client.post(reverse('complete_profile'), {
+            'country': self.india.id, 'state': self.goa.id, 'district': self.kollam.id,
+        })
+        self.assertEqual(response.status_code, 404)
+
+    def test_location_analytics_rolls_up_one_grouped_query(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('manager_location_analytics'))
+        caches['default'].clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('manager_location_analytics'))
+        self.assertEqual(sum('GROUP BY' in q['sql'] for q in ctx.captured_queries), 1)
+
+        [india] = response.context['countries']
+        self.assertEqual((india['name'], india['students']), ('India', 4))
+        kerala, unspecified = india['states']
+        self.assertEqual((kerala['name'], kerala['students']), ('Kerala', 3))
+        self.assertEqual([(d['name'], d['students']) for d in kerala['districts']], [('Ernakulam', 2), ('Kollam', 1)])
+        self.assertEqual((unspecified['name'], unspecified['students']), (None, 1))
+
+
+# ==================== ADMIN ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AdminLargeTableTests(TestCase):
+    """Admin lists load related rows with the page, and big tables page by keyset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'x')
+        cls.course = Course.objects.create(title='Keyset Course', instructor=cls.admin,
+                                           thumbnail='thumbnails/default-thumbnail.png')
+        students = [User.objects.create_user(f'payer{i}', password='x') for i in range(5)]
+        cls.payments = [Payment.objects.create(student=s, course=cls.course, amount=10) for s in students]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, ctx
+
+    def test_user_list_does_not_query_profiles_per_row(self):
+        _, few = self.changelist_queries(reverse('admin:auth_user_changelist'))
+        for i in range(5):
+            User.objects.create_user(f'extra{i}', password='x')
+        response, many = self.changelist_queries(reverse('admin:auth_user_changelist'))
+        self.assertEqual(len(many), len(few))
+        self.assertContains(response, 'Student')
+
+    def test_location_lists_do_not_query_countries_per_row(self):
+        country = Country.objects.create(name='India')
+
+        def add_rows():
+            for _ in range(3):
+                n = State.objects.count()
+                state = State.objects.create(country=country, name=f'State {n}')
+                District.objects.create(state=state, name=f'District {n}')
+                user = User.objects.create_user(f'located{n}', password='x')
+                Profile.objects.filter(user=user).update(country=country, state=state)
+
+        add_rows()
+        for name in ('admin:main_profile_changelist', 'admin:main_district_changelist'):
+            with self.subTest(name):
+                _, few = self.changelist_queries(reverse(name))
+                add_rows()
+                with self.assertNumQueries(len(few)):
+                    self.client.get(reverse(name))
+
+    def test_payments_page_by_keyset(self):
+        url = reverse('admin:main_payment_changelist')
+        with mock.patch('main.admin.PaymentAdmin.list_per_page', 2):
+            response, ctx = self.changelist_queries(url)
+            shown = [p.pk for p in response.context['cl'].result_list]
+            self.assertEqual(shown, [self.payments[4].pk, self.payments[3].pk])
+            self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+            older = response.context['cl'].older_url
+            self.assertEqual(older, f'?after={self.payments[3].pk}')
+
+            response, _ = self.changelist_queries(url + older)
+            cl = response.context['cl']
+            self.assertEqual([p.pk for p in cl.result_list], [self.payments[2].pk, self.payments[1].pk])
+            self.assertContains(response, 'Newer')
+            response, _ = self.changelist_queries(url + cl.newer_url)
+            self.assertEqual([p.pk for p in response.context['cl'].result_list], shown)
+
+            response, _ = self.changelist_queries(url + '?o=1')
+            self.assertFalse(response.context['cl'].keyset)
+
+    def test_every_changelist_and_add_form_renders(self):
+        for model, model_admin in admin.site._registry.items():
+            opts = model._meta
+            for view in ('changelist', 'add'):
+                if view == 'add' and not model_admin.has_add_permission(mock.Mock(user=self.admin)):
+                    continue
+                with self.subTest(model=opts.label, view=view):
+                    response = self.client.get(reverse(f'admin:{opts.app_label}_{opts.model_name}_{view}'))
+                    self.assertEqual(response.status_code, 200)
+
+    def test_estimated_count_for_unfiltered_big_tables(self):
+        with mock.patch('main.paginators.estimated_count', return_value=250000):
+            self.assertEqual(EstimatedCountPaginator(Payment.objects.order_by('pk'), 50).count, 250000)
+            self.assertEqual(EstimatedCountPaginator(Payment.objects.filter(amount=10).order_by('pk'), 50).count, 5)
+        self.assertEqual(EstimatedCountPaginator(Payment.objects.order_by('pk'), 50).count, 5)
+
+
+# ==================== BACKGROUND JOBS ====================
+
+FLAKY_CALLS = []
+
+
+@jobs.task(name='tests.flaky', max_attempts=3)
+def flaky(fail_times):
+    FLAKY_CALLS.append(fail_times)
+    if len(FLAKY_CALLS) <= fail_times:
+        raise RuntimeError('boom')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class JobQueueTests(TestCase):
+    """Jobs are claimed once, retried with backoff, and reclaimed after their visibility timeout."""
+
+    def setUp(self):
+        FLAKY_CALLS.clear()
+
+    def test_failures_are_retried_with_backoff_until_max_attempts(self):
+        job = flaky.delay(fail_times=5)
+        for attempt in (1, 2, 3):
+            [(job_id, token)] = jobs.claim(10)
+            with self.assertLogs('main.jobs', 'WARNING'):
+                self.assertFalse(jobs.execute(job_id, token))
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            if attempt < 3:
+                self.assertEqual(job.status, 'queued')
+                self.assertGreater(job.run_at, timezone.now())
+                self.assertEqual(jobs.claim(10), [])  # not due yet
+                Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+    def test_a_claimed_job_is_hidden_until_its_visibility_timeout(self):
+        job = flaky.delay(fail_times=0)
+        [(job_id, stale_token)] = jobs.claim(10)
+        self.assertEqual(jobs.claim(10), [])
+        Job.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [(_, token)] = jobs.claim(10)
+        self.assertFalse(jobs.execute(job_id, stale_token))  # the first worker lost its claim
+        self.assertTrue(jobs.execute(job_id, token))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, FLAKY_CALLS), ('done', 2, [0]))
+
+    def test_payment_approval_and_trainer_deletion_run_as_jobs(self):
+        manager = User.objects.create_user('jobs_manager', password='x')
+        Profile.objects.filter(user=manager).update(is_instructor=True, is_student=False)
+        trainer = User.objects.create_user('jobs_trainer', password='x')
+        Profile.objects.filter(user=trainer).update(is_trainer=True, is_student=False)
+        student = User.objects.create_user('jobs_student', password='x')
+        course = Course.objects.create(
+            title='Jobs', slug='jobs', category='Web Design', instructor=manager,
+            description='d', thumbnail='thumbnails/default-thumbnail.png',
+        )
+        TrainerCourseAssignment.objects.create(trainer=trainer, course=course, assigned_by=manager)
+        payment = Payment.objects.create(student=student, course=course, amount=Decimal('10.00'))
+
+        self.client.force_login(manager)
+        self.client.post(reverse('manager_update_payment', args=[payment.id]), {'action': 'approve'})
+        self.client.post(reverse('manager_delete_trainer', args=[trainer.id]))
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertFalse(User.objects.get(id=trainer.id).is_active)
+
+        self.assertEqual(run_queued_jobs(), 2)
+        self.assertTrue(course.students.filter(id=student.id).exists())
+        self.assertTrue(Enrollment.objects.filter(student=student, course=course).exists())
+        self.assertFalse(User.objects.filter(id=trainer.id).exists())
+
+    @override_settings(EDUPRO_JOBS={'EAGER': True})
+    def test_eager_mode_runs_inline(self):
+        self.assertEqual(flaky.delay(fail_times=0).status, 'done')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SoftDeleteTests(TestCase):
+    """Deleted courses disappear at once and are purged, with their files, in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('soft_manager', password='x')
+        Profile.objects.filter(user=cls.manager).update(is_instructor=True, is_student=False)
+        cls.students = [User.objects.create_user(f'soft_student{i}', password='x') for i in range(5)]
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.manager)
+
+    def make_course(self, title, thumbnail):
+        course = Course.objects.create(
+            title=title, category='Web Design', instructor=self.manager, description='d',
+            thumbnail=default_storage.save(thumbnail, ContentFile(b'png')),
+        )
+        video = CourseVideo.objects.create(
+            course=course, title='Intro', order=1,
+            video=default_storage.save(f'course_videos/{course.slug}.mp4', ContentFile(b'mp4')),
+        )
+        for student in self.students:
+            course.students.add(student)
+            Enrollment.objects.create(student=student, course=course)
+            Payment.objects.create(student=student, course=course, amount=Decimal('10.00'))
+            VideoProgress.objects.create(student=student, video=video, completed=True)
+        return course, video
+
+    def test_deleted_course_is_hidden_then_purged_in_batches(self):
+        course, video = self.make_course('Doomed', 'thumbnails/doomed.png')
+        self.client.post(reverse('manager_delete_course', args=[course.id]))
+
+        self.assertFalse(Course.objects.filter(id=course.id).exists())
+        self.assertFalse(Enrollment.objects.filter(course=course).exists())
+        self.assertFalse(CourseVideo.objects.filter(id=video.id).exists())
+        self.assertEqual(Enrollment.all_objects.filter(course=course).count(), 5)
+        self.assertEqual(self.client.get(reverse('course_details', args=['soft_manager', 'doomed'])).status_code, 404)
+        # The slug is free again while the purge is pending.
+        Course.objects.create(title='Doomed', category='Web Design', instructor=self.manager, description='d')
+
+        with mock.patch.object(tasks, 'PURGE_BATCH_SIZE', 2), \
+                CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(run_queued_jobs(), 1)
+        self.assertGreaterEqual(sum(q['sql'].startswith('DELETE FROM "main_payment"') for q in ctx.captured_queries), 3)
+        self.assertFalse(Course.all_objects.filter(id=course.id).exists())
+        for model in (Enrollment, Payment, CourseVideo):
+            self.assertFalse(model.all_objects.filter(course_id=course.id).exists())
+        self.assertFalse(VideoProgress.objects.filter(video_id=video.id).exists())
+        self.assertFalse(default_storage.exists(video.video.name))
+        self.assertFalse(default_storage.exists(course.thumbnail.name))
+
+    def test_purge_invalidates_once_per_batch(self):
+        course, _ = self.make_course('Doomed', 'thumbnails/doomed.png')
+        course.soft_delete()
+        backend = caches[cache.get_config()['ALIAS']]
+        with mock.patch.object(tasks, 'PURGE_BATCH_SIZE', 2), \
+                mock.patch.object(backend, 'incr', wraps=backend.incr) as incr:
+            tasks.purge_course(course_id=course.id)
+        bumped = [call.args[0] for call in incr.call_args_list]
+        self.assertEqual(bumped.count('ns:enrollments'), 3)  # 5 enrollments in batches of 2
+
+    def test_deleting_a_trainer_hides_their_courses_in_one_update(self):
+        trainer = User.objects.create_user('soft_trainer', password='x')
+        Profile.objects.filter(user=trainer).update(is_trainer=True, is_student=False)
+        courses = [
+            Course.objects.create(title=f'Owned {i}', category='Web Design', instructor=trainer, description='d')
+            for i in range(3)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('manager_delete_trainer', args=[trainer.id]))
+        self.assertEqual(sum(q['sql'].startswith('UPDATE "main_course"') for q in ctx.captured_queries), 1)
+        self.assertFalse(Course.objects.filter(instructor=trainer).exists())
+        for course in courses:
+            self.assertEqual(Course.all_objects.get(id=course.id).slug, f'{course.slug}-deleted-{course.id}')
+        # The slugs are free again while the purge is pending.
+        Course.objects.create(title='Owned 0', category='Web Design', instructor=self.manager, description='d')
+
+    def test_saving_a_deleted_course_keeps_its_freed_slug(self):
+        course = Course.objects.create(title='Renamed', category='Web Design', instructor=self.manager, description='d')
+        course.soft_delete()
+        deleted = Course.all_objects.get(id=course.id)
+        deleted.description = 'edited while the purge is pending'
+        deleted.save()
+        self.assertEqual(Course.all_objects.get(id=course.id).slug, f'renamed-deleted-{course.id}')
+        Course.objects.create(title='Renamed', category='Web Design', instructor=self.manager, description='d')
+
+    def test_slug_follows_title_changes_only(self):
+        course = Course.objects.create(title='First Title', category='Web Design', instructor=self.manager,
+                                       description='d', slug='kept-slug')
+        course = Course.objects.get(id=course.id)
+        course.description = 'edited'
+        course.save()
+        self.assertEqual(Course.objects.get(id=course.id).slug, 'kept-slug')
+        course.title = 'Second Title'
+        course.save()
+        self.assertEqual(Course.objects.get(id=course.id).slug, 'second-title')
+
+    def test_files_shared_with_another_course_are_kept(self):
+        course, _ = self.make_course('Doomed', 'thumbnails/shared.png')
+        Course.objects.create(title='Kept', category='Web Design', instructor=self.manager, description='d',
+                              thumbnail=course.thumbnail.name)
+        course.soft_delete()
+        tasks.purge_course(course_id=course.id)
+        self.assertTrue(default_storage.exists(course.thumbnail.name))
+
+
+class GcMediaCommandTests(TestCase):
+    """Only files no row references (and old enough) are removed."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        manager = User.objects.create_user('gc_manager', password='x')
+        self.course = Course.objects.create(
+            title='GC', category='Web Design', instructor=manager, description='d',
+            thumbnail=default_storage.save('thumbnails/kept.png', ContentFile(b'png')),
+        )
+        CourseVideo.objects.create(
+            course=self.course, title='v', video=default_storage.save('course_videos/kept.mp4', ContentFile(b'x')),
+        )
+        self.orphans = [
+            default_storage.save(name, ContentFile(b'0' * 1024)) for name in ('course_videos/old.mp4', 'videos/old.mp4')
+        ]
+        default_storage.save('thumbnails/default-thumbnail.png', ContentFile(b'png'))
+        past = time.time() - 7200
+        for dirpath, _, files in os.walk(self.media):
+            for name in files:
+                os.utime(os.path.join(dirpath, name), (past, past))
+        self.fresh = default_storage.save('videos/uploading.mp4', ContentFile(b'x'))
+
+    def test_dry_run_reports_without_removing(self):
+        out = StringIO()
+        call_command('gc_media', '--dry-run', stdout=out)
+        self.assertIn('Would remove 2 of 6 files (2.0 KB)', out.getvalue())
+        self.assertTrue(all(default_storage.exists(name) for name in self.orphans))
+
+    def test_orphans_are_deleted_or_quarantined(self):
+        self.course.soft_delete()  # files of a course awaiting its purge are still referenced
+        quarantine = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, quarantine)
+        call_command('gc_media', '--quarantine', quarantine, stdout=StringIO())
+        self.assertFalse(any(default_storage.exists(name) for name in self.orphans))
+        self.assertTrue(os.path.exists(os.path.join(quarantine, 'videos', 'old.mp4')))
+        for name in ('thumbnails/kept.png', 'course_videos/kept.mp4', 'thumbnails/default-thumbnail.png', self.fresh):
+            self.assertTrue(default_storage.exists(name), name)
+
+
+class MediaBlobStorageTests(TestCase):
+    """Course media is stored once per content and counted per referencing row."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.manager = User.objects.create_user('blob_manager', password='x')
+
+    def make_course(self, title, thumbnail=b'png'):
+        return Course.objects.create(
+            title=title, category='Web Design', instructor=self.manager, description='d',
+            thumbnail=ContentFile(thumbnail, name=f'{title}.PNG'),
+        )
+
+    def blob(self, name):
+        return MediaBlob.objects.get(name=name)
+
+    def test_identical_uploads_share_one_blob(self):
+        first, second = self.make_course('One'), self.make_course('Two')
+        self.assertEqual(first.thumbnail.name, second.thumbnail.name)
+        self.assertTrue(is_blob(first.thumbnail.name))
+        self.assertTrue(first.thumbnail.name.endswith('.png'))
+        self.assertEqual(self.blob(first.thumbnail.name).refcount, 2)
+        blob_files = [name for _, _, files in os.walk(os.path.join(self.media, 'blobs')) for name in files]
+        self.assertEqual(len(blob_files), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.blob(second.thumbnail.name).refcount, 1)
+        self.assertTrue(blob_storage().exists(second.thumbnail.name))
+
+    def test_replaced_blob_is_released_and_collected(self):
+        course = self.make_course('Replaced')
+        old = course.thumbnail.name
+        course.thumbnail = ContentFile(b'new png', name='new.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            course.save()
+        self.assertEqual(self.blob(old).refcount, 0)
+        self.assertEqual(self.blob(course.thumbnail.name).refcount, 1)
+
+        past = time.time() - 7200
+        os.utime(blob_storage().path(old), (past, past))
+        call_command('gc_media', stdout=StringIO())
+        self.assertFalse(blob_storage().exists(old))
+        self.assertFalse(MediaBlob.objects.filter(name=old).exists())
+        self.assertTrue(blob_storage().exists(course.thumbnail.name))
+
+    def test_reuploading_the_same_content_keeps_one_reference(self):
+        course = self.make_course('Same')
+        for _ in range(2):
+            course.thumbnail = ContentFile(b'png', name='again.png')
+            with self.captureOnCommitCallbacks(execute=True):
+                course.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            course.save()  # no upload: no reference taken or released
+        self.assertEqual(self.blob(course.thumbnail.name).refcount, 1)
+
+    def test_dedupe_media_moves_legacy_copies_into_one_blob(self):
+        courses = [
+            Course.objects.create(
+                title=f'Legacy {i}', category='Web Design', instructor=self.manager, description='d',
+                thumbnail=default_storage.save('thumbnails/intro.png', ContentFile(b'same png')),
+            )
+            for i in range(3)
+        ]
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertIn('Moved 3 files into 1 blobs', out.getvalue())
+        names = {course.thumbnail.name for course in Course.objects.filter(id__in=[c.id for c in courses])}
+        self.assertEqual(len(names), 1)
+        self.assertEqual(self.blob(names.pop()).refcount, 3)
+
+    def test_blob_urls_are_served_immutable(self):
+        course = self.make_course('Served')
+        request = RequestFactory().get(course.thumbnail.url)
+        response = storage.serve(request, course.thumbnail.name, document_root=self.media)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+
+class RunJobsCommandTests(TransactionTestCase):
+    """The worker runs jobs on its pool with their own database connections."""
+
+    def test_worker_drains_the_queue(self):
+        FLAKY_CALLS.clear()
+        for _ in range(3):
+            flaky.delay(fail_times=0)
+        out = StringIO()
+        call_command('run_jobs', '--once', '--workers', '2', stdout=out)
+        self.assertIn('Ran 3 jobs: 3 succeeded, 0 failed', out.getvalue())
+        self.assertEqual(Job.objects.filter(status='done').count(), 3)
+
+
+# ==================== COURSE VIDEOS ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CourseVideoBatchTests(TestCase):
+    """Videos are reordered and uploaded a whole batch per request."""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.manager = User.objects.create_user('video_manager', password='x')
+        Profile.objects.filter(user=self.manager).update(is_instructor=True, is_student=False)
+        self.course = Course.objects.create(title='Ordering', instructor=self.manager,
+                                            thumbnail='thumbnails/default-thumbnail.png')
+        self.videos = [CourseVideo.objects.create(course=self.course, title=f'Part {i}', order=10 + i) for i in range(4)]
+        self.client.force_login(self.manager)
+
+    def reorder(self, order):
+        return self.client.post(reverse('manager_reorder_course_videos', args=[self.course.id]),
+                                json.dumps({'order': order}), content_type='application/json')
+
+    def test_reorder_applies_the_full_order_in_one_update(self):
+        order = [v.id for v in reversed(self.videos)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.reorder(order)
+        self.assertEqual(response.json()['updated'], 4)
+        self.assertEqual(list(self.course.videos.values_list('id', flat=True)), order)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "main_coursevideo"')]), 1)
+
+    def test_reorder_rejects_partial_or_foreign_orders(self):
+        other = Course.objects.create(title='Other', instructor=self.manager, thumbnail='thumbnails/default-thumbnail.png')
+        stranger = CourseVideo.objects.create(course=other, title='Elsewhere')
+        ids = [v.id for v in self.videos]
+        for order in (ids[:3], ids[:3] + [stranger.id], ids + ids[:1], 'x'):
+            with self.subTest(order=order):
+                self.assertEqual(self.reorder(order).status_code, 400)
+        self.assertEqual(list(self.course.videos.values_list('id', flat=True)), ids)
+
+    def test_batch_upload_adds_every_file_in_order(self):
+        files = [ContentFile(f'video {i}'.encode(), name=f'lesson_{i}-intro.mp4') for i in range(3)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('manager_add_video_to_course', args=[self.course.id]),
+                                        {'title': '', 'order': 10, 'video': files})
+        self.assertRedirects(response, reverse('manager_manage_course_videos', args=[self.course.id]),
+                             fetch_redirect_response=False)
+        added = list(self.course.videos.filter(title__startswith='lesson').values_list('title', 'order'))
+        self.assertEqual(added, [('lesson 0 intro', 10), ('lesson 1 intro', 11), ('lesson 2 intro', 12)])
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "main_coursevideo"')]), 1)
+        self.assertTrue(all(is_blob(name) for name in self.course.videos.filter(title__startswith='lesson').values_list('video', flat=True)))
+
+
+# ==================== STATIC FILES ====================
+
+class StaticPipelineTests(TestCase):
+    """collectstatic fingerprints and precompresses assets, served immutable by WhiteNoise."""
+
+    def test_collected_assets_are_hashed_compressed_and_immutable(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        storages = {**settings.STORAGES, 'staticfiles': {
+            'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+        }}
+        # Only the project's own assets; compressing the admin's takes most of a minute.
+        finders = ['django.contrib.staticfiles.finders.FileSystemFinder']
+        with override_settings(STATIC_ROOT=root, STORAGES=storages, STATICFILES_FINDERS=finders):
+            call_command('collectstatic', '--noinput', verbosity=0)
+            url = static('css/style.css')
+            self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+            path = os.path.join(root, url[len(settings.STATIC_URL):])
+            self.assertTrue(os.path.exists(path + '.gz'))
+            self.assertTrue(os.path.exists(path + '.br'))
+            self.assertIn(url, self.client.get(reverse('home')).content.decode())
+
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertIn('immutable', response['Cache-Control'])
+
+
+# ==================== ASYNC ENDPOINTS ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AsyncEndpointTests(TestCase):
+    """The heartbeat and dropdown endpoints run natively on the async client."""
+
+    @classmethod
+    def setUpTestData(cls):
+        manager = User.objects.create_user('async_manager', password='x')
+        cls.trainer = User.objects.create_user('async_trainer', password='x')
+        Profile.objects.filter(user=cls.trainer).update(is_trainer=True, is_student=False)
+        cls.student = User.objects.create_user('async_student', password='x')
+        course = Course.objects.create(
+            title='Async', slug='async', category='Web Design', instructor=manager,
+            description='d', thumbnail='thumbnails/default-thumbnail.png',
+        )
+        cls.video = CourseVideo.objects.create(course=course, title='Intro', video='course_videos/a.mp4', order=1)
+        course.students.add(cls.student)
+        cls.country = Country.objects.create(name='India')
+        State.objects.create(country=cls.country, name='Kerala')
+
+    async def test_heartbeat_updates_progress(self):
+        await self.async_client.aforce_login(self.student)
+        url = reverse('update_video_progress', args=[self.video.id])
+        await self.async_client.post(url, {'progress': 40, 'completed': 'false', 'time_spent': 50})
+        response = await self.async_client.post(url, {'progress': 100, 'completed': 'true', 'time_spent': 20})
+        self.assertEqual(response.json(), {'success': True, 'progress': 100, 'completed': True, 'time_spent': 50})
+
+    async def test_heartbeat_enforces_the_student_role(self):
+        await self.async_client.aforce_login(self.trainer)
+        response = await self.async_client.post(reverse('update_video_progress', args=[self.video.id]), {'progress': 1})
+        self.assertRedirects(response, reverse('trainer_dashboard'), fetch_redirect_response=False)
+
+    async def test_states_dropdown(self):
+        response = await self.async_client.get(reverse('get_states', args=[self.country.id]))
+        self.assertEqual([state['name'] for state in response.json()], ['Kerala'])
+
+
+# ==================== LIVE DASHBOARD EVENTS ====================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LiveEventStreamTests(TestCase):
+    """Committed enrollments and completions are pushed to subscribed dashboards."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('live_manager', password='x')
+        Profile.objects.filter(user=cls.manager).update(is_instructor=True, is_student=False)
+        cls.trainer = User.objects.create_user('live_trainer', password='x')
+        Profile.objects.filter(user=cls.trainer).update(is_trainer=True, is_student=False)
+        cls.student = User.objects.create_user('live_student', password='x')
+        cls.course = Course.objects.create(
+            title='Live', slug='live', category='Web Design', instructor=cls.manager,
+            description='d', thumbnail='thumbnails/default-thumbnail.png',
+        )
+        cls.video = CourseVideo.objects.create(course=cls.course, title='Intro', video='course_videos/a.mp4', order=1)
+        TrainerCourseAssignment.objects.create(trainer=cls.trainer, course=cls.course, assigned_by=cls.manager)
+
+    def setUp(self):
+        # Row ids restart after each test's rollback; so does the broker's position.
+        patcher = mock.patch.multiple(broker, last_id=None, last_poll=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('main.events.POLL_SECONDS', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caches[cache.get_config()['ALIAS']].clear()  # no listeners left over from other tests
+
+    @asynccontextmanager
+    async def open_stream(self, user, headers=None, **params):
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('event_stream'), params, headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        try:
+            yield stream
+        finally:
+            await stream.aclose()
+
+    def commit(self, write):
+        """Runs write() and its on_commit callbacks, which publish the events."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return write()
+
+    async def test_trainer_sees_enrollment_and_completion_for_their_course(self):
+        async with self.open_stream(self.trainer, course=self.course.id) as stream:
+            await sync_to_async(self.commit)(lambda: Enrollment.objects.create(student=self.student, course=self.course))
+            self.assertIn(b'event: enrollment', await anext(stream))
+
+            progress = await sync_to_async(self.commit)(
+                lambda: VideoProgress.objects.create(student=self.student, video=self.video)
+            )
+            published = await LiveEvent.objects.acount()
+
+            def complete():
+                progress.completed = True
+                progress.save()
+                progress.save()  # a repeat heartbeat is not a second completion
+            await sync_to_async(self.commit)(complete)
+            event = (await anext(stream)).decode()
+            self.assertIn('event: completion', event)
+            self.assertIn('"completed_videos": 1', event)
+            # One each for 'manager' and the course.
+            self.assertEqual(await LiveEvent.objects.acount() - published, 2)
+
+    async def test_manager_sees_payment_requests(self):
+        async with self.open_stream(self.manager) as stream:
+            await sync_to_async(self.commit)(
+                lambda: Payment.objects.create(student=self.student, course=self.course, amount=Decimal('10.00'))
+            )
+            self.assertIn(b'"status": "requested"', await anext(stream))
+
+    async def test_reconnect_replays_missed_events(self):
+        async with self.open_stream(self.manager):  # another dashboard keeps the channel live
+            await sync_to_async(self.commit)(
+                lambda: Payment.objects.create(student=self.student, course=self.course, amount=Decimal('10.00'))
+            )
+            last_id = str((await LiveEvent.objects.alatest('id')).id)
+            await sync_to_async(self.commit)(
+                lambda: Payment.objects.create(student=self.student, course=self.course, amount=Decimal('20.00'))
+            )
+            async with self.open_stream(self.manager, headers={'Last-Event-ID': last_id}) as stream:
+                self.assertIn(b'"amount": "20.00"', await anext(stream))
+                await sync_to_async(self.commit)(
+                    lambda: Payment.objects.create(student=self.student, course=self.course, amount=Decimal('30.00'))
+                )
+                self.assertIn(b'"amount": "30.00"', await anext(stream))  # and nothing twice
+
+    def test_nothing_is_fetched_without_subscribers(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Payment.objects.create(student=self.student, course=self.course, amount=Decimal('10.00'))
+            Enrollment.objects.create(student=self.student, course=self.course)
+            VideoProgress.objects.create(student=self.student, video=self.video, completed=True)
+        with self.assertNumQueries(0):
+            for callback in callbacks:
+                callback()
+        self.assertFalse(LiveEvent.objects.exists())
+
+    def test_students_are_refused(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('event_stream')).status_code, 403)
+
+    def test_wsgi_gets_no_stream(self):
+        # A blocking stream would hold a WSGI worker for as long as the tab is open.
+        self.client.force_login(self.manager)
+        self.assertEqual(self.client.get(reverse('event_stream')).status_code, 204)
+        self.assertNotContains(self.client.get(reverse('manager_dashboard')), 'EventSource')
+        with override_settings(EDUPRO_LIVE_UPDATES=True):
+            self.assertContains(self.client.get(reverse('manager_dashboard')), 'EventSource')
+
+    async def test_asgi_dashboard_opens_the_stream(self):
+        await self.async_client.aforce_login(self.manager)
+        response = await self.async_client.get(reverse('manager_dashboard'))
+        self.assertContains(response, 'EventSource')
+
+
+def _approve_payment_elsewhere(payment_id):
+    # Runs in a forked process, like a gunicorn worker next to the ASGI one.
+    payment = Payment.objects.get(id=payment_id)
+    payment.status = 'approved'
+    payment.save()  # publishes once committed
+    connections.close_all()
+
+
+class LiveEventFanOutTests(TransactionTestCase):
+    """Events published by one process reach the streams held by another."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('needs a test database a second process can open')
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            self.skipTest('needs the fork start method')
+        caches[cache.get_config()['ALIAS']].clear()
+
+    @override_settings(EDUPRO_LIVE_UPDATES=True)
+    def test_publisher_and_subscriber_in_different_processes(self):
+        manager = User.objects.create_user('fanout_manager', password='x')
+        student = User.objects.create_user('fanout_student', password='x')
+        course = Course.objects.create(title='Fan-out', slug='fan-out', category='Web Design', instructor=manager,
+                                       description='d', thumbnail='thumbnails/default-thumbnail.png')
+        payment = Payment.objects.create(student=student, course=course, amount=Decimal('10.00'))
+
+        subscriber = Broker()
+        subscription = subscriber.subscribe(['manager'])
+        connections.close_all()  # the child opens its own connection
+        child = multiprocessing.get_context('fork').Process(target=_approve_payment_elsewhere, args=(payment.id,))
+        child.start()
+        child.join(30)
+        self.assertEqual(child.exitcode, 0)
+
+        subscriber.poll()
+        [message] = subscription.drain()
+        self.assertIn('event: payment', message)
+        self.assertIn('"status": "approved"', message)
+
+
+# ==================== DATABASE ROUTING ====================
+
+class PooledMySQLBackendTests(SimpleTestCase):
+    """EDUPRO_DB_POOL_SIZE selects the pooled backend, which parks and reuses connections."""
+
+    def database(self, **env):
+        env = {'EDUPRO_DB_ENGINE': 'mysql', 'EDUPRO_DB_HOST': 'db.internal', **env}
+        with mock.patch.dict(os.environ, env):
+            return project_settings.database('EDUPRO_DB', 'edupro', 'db.sqlite3')
+
+    def test_settings_pick_the_pooled_engine(self):
+        config = self.database(EDUPRO_DB_POOL_SIZE='4')
+        self.assertEqual(config['ENGINE'], 'main.db_backends.mysql_pool')
+        self.assertEqual((config['POOL_SIZE'], config['CONN_MAX_AGE']), (4, 0))
+        self.assertEqual(self.database(EDUPRO_DB_POOL_SIZE='0')['ENGINE'], 'django.db.backends.mysql')
+
+    def test_closed_connections_are_parked_and_reused(self):
+        from main.db_backends.mysql_pool.base import DatabaseWrapper, base
+
+        self.addCleanup(DatabaseWrapper._pools.clear)
+        wrapper = ConnectionHandler({'default': self.database(EDUPRO_DB_POOL_SIZE='1')})['default']
+        self.assertIsInstance(wrapper, DatabaseWrapper)
+        self.assertEqual(wrapper._pool().maxsize, 1)
+
+        with mock.patch.object(base.Database, 'connect', side_effect=lambda **params: mock.Mock()) as connect:
+            first = wrapper.get_new_connection(wrapper.get_connection_params())
+            self.assertEqual(connect.call_args.kwargs['host'], 'db.internal')
+            wrapper.connection = first
+            wrapper._close()
+            first.rollback.assert_called_once()
+            first.close.assert_not_called()
+            self.assertIs(wrapper.get_new_connection({}), first)
+            first.ping.assert_called_once_with(False)
+
+            # A connection the server dropped while parked is replaced.
+            wrapper.connection = first
+            wrapper._close()
+            first.ping.side_effect = base.Database.OperationalError
+            second = wrapper.get_new_connection({})
+            self.assertIsNot(second, first)
+            self.assertEqual(connect.call_count, 2)
+
+            # Beyond POOL_SIZE, connections are really closed.
+            wrapper.connection = second
+            wrapper._close()
+            wrapper.connection = third = mock.Mock()
+            wrapper._close()
+            third.close.assert_called_once()
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Reads go to the replica only inside route_reads() and only if it exists."""
+
+    @contextmanager
+    def with_replica(self):
+        replica = {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', 'Overriding setting DATABASES')
+            with override_settings(DATABASES={**settings.DATABASES, 'replica': replica}):
+                yield
+
+    def test_reads_use_the_replica_inside_route_reads(self):
+        router = ReplicaRouter()
+        with self.with_replica():
+            self.assertIsNone(router.db_for_read(Course))
+            with route_reads('replica'):
+                self.assertEqual(router.db_for_read(Course), 'replica')
+                self.assertEqual(router.db_for_write(Course), 'default')
+            self.assertIsNone(router.db_for_read(Course))
+
+    def test_missing_replica_falls_back_to_the_primary(self):
+        with route_reads('replica'):
+            self.assertIsNone(ReplicaRouter().db_for_read(Course))
+
+    def test_reporting_falls_back_to_the_replica_and_sticks_after_a_write(self):
+        view = read_from_reporting(lambda request: read_alias())
+        fresh = RequestFactory().get('/')
+        sticky = RequestFactory().get('/')
+        sticky.COOKIES[STICKY_COOKIE] = str(time.time() + 5)
+        with self.with_replica():
+            self.assertEqual(view(fresh), 'replica')
+            self.assertIsNone(view(sticky))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class PrimaryStickinessTests(TestCase):
+    """Only requests that write to the primary pin the client to it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        manager = User.objects.create_user('sticky_manager', password='x')
+        cls.student = User.objects.create_user('sticky_student', password='x')
+        course = Course.objects.create(
+            title='Sticky', slug='sticky', category='Web Design', instructor=manager,
+            description='d', thumbnail='thumbnails/default-thumbnail.png',
+        )
+        cls.video = CourseVideo.objects.create(course=course, title='Intro', video='course_videos/a.mp4', order=1)
+        course.students.add(cls.student)
+
+    def test_write_sets_the_sticky_cookie(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        response = self.client.post(reverse('update_video_progress', args=[self.video.id]),
+                                    {'progress': 10, 'completed': 'false', 'time_spent': 5})
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], settings.DATABASE_STICKY_SECONDS)
@@ -42,6 +42,7 @@ urlpatterns = [
     path('manager/course/<int:course_id>/edit/', views.manager_edit_course, name='manager_edit_course'),
     path('manager/course/<int:course_id>/delete/', views.manager_delete_course, name='manager_delete_course'),
     path('manager/course/<int:course_id>/videos/', views.manager_manage_course_videos, name='manager_manage_course_videos'),
+    path('manager/course/<int:course_id>/videos/reorder/', views.manager_reorder_course_videos, name='manager_reorder_course_videos'),
     path('manager/course/<int:course_id>/add-video/', views.manager_add_video_to_course, name='manager_add_video_to_course'),
     path('manager/video/<int:video_id>/edit/', views.manager_edit_video, name='manager_edit_video'),
     path('manager/video/<int:video_id>/delete/', views.manager_delete_video, name='manager_delete_video'),
@@ -55,12 +56,21 @@ urlpatterns = [
     path('manager/assignment/<int:assignment_id>/unassign/', views.manager_unassign_trainer, name='manager_unassign_trainer'),
     path('manager/view-feedback/', views.manager_view_feedback, name='manager_view_feedback'),
     path('manager/analyze-progress/', views.manager_analyze_progress, name='manager_analyze_progress'),
+    path('manager/location-analytics/', views.manager_location_analytics, name='manager_location_analytics'),
     path('manager/view-payments/', views.manager_view_payments, name='manager_view_payments'),
     path('manager/payment/<int:payment_id>/update/', views.manager_update_payment, name='manager_update_payment'),
+    path('manager/profiling/', views.manager_profiling, name='manager_profiling'),
+    
+    # Live dashboard updates (server-sent events)
+    path('events/stream/', views.event_stream, name='event_stream'),
+    
+    # Prometheus scrape endpoint
+    path('metrics', views.metrics_view, name='metrics'),
     
     # AJAX endpoints for dependent dropdowns
     path('ajax/states/<int:country_id>/', views.get_states, name='get_states'),
     path('ajax/districts/<int:state_id>/', views.get_districts, name='get_districts'),
+    path('ajax/locations/', views.location_tree, name='location_tree'),
     
     # Profile completion
     path('complete-profile/', views.complete_profile, name='complete_profile'),
@@ -1,30 +1,79 @@
 import json
+import hmac
+import os
 import time
 from django.utils import timezone
 
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.utils.text import slugify
 from .models import (
     Course, Enrollment, Profile, Country, State, District,
     CourseVideo, VideoProgress, TrainerRating, VideoRating,
-    TrainerContact, Feedback, TrainerCourseAssignment, Payment
+    TrainerContact, Feedback, TrainerCourseAssignment, Payment, get_profile
 )
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, aget_object_or_404
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Count, Q
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Q, Sum
 from django.views.decorators.http import require_http_methods
 from .forms import CourseEditForm
-from .decorators import manager_required, trainer_required, student_required, role_required
+from .decorators import (
+    manager_required, trainer_required, student_required, role_required, read_from_replica, read_from_reporting,
+    conditional_page,
+)
+from .profiling import view_stats, get_config as get_profiling_config
+from . import cache, locations, metrics, tasks
+from .events import broker, course_channel
 from django.contrib import messages
 import pytz
+from asgiref.sync import sync_to_async
 
 # Create your views here.
 
 
+# ==================== CONDITIONAL GET ====================
+# Validators for the public catalog pages, cached with the catalog so a
+# revalidation costs a cache lookup (plus the enrollment check on a course).
+
+def _catalog_state(key, queryset):
+    """(latest Course.updated_at, number of courses); the count catches deletions."""
+    def load():
+        state = queryset.aggregate(last=Max('updated_at'), count=Count('id'))
+        return state['last'], state['count']
+    return cache.get_or_set('catalog', ['state', *key], load)
+
+
+def _all_courses_state(request):
+    return _catalog_state(['all'], Course.objects.all())
+
+
+def _category_state(request, category):
+    return _catalog_state(['category', category.lower()], Course.objects.filter(category__iexact=category))
+
+
+def _course_state(request, instructor, slug):
+    page = _course_page(instructor, slug)
+    if page is None:
+        return None
+    course, category_courses = page
+    # The page is rebuilt on every catalog change, so what it shows is what it is validated by.
+    state = (
+        max(c.updated_at for c in [course, *category_courses]),
+        course.id,
+        *(c.id for c in category_courses),
+    )
+    if request.user.is_authenticated:
+        state += (_is_enrolled(request.user, course.id),)
+    return state
+
+
+@conditional_page(_all_courses_state)
 def index(request):
-    courses = Course.objects.all()[:6]
+    courses = cache.get_or_set('catalog', ['home'], lambda: list(Course.objects.select_related('instructor')[:6]))
     return render(request, 'index.html', {'courses': courses})
 
 
@@ -36,8 +85,9 @@ def contact(request):
     return render(request, 'contact.html')
 
 
+@conditional_page(_all_courses_state)
 def courses(request):
-    courses = Course.objects.all()
+    courses = cache.get_or_set('catalog', ['all'], lambda: list(Course.objects.select_related('instructor')))
     return render(request, 'courses.html', {'courses': courses})
 
 # def profile(request):
@@ -66,8 +116,7 @@ def dashboard_home(request):
     if not user.is_authenticated:
         return redirect('account_login')
     
-    profile, created = Profile.objects.get_or_create(user=user)
-    role = profile.get_role()
+    role = get_profile(user).get_role()
     
     if role == 'Manager':
         return redirect('manager_dashboard')
@@ -81,21 +130,40 @@ def dashboard_home(request):
 
 @login_required
 @student_required
+@read_from_replica
 def student_dashboard(request):
     """Student Dashboard"""
     user = request.user
-    enrolled_courses = Enrollment.objects.filter(student=user)
+    course_progress = cache.get_or_set(
+        ('catalog', f'student:{user.id}'), ['dashboard'], lambda: _student_course_progress(user), timeout=60
+    )
+    
+    context = {
+        "user": user,
+        "course_progress": course_progress,
+    }
+    return render(request, "dashboard/student_dashboard.html", context)
+
+
+def _student_course_progress(user):
+    enrolled_courses = Enrollment.objects.filter(student=user).select_related(
+        'course__instructor'
+    ).annotate(total_videos=Count('course__videos'))
+    
+    # Completed videos per course, in one grouped query
+    completed_by_course = dict(
+        VideoProgress.objects.filter(student=user, completed=True)
+        .values_list('video__course')
+        .annotate(Count('id'))
+    )
     
     # Calculate progress for each course
     course_progress = []
     for enrollment in enrolled_courses:
         course = enrollment.course
-        videos = CourseVideo.objects.filter(course=course)
-        total_videos = videos.count()
+        total_videos = enrollment.total_videos
         if total_videos > 0:
-            completed_videos = VideoProgress.objects.filter(
-                student=user, video__course=course, completed=True
-            ).count()
+            completed_videos = completed_by_course.get(course.id, 0)
             progress_percentage = (completed_videos / total_videos) * 100
         else:
             progress_percentage = 0
@@ -107,12 +175,7 @@ def student_dashboard(request):
             'total_videos': total_videos,
             'completed_videos': completed_videos if total_videos > 0 else 0
         })
-    
-    context = {
-        "user": user,
-        "course_progress": course_progress,
-    }
-    return render(request, "dashboard/student_dashboard.html", context)
+    return course_progress
 
 
 @login_required
@@ -120,32 +183,35 @@ def student_dashboard(request):
 def student_course_detail(request, course_id):
     """Student view of course with videos and progress"""
     user = request.user
-    course = get_object_or_404(Course, id=course_id)
+    course = get_object_or_404(Course.objects.select_related('instructor'), id=course_id)
     
     # Check if student is enrolled
     if not course.students.filter(id=user.id).exists():
         messages.error(request, 'You are not enrolled in this course.')
         return redirect('student_dashboard')
     
-    videos = CourseVideo.objects.filter(course=course).order_by('order', 'created_at')
+    videos = list(CourseVideo.objects.filter(course=course).order_by('order', 'created_at'))
+    
+    # Get progress for each video, creating missing rows in a single insert
+    progress_by_video = {
+        p.video_id: p for p in VideoProgress.objects.filter(student=user, video__course=course)
+    }
+    missing = [VideoProgress(student=user, video=video) for video in videos if video.id not in progress_by_video]
+    if missing:
+        VideoProgress.objects.bulk_create(missing, ignore_conflicts=True)
+        progress_by_video.update((p.video_id, p) for p in missing)
     
-    # Get progress for each video
     video_progress_list = []
     for video in videos:
-        progress, created = VideoProgress.objects.get_or_create(
-            student=user, video=video
-        )
         video_progress_list.append({
             'video': video,
-            'progress': progress
+            'progress': progress_by_video[video.id]
         })
     
     # Calculate overall course progress
-    total_videos = videos.count()
+    total_videos = len(videos)
     if total_videos > 0:
-        completed = VideoProgress.objects.filter(
-            student=user, video__course=course, completed=True
-        ).count()
+        completed = sum(1 for p in progress_by_video.values() if p.completed)
         overall_progress = (completed / total_videos) * 100
     else:
         overall_progress = 0
@@ -161,26 +227,36 @@ def student_course_detail(request, course_id):
 @login_required
 @student_required
 @require_http_methods(["POST"])
-def update_video_progress(request, video_id):
-    """Update video progress (AJAX)"""
-    user = request.user
-    video = get_object_or_404(CourseVideo, id=video_id)
+async def update_video_progress(request, video_id):
+    """Update video progress (AJAX). Async: this is the busiest endpoint, hit every few seconds per viewer"""
+    user = await request.auser()
+    video = await aget_object_or_404(CourseVideo, id=video_id)
     
     # Check if student is enrolled in the course
-    if not video.course.students.filter(id=user.id).exists():
+    if not await Course.objects.filter(id=video.course_id, students=user).aexists():
         return JsonResponse({'error': 'Not enrolled'}, status=403)
     
-    progress_percentage = int(request.POST.get('progress', 0))
+    progress_percentage = min(100, max(0, int(request.POST.get('progress', 0))))
     completed = request.POST.get('completed', 'false') == 'true'
     time_spent = int(request.POST.get('time_spent', 0))  # Time in seconds
     
-    progress, created = VideoProgress.objects.get_or_create(
-        student=user, video=video
+    progress, created = await VideoProgress.objects.aget_or_create(
+        student=user, video=video,
+        defaults={
+            'progress_percentage': progress_percentage,
+            'completed': completed,
+            'time_spent_seconds': max(0, time_spent),
+        }
     )
-    progress.progress_percentage = min(100, max(0, progress_percentage))
-    progress.completed = completed
-    progress.time_spent_seconds = max(progress.time_spent_seconds, time_spent)  # Update if new time is greater
-    progress.save()
+    completion_changed = completed if created else progress.completed != completed
+    if not created:
+        progress.progress_percentage = progress_percentage
+        progress.completed = completed
+        progress.time_spent_seconds = max(progress.time_spent_seconds, time_spent)  # Update if new time is greater
+        await progress.asave(update_fields=['progress_percentage', 'completed', 'time_spent_seconds', 'last_watched'])
+    if completion_changed:
+        await sync_to_async(cache.invalidate)(f'student:{user.id}')
+    metrics.progress_heartbeats.inc(completed=str(progress.completed).lower())
     
     return JsonResponse({
         'success': True,
@@ -318,9 +394,9 @@ def trainer_contact(request, trainer_id):
     contact_info, created = TrainerContact.objects.get_or_create(trainer=trainer)
     
     # Get average rating
-    avg_rating = TrainerRating.objects.filter(trainer=trainer).aggregate(
-        Avg('rating')
-    )['rating__avg'] or 0
+    avg_rating = cache.get_or_set('ratings', ['trainer', trainer.id], lambda: TrainerRating.objects.filter(
+        trainer=trainer
+    ).aggregate(Avg('rating'))['rating__avg'] or 0)
     
     context = {
         'trainer': trainer,
@@ -363,31 +439,38 @@ def submit_feedback(request, course_id):
 
 @login_required
 @trainer_required
+@read_from_replica
 def trainer_dashboard(request):
     """Trainer Dashboard"""
     user = request.user
     
-    # Get assigned courses
-    assigned_courses = TrainerCourseAssignment.objects.filter(trainer=user)
-    course_ids = [ac.course.id for ac in assigned_courses]
-    courses = Course.objects.filter(id__in=course_ids)
-    
-    # Get total students across all assigned courses
-    total_students = Enrollment.objects.filter(
-        course__in=courses
-    ).values('student').distinct().count()
+    def load():
+        # Get assigned courses
+        course_ids = TrainerCourseAssignment.objects.filter(trainer=user).values('course_id')
+        courses = list(Course.objects.filter(id__in=course_ids))
+        
+        # Get total students across all assigned courses
+        total_students = Enrollment.objects.filter(
+            course__in=course_ids
+        ).values('student').distinct().count()
+        return courses, total_students
+    
+    courses, total_students = cache.get_or_set(
+        ('catalog', 'enrollments', f'trainer:{user.id}'), ['dashboard'], load, timeout=60
+    )
     
     context = {
         'user': user,
         'courses': courses,
         'total_students': total_students,
-        'num_courses': courses.count(),
+        'num_courses': len(courses),
     }
     return render(request, 'dashboard/trainer_dashboard.html', context)
 
 
 @login_required
 @trainer_required
+@read_from_replica
 def trainer_course_students(request, course_id):
     """View student progress for a specific course with average time per video"""
     user = request.user
@@ -398,25 +481,29 @@ def trainer_course_students(request, course_id):
         messages.error(request, 'You are not assigned to this course.')
         return redirect('trainer_dashboard')
     
-    enrollments = Enrollment.objects.filter(course=course)
-    videos = CourseVideo.objects.filter(course=course)
-    total_videos = videos.count()
+    enrollments = Enrollment.objects.filter(course=course).select_related('student')
+    total_videos = CourseVideo.objects.filter(course=course).count()
+    
+    # Completed videos and total watch time per student, in one grouped query
+    stats_by_student = {
+        row['student']: row
+        for row in VideoProgress.objects.filter(video__course=course).values('student').annotate(
+            completed=Count('id', filter=Q(completed=True)),
+            total_time=Sum('time_spent_seconds'),
+        )
+    }
     
     student_progress = []
     for enrollment in enrollments:
         student = enrollment.student
         
         if total_videos > 0:
-            completed = VideoProgress.objects.filter(
-                student=student, video__course=course, completed=True
-            ).count()
+            stats = stats_by_student.get(student.id, {})
+            completed = stats.get('completed', 0)
             progress_percentage = (completed / total_videos) * 100
             
             # Calculate average time per video
-            video_progresses = VideoProgress.objects.filter(
-                student=student, video__course=course
-            )
-            total_time = sum(vp.time_spent_seconds for vp in video_progresses)
+            total_time = stats.get('total_time') or 0
             avg_time_per_video = total_time / total_videos if total_videos > 0 else 0
             
             # Format average time
@@ -447,6 +534,7 @@ def trainer_course_students(request, course_id):
     context = {
         'course': course,
         'student_progress': student_progress,
+        'live_updates': _live_updates(request),
     }
     return render(request, 'dashboard/trainer_course_students.html', context)
 
@@ -464,18 +552,12 @@ def trainer_upload_video(request, course_id):
         return redirect('trainer_dashboard')
     
     if request.method == 'POST':
-        title = request.POST.get('title')
-        video_file = request.FILES.get('video')
+        video_files = request.FILES.getlist('video')
         order = int(request.POST.get('order', 0))
         
-        if title and video_file:
-            CourseVideo.objects.create(
-                course=course,
-                title=title,
-                video=video_file,
-                order=order
-            )
-            messages.success(request, 'Video uploaded successfully!')
+        if video_files:
+            added = _add_course_videos(course, video_files, request.POST.get('title', '').strip(), order)
+            messages.success(request, 'Video uploaded successfully!' if added == 1 else f'{added} videos uploaded successfully!')
             return redirect('trainer_course_students', course_id=course.id)
         else:
             messages.error(request, 'Please fill all required fields.')
@@ -530,33 +612,17 @@ def trainer_delete_contact(request):
 
 @login_required
 @manager_required
+@read_from_reporting
 def manager_dashboard(request):
     """Manager Dashboard"""
     user = request.user
-    
-    # Statistics
-    total_courses = Course.objects.count()
-    total_students = User.objects.filter(profile__is_student=True).count()
-    total_trainers = User.objects.filter(profile__is_trainer=True).count()
-    total_enrollments = Enrollment.objects.count()
-    
-    # All courses with details
-    all_courses = Course.objects.select_related('instructor').annotate(
-        num_students=Count('students'),
-        num_videos=Count('videos'),
-        avg_rating=Avg('feedbacks__rating')
-    ).order_by('-created_at')
-    
-    # All trainers with ratings
-    all_trainers = User.objects.filter(profile__is_trainer=True).annotate(
-        num_courses=Count('assigned_courses'),
-        avg_rating=Avg('trainer_ratings__rating'),
-        num_ratings=Count('trainer_ratings')
-    ).order_by('-date_joined')
+    stats = cache.get_or_set(
+        ('catalog', 'enrollments', 'ratings', 'people'), ['manager-dashboard'], _manager_dashboard_stats, timeout=60
+    )
     
     # All ratings
     trainer_ratings = TrainerRating.objects.select_related('trainer', 'student').order_by('-created_at')[:20]
-    video_ratings = VideoRating.objects.select_related('video', 'student').order_by('-created_at')[:20]
+    video_ratings = VideoRating.objects.select_related('video__course', 'student').order_by('-created_at')[:20]
     
     # All feedback
     all_feedback = Feedback.objects.select_related('student', 'course').order_by('-created_at')
@@ -569,21 +635,41 @@ def manager_dashboard(request):
     
     context = {
         'user': user,
-        'total_courses': total_courses,
-        'total_students': total_students,
-        'total_trainers': total_trainers,
-        'total_enrollments': total_enrollments,
-        'all_courses': all_courses,
-        'all_trainers': all_trainers,
+        **stats,
         'trainer_ratings': trainer_ratings,
         'video_ratings': video_ratings,
         'all_feedback': all_feedback,
         'recent_enrollments': recent_enrollments,
         'recent_feedback': recent_feedback,
+        'live_updates': _live_updates(request),
     }
     return render(request, 'dashboard/manager_dashboard.html', context)
 
 
+def _manager_dashboard_stats():
+    return {
+        # Statistics
+        'total_courses': Course.objects.count(),
+        'total_students': User.objects.filter(profile__is_student=True).count(),
+        'total_trainers': User.objects.filter(profile__is_trainer=True, is_active=True).count(),
+        'total_enrollments': Enrollment.objects.count(),
+        
+        # All courses with details
+        'all_courses': list(Course.objects.select_related('instructor').annotate(
+            num_students=Count('students', distinct=True),
+            num_videos=Count('videos', distinct=True),
+            avg_rating=Avg('feedbacks__rating')
+        ).order_by('-created_at')),
+        
+        # All trainers with ratings
+        'all_trainers': list(User.objects.filter(profile__is_trainer=True, is_active=True).annotate(
+            num_courses=Count('assigned_courses', distinct=True),
+            avg_rating=Avg('trainer_ratings__rating'),
+            num_ratings=Count('trainer_ratings', distinct=True)
+        ).order_by('-date_joined')),
+    }
+
+
 @login_required
 @manager_required
 def manager_add_course(request):
@@ -664,7 +750,7 @@ def manager_add_trainer(request):
                 first_name=first_name,
                 last_name=last_name
             )
-            profile, created = Profile.objects.get_or_create(user=user)
+            profile = get_profile(user)
             profile.is_trainer = True
             profile.is_student = False
             profile.is_instructor = False
@@ -700,15 +786,18 @@ def manager_edit_trainer(request, trainer_id):
         trainer.save()
         
         # Update location if provided
-        profile.country = request.POST.get('country', profile.country)
-        profile.state = request.POST.get('state', profile.state)
-        profile.district = request.POST.get('district', profile.district)
+        _set_location(profile, request.POST)
         profile.save()
         
         messages.success(request, f'Trainer "{trainer.username}" updated successfully!')
         return redirect('manager_dashboard')
     
-    context = {'trainer': trainer, 'profile': profile}
+    context = {
+        'trainer': trainer,
+        'profile': profile,
+        'countries': [{'id': pk, 'name': name} for pk, name in locations.countries()],
+        'locations_version': locations.version(),
+    }
     return render(request, 'dashboard/manager_edit_trainer.html', context)
 
 
@@ -726,26 +815,20 @@ def manager_delete_trainer(request, trainer_id):
     if request.method == 'POST':
         trainer_username = trainer.username
         
-        # Delete all assignments
-        TrainerCourseAssignment.objects.filter(trainer=trainer).delete()
-        
-        # Delete trainer contact info if exists
-        try:
-            trainer.contact_info.delete()
-        except TrainerContact.DoesNotExist:
-            pass
-        
-        # Delete trainer ratings
-        TrainerRating.objects.filter(trainer=trainer).delete()
+        # Deactivate now (logs them out and hides them and their courses);
+        # everything they own is purged in batches by a background job.
+        trainer.is_active = False
+        trainer.save(update_fields=['is_active'])
+        if Course.objects.filter(instructor=trainer).soft_delete():
+            cache.invalidate('catalog')
+        cache.invalidate('people', f'trainer:{trainer.id}')
+        tasks.delete_trainer.delay(trainer_id=trainer.id)
         
-        # Delete the user (this will cascade delete profile)
-        trainer.delete()
-        
-        messages.success(request, f'Trainer "{trainer_username}" deleted successfully!')
+        messages.success(request, f'Trainer "{trainer_username}" deactivated and will be deleted shortly.')
         return redirect('manager_dashboard')
     
     # Get trainer's assigned courses
-    assigned_courses = TrainerCourseAssignment.objects.filter(trainer=trainer)
+    assigned_courses = TrainerCourseAssignment.objects.filter(trainer=trainer).select_related('course')
     
     context = {
         'trainer': trainer,
@@ -831,7 +914,7 @@ def manager_assign_trainer(request):
         
         return redirect('manager_assign_trainer')
     
-    trainers = User.objects.filter(profile__is_trainer=True)
+    trainers = User.objects.filter(profile__is_trainer=True, is_active=True)
     courses = Course.objects.all()
     
     # Get all existing assignments
@@ -898,6 +981,7 @@ def manager_manage_trainer_assignments(request, trainer_id):
 
 @login_required
 @manager_required
+@read_from_reporting
 def manager_view_feedback(request):
     """Manager views all student feedback"""
     feedbacks = Feedback.objects.select_related('student', 'course').order_by('-created_at')
@@ -914,30 +998,30 @@ def manager_view_feedback(request):
 
 @login_required
 @manager_required
+@read_from_reporting
 def manager_analyze_progress(request):
     """Manager analyzes student progress"""
-    courses = Course.objects.all()
+    courses = Course.objects.annotate(
+        total_students=Count('enrollment', distinct=True),
+        total_videos=Count('videos', distinct=True),
+    )
+    
+    # Completed videos by enrolled students, grouped per course
+    completed_by_course = dict(
+        VideoProgress.objects.filter(
+            completed=True, video__course__enrollment__student=F('student')
+        ).values_list('video__course').annotate(Count('id'))
+    )
     
     course_analytics = []
     for course in courses:
-        enrollments = Enrollment.objects.filter(course=course)
-        total_students = enrollments.count()
-        
-        videos = CourseVideo.objects.filter(course=course)
-        total_videos = videos.count()
+        total_students = course.total_students
+        total_videos = course.total_videos
         
         if total_students > 0 and total_videos > 0:
-            # Calculate average progress
-            total_progress = 0
-            for enrollment in enrollments:
-                student = enrollment.student
-                completed = VideoProgress.objects.filter(
-                    student=student, video__course=course, completed=True
-                ).count()
-                progress = (completed / total_videos) * 100
-                total_progress += progress
-            
-            avg_progress = total_progress / total_students
+            # Average progress = completed videos / videos each student could complete
+            completed = completed_by_course.get(course.id, 0)
+            avg_progress = (completed / (total_students * total_videos)) * 100
         else:
             avg_progress = 0
         
@@ -952,6 +1036,45 @@ def manager_analyze_progress(request):
     return render(request, 'dashboard/manager_analyze_progress.html', context)
 
 
+@login_required
+@manager_required
+@read_from_reporting
+def manager_location_analytics(request):
+    """Manager views students per country, state and district"""
+    countries = cache.get_or_set(('people', 'locations'), ('location_analytics',), _students_by_location)
+    context = {
+        'countries': countries,
+        'total_students': sum(country['students'] for country in countries),
+    }
+    return render(request, 'dashboard/manager_location_analytics.html', context)
+
+
+def _students_by_location():
+    """One GROUP BY per district; state and country totals are rolled up here."""
+    rows = Profile.objects.filter(is_student=True).values(
+        'country__name', 'state__name', 'district__name'
+    ).annotate(students=Count('id')).order_by('country__name', 'state__name', 'district__name')
+
+    countries = {}
+    for row in rows:
+        country = countries.setdefault(row['country__name'], {
+            'name': row['country__name'], 'students': 0, 'states': {},
+        })
+        state = country['states'].setdefault(row['state__name'], {
+            'name': row['state__name'], 'students': 0, 'districts': [],
+        })
+        state['districts'].append({'name': row['district__name'], 'students': row['students']})
+        state['students'] += row['students']
+        country['students'] += row['students']
+
+    result = sorted(countries.values(), key=lambda country: -country['students'])
+    for country in result:
+        country['states'] = sorted(country['states'].values(), key=lambda state: -state['students'])
+        for state in country['states']:
+            state['districts'].sort(key=lambda district: -district['students'])
+    return result
+
+
 @login_required
 @manager_required
 def manager_edit_course(request, course_id):
@@ -998,7 +1121,7 @@ def manager_edit_course(request, course_id):
 def manager_manage_course_videos(request, course_id):
     """Manager views and manages all videos for a course"""
     course = get_object_or_404(Course, id=course_id)
-    videos = CourseVideo.objects.filter(course=course).order_by('order', 'created_at')
+    videos = list(CourseVideo.objects.filter(course=course).order_by('order', 'created_at'))
     
     context = {
         'course': course,
@@ -1007,6 +1130,60 @@ def manager_manage_course_videos(request, course_id):
     return render(request, 'dashboard/manager_manage_course_videos.html', context)
 
 
+@login_required
+@manager_required
+@require_http_methods(["POST"])
+def manager_reorder_course_videos(request, course_id):
+    """Saves the drag-and-drop order of all of a course's videos (AJAX) in one UPDATE"""
+    course = get_object_or_404(Course, id=course_id)
+    try:
+        if request.content_type == 'application/json':
+            ids = [int(video_id) for video_id in json.loads(request.body)['order']]
+        else:
+            ids = [int(video_id) for video_id in request.POST.getlist('order')]
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({'error': 'order must be a list of video ids'}, status=400)
+
+    videos = {video.id: video for video in CourseVideo.objects.filter(course=course).only('id', 'order')}
+    if len(ids) != len(videos) or set(ids) != set(videos):
+        return JsonResponse({'error': 'order must list every video of the course exactly once'}, status=400)
+
+    changed = []
+    for position, video_id in enumerate(ids, start=1):
+        video = videos[video_id]
+        if video.order != position:
+            video.order = position
+            changed.append(video)
+    if changed:
+        CourseVideo.objects.bulk_update(changed, ['order'])
+        # bulk_update skips the post_save signal that refreshes the catalog.
+        cache.invalidate('catalog')
+    return JsonResponse({'success': True, 'order': ids, 'updated': len(changed)})
+
+
+def _video_title(title, upload, index, count):
+    """The given title (numbered when several files share it), else the file name."""
+    if title:
+        return title if count == 1 else f'{title} ({index + 1})'
+    name = os.path.splitext(os.path.basename(upload.name))[0].replace('_', ' ').replace('-', ' ').strip()
+    return name[:255] or 'Video'
+
+
+def _add_course_videos(course, video_files, title, first_order):
+    """Adds one video per uploaded file, in upload order, with a single INSERT; returns how many."""
+    videos = [
+        CourseVideo(course=course, title=_video_title(title, video_file, i, len(video_files)),
+                    video=video_file, order=first_order + i)
+        for i, video_file in enumerate(video_files)
+    ]
+    # The files are stored as the rows are prepared, inside the same transaction.
+    with transaction.atomic():
+        CourseVideo.objects.bulk_create(videos)
+    # bulk_create skips the post_save signal that refreshes the catalog.
+    cache.invalidate('catalog')
+    return len(videos)
+
+
 @login_required
 @manager_required
 def manager_add_video_to_course(request, course_id):
@@ -1014,18 +1191,12 @@ def manager_add_video_to_course(request, course_id):
     course = get_object_or_404(Course, id=course_id)
     
     if request.method == 'POST':
-        title = request.POST.get('title')
-        video_file = request.FILES.get('video')
+        video_files = request.FILES.getlist('video')
         order = int(request.POST.get('order', 0))
         
-        if title and video_file:
-            CourseVideo.objects.create(
-                course=course,
-                title=title,
-                video=video_file,
-                order=order
-            )
-            messages.success(request, 'Video added successfully!')
+        if video_files:
+            added = _add_course_videos(course, video_files, request.POST.get('title', '').strip(), order)
+            messages.success(request, 'Video added successfully!' if added == 1 else f'{added} videos added successfully!')
             return redirect('manager_manage_course_videos', course_id=course.id)
         else:
             messages.error(request, 'Please fill all required fields.')
@@ -1080,7 +1251,9 @@ def manager_delete_course(request, course_id):
     
     if request.method == 'POST':
         course_title = course.title
-        course.delete()
+        # Hidden at once; videos, progress, enrollments, payments and files are purged in the background.
+        course.soft_delete()
+        tasks.purge_course.delay(course_id=course.id)
         messages.success(request, f'Course "{course_title}" deleted successfully!')
         return redirect('manager_dashboard')
     
@@ -1090,24 +1263,27 @@ def manager_delete_course(request, course_id):
 
 @login_required
 @manager_required
+@read_from_reporting
 def manager_view_payments(request):
     """Manager views all payment requests"""
     payments = Payment.objects.select_related('student', 'course', 'approved_by').order_by('-payment_date')
     
     # Statistics
-    total_payments = payments.count()
-    total_amount = sum(p.amount for p in payments if p.status == 'approved')
-    requested_payments = payments.filter(status='requested').count()
-    approved_payments = payments.filter(status='approved').count()
-    rejected_payments = payments.filter(status='rejected').count()
+    stats = Payment.objects.aggregate(
+        total_payments=Count('id'),
+        total_amount=Sum('amount', filter=Q(status='approved')),
+        requested_payments=Count('id', filter=Q(status='requested')),
+        approved_payments=Count('id', filter=Q(status='approved')),
+        rejected_payments=Count('id', filter=Q(status='rejected')),
+    )
     
     context = {
         'payments': payments,
-        'total_payments': total_payments,
-        'total_amount': total_amount,
-        'requested_payments': requested_payments,
-        'approved_payments': approved_payments,
-        'rejected_payments': rejected_payments,
+        'total_payments': stats['total_payments'],
+        'total_amount': stats['total_amount'] or 0,
+        'requested_payments': stats['requested_payments'],
+        'approved_payments': stats['approved_payments'],
+        'rejected_payments': stats['rejected_payments'],
     }
     return render(request, 'dashboard/manager_view_payments.html', context)
 
@@ -1127,16 +1303,14 @@ def manager_update_payment(request, payment_id):
             payment.approved_by = request.user
             payment.approved_at = timezone.now()
             
-            # Enroll student in course
-            if not payment.course.students.filter(id=payment.student.id).exists():
-                payment.course.students.add(payment.student)
-                Enrollment.objects.get_or_create(student=payment.student, course=payment.course)
-            
             if notes:
                 payment.notes = notes
             payment.save()
+            metrics.payment_decisions.inc(status='approved')
+            # Enroll student in course
+            tasks.enroll_student.delay(payment_id=payment.id)
             
-            messages.success(request, f'Payment request approved! Student "{payment.student.username}" has been enrolled in "{payment.course.title}".')
+            messages.success(request, f'Payment request approved! Student "{payment.student.username}" is being enrolled in "{payment.course.title}".')
             
         elif action == 'reject':
             payment.status = 'rejected'
@@ -1146,6 +1320,7 @@ def manager_update_payment(request, payment_id):
             if notes:
                 payment.notes = notes
             payment.save()
+            metrics.payment_decisions.inc(status='rejected')
             
             messages.success(request, f'Payment request rejected.')
         
@@ -1155,57 +1330,124 @@ def manager_update_payment(request, payment_id):
     return render(request, 'dashboard/manager_update_payment.html', context)
 
 
+@login_required
+@manager_required
+def manager_profiling(request):
+    """Rolling per-view timing percentiles recorded by RequestProfilingMiddleware"""
+    if request.method == 'POST' and request.POST.get('action') == 'reset':
+        view_stats.reset()
+    
+    return JsonResponse({
+        'enabled': get_profiling_config()['ENABLED'],
+        'views': view_stats.snapshot(),
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+async def event_stream(request):
+    """Server-sent events pushing new payments, enrollments and completions to live dashboards"""
+    user = await request.auser()
+    channels = await sync_to_async(_event_channels)(user, request.GET.get('course'))
+    if not channels:
+        return JsonResponse({'error': 'No live updates for this account'}, status=403)
+    
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for as long as the tab stays open; 204
+        # tells EventSource to stop reconnecting.
+        return HttpResponse(status=204)
+    
+    subscription = await sync_to_async(broker.subscribe)(channels, request.headers.get('Last-Event-ID'))
+    response = StreamingHttpResponse(subscription.astream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
+
+
+def _live_updates(request):
+    """Whether pages should open the event stream: under ASGI, or when an ASGI worker serves it."""
+    return settings.EDUPRO_LIVE_UPDATES or isinstance(request, ASGIRequest)
+
+
+def _event_channels(user, course_id=None):
+    """Managers get every event; trainers get their assigned courses (or just ?course=<id>)."""
+    role = get_profile(user).get_role()
+    if role == 'Manager':
+        return ['manager']
+    if role == 'Trainer':
+        assigned = TrainerCourseAssignment.objects.filter(trainer=user)
+        if course_id is not None:
+            if not course_id.isdigit():
+                return []
+            assigned = assigned.filter(course_id=course_id)
+        return [course_channel(pk) for pk in assigned.values_list('course_id', flat=True)]
+    return []
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Prometheus scrape endpoint, summed across every worker process"""
+    token = metrics.get_config()['TOKEN']
+    if not token and not settings.DEBUG:
+        return HttpResponse('Set EDUPRO_METRICS_TOKEN to enable /metrics', status=403, content_type='text/plain')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(metrics.registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ==================== AJAX VIEWS FOR DEPENDENT DROPDOWNS ====================
 
 @require_http_methods(["GET"])
-def get_states(request, country_id):
+async def get_states(request, country_id):
     """AJAX endpoint to get states for a country"""
-    states = State.objects.filter(country_id=country_id).values('id', 'name')
-    return JsonResponse(list(states), safe=False)
+    return await sync_to_async(locations.json_response)(request, f'states:{country_id}', max_age=3600)
 
 
 @require_http_methods(["GET"])
-def get_districts(request, state_id):
+async def get_districts(request, state_id):
     """AJAX endpoint to get districts for a state"""
-    districts = District.objects.filter(state_id=state_id).values('id', 'name')
-    return JsonResponse(list(districts), safe=False)
+    return await sync_to_async(locations.json_response)(request, f'districts:{state_id}', max_age=3600)
+
+
+@require_http_methods(["GET"])
+async def location_tree(request):
+    """The whole Country -> State -> District tree; immutable when requested with the current ?v="""
+    version = await sync_to_async(locations.version)()
+    max_age = None if request.GET.get('v') == str(version) else 300
+    return await sync_to_async(locations.json_response)(request, 'tree', max_age=max_age)
+
+
+def _set_location(profile, data):
+    """Sets the posted country/state/district ids; a state must lie in the country, a district in the state."""
+    if 'country' not in data:
+        return
+    country_id, state_id, district_id = (data.get(field) or None for field in ('country', 'state', 'district'))
+    profile.country = get_object_or_404(Country, id=country_id) if country_id else None
+    profile.state = get_object_or_404(State, id=state_id, country=profile.country) if state_id and country_id else None
+    profile.district = get_object_or_404(District, id=district_id, state=profile.state) if district_id and state_id else None
 
 
 @login_required
 def complete_profile(request):
     """Complete profile with location information after signup"""
     user = request.user
-    profile, created = Profile.objects.get_or_create(user=user)
+    profile = get_profile(user)
     
     if request.method == 'POST':
-        country_id = request.POST.get('country')
-        state_id = request.POST.get('state')
-        district_id = request.POST.get('district')
-        
-        if country_id:
-            country = get_object_or_404(Country, id=country_id)
-            profile.country = country.name
-        
-        if state_id:
-            state = get_object_or_404(State, id=state_id)
-            profile.state = state.name
-        
-        if district_id:
-            district = get_object_or_404(District, id=district_id)
-            profile.district = district.name
-        
+        _set_location(profile, request.POST)
         profile.save()
         messages.success(request, 'Profile updated successfully!')
         return redirect('student_dashboard')
     
-    countries = Country.objects.all()
     context = {
-        'countries': countries,
+        'countries': [{'id': pk, 'name': name} for pk, name in locations.countries()],
+        'locations_version': locations.version(),
         'profile': profile,
     }
     return render(request, 'dashboard/complete_profile.html', context)
 
 
+@login_required
 def profile(request):
     user = request.user
     email = user.email
@@ -1214,17 +1456,19 @@ def profile(request):
     return render(request, 'dashboard/profile.html', {'email': email, 'full_name': full_name, 'username': username})
 
 
+@login_required
 def courses_enrolled(request):
     user = request.user
-    courses = Course.objects.filter(students=user)
+    courses = Course.objects.filter(students=user).select_related('instructor')
     context = {
         'courses': courses
     }
     return render(request, 'dashboard/courses-enrolled.html', context)
 
 
+@login_required
 def courses_uploaded(request):
-    courses = Course.objects.filter(instructor=request.user)
+    courses = Course.objects.filter(instructor=request.user).select_related('instructor')
     return render(request, 'dashboard/courses-uploaded.html', {'courses': courses})
 
 @login_required
@@ -1281,15 +1525,38 @@ def upload(request):
 #     }
 #     return render(request, 'course.html', context)
 
+def _course_page(instructor, slug):
+    """(course with its instructor, three more courses of its category), or None; cached with the catalog."""
+    def load():
+        course = Course.objects.select_related('instructor').prefetch_related(
+            'instructor__socialaccount_set'
+        ).filter(instructor__username=instructor, slug=slug).first()
+        if course is None:
+            return None
+        course.requirements_list, course.content_list  # parsed now, cached with the course
+        category_courses = list(
+            Course.objects.filter(category__iexact=course.category).exclude(id=course.id).select_related('instructor')[:3]
+        )
+        return course, category_courses
+
+    return cache.get_or_set('catalog', ['course', instructor, slug], load)
+
+
+def _is_enrolled(user, course_id):
+    return cache.get_or_set(
+        ('enrollments', f'student:{user.id}'), ['enrolled', course_id],
+        lambda: Course.students.through.objects.filter(course_id=course_id, user_id=user.id).exists(),
+    )
+
+
+@conditional_page(_course_state)
 def course_details(request, instructor, slug):
-    instructor_obj = get_object_or_404(User, username=instructor)
-    course = get_object_or_404(Course, slug=slug, instructor=instructor_obj)
-    category_courses = Course.objects.filter(category__iexact=course.category).exclude(id=course.id)[:3]
+    page = _course_page(instructor, slug)
+    if page is None:
+        raise Http404('No course matches the given query.')
+    course, category_courses = page
 
-    enrolled = False
-    
-    if request.user.is_authenticated:
-        enrolled = course.students.filter(id=request.user.id).exists()
+    enrolled = request.user.is_authenticated and _is_enrolled(request.user, course.id)
 
     if request.method == 'POST' and not enrolled:
         user = request.user
@@ -1321,15 +1588,19 @@ def course_edit(request, slug):
 def delete_course(request, slug):
     course = get_object_or_404(Course, slug=slug, instructor=request.user)
     if request.method == 'POST':
-        course.delete()
+        course.soft_delete()
+        tasks.purge_course.delay(course_id=course.id)
         return redirect('/dashboard/courses-uploaded')
     context = {
         'course': course,
     }
     return render(request, 'dashboard/course-edit.html', context)
 
+@conditional_page(_category_state)
 def category(request, category):
-    courses = Course.objects.filter(category__iexact=category)
+    courses = cache.get_or_set('catalog', ['category', category.lower()], lambda: list(
+        Course.objects.filter(category__iexact=category).select_related('instructor')
+    ))
     context = {
         'category': category,
         'courses': courses